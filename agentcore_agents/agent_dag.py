@@ -0,0 +1,316 @@
+# ============================================
+# agent_dag.py - Dependency-Graph Execution of Specialist Agent Calls
+# ============================================
+"""
+Executes a supervisor plan as a dependency graph of specialist calls.
+
+Each node names the nodes it depends on. A node starts the moment its last
+dependency finishes (not when a whole "level" does), so independent
+branches run concurrently and the plan's wall-clock time is its critical
+path rather than the sum of its steps. A node receives the outputs of its
+dependencies, so downstream agents work from upstream findings; if a
+dependency fails, its dependents are skipped.
+
+Every node records when it started and finished relative to the run,
+its duration and its status; the run reports the critical path through
+the measured durations. Recent runs are kept for progress monitoring.
+
+``AgentRuntimeInvoker`` calls deployed AgentCore runtimes directly with
+``invoke_agent_runtime``; runtime ARNs come from ``<AGENT>_AGENT_ARN``
+environment variables. Agents are asked to stream; their tokens are handed
+to an ``on_text`` callback as they arrive.
+"""
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+import boto3
+from botocore.config import Config as BotoConfig
+
+from agent_pool import parse_event_stream
+
+logger = logging.getLogger(__name__)
+
+AGENT_REGION = os.environ.get("AWS_REGION", "us-west-2")
+DAG_MAX_WORKERS = int(os.environ.get("DAG_MAX_WORKERS", 8))
+AGENT_READ_TIMEOUT = int(os.environ.get("AGENT_READ_TIMEOUT", 300))
+# Upstream output passed to a dependent node is truncated to this many characters
+UPSTREAM_CONTEXT_CHARS = 4000
+RECENT_RUNS = 20
+
+
+class DagNode:
+    """One step of a plan: ``run(upstream_outputs) -> str``"""
+
+    def __init__(self, name: str, run: Callable[[Dict[str, str]], str], depends_on: Sequence[str] = (),
+                 agent: Optional[str] = None, task: str = ""):
+        self.name = name
+        self.run = run
+        self.depends_on = list(depends_on)
+        self.agent = agent
+        self.task = task
+        self.status = "pending"     # pending -> queued -> running -> completed | failed | skipped
+        self.output: Optional[str] = None
+        self.error: Optional[str] = None
+        self.started_ms: Optional[float] = None
+        self.finished_ms: Optional[float] = None
+
+    @property
+    def duration_ms(self) -> float:
+        if self.started_ms is None or self.finished_ms is None:
+            return 0.0
+        return self.finished_ms - self.started_ms
+
+    def summary(self) -> Dict:
+        return {
+            "node": self.name,
+            "agent": self.agent,
+            "depends_on": self.depends_on,
+            "status": self.status,
+            "started_ms": None if self.started_ms is None else round(self.started_ms, 1),
+            "finished_ms": None if self.finished_ms is None else round(self.finished_ms, 1),
+            "duration_ms": round(self.duration_ms, 1),
+            "error": self.error,
+        }
+
+
+class DagRun:
+    """Nodes of one plan execution, validated as an acyclic graph"""
+
+    def __init__(self, nodes: Sequence[DagNode], run_id: Optional[str] = None):
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.nodes: Dict[str, DagNode] = OrderedDict((n.name, n) for n in nodes)
+        self.elapsed_ms = 0.0
+        self.status = "pending"
+        # Caller-owned state kept with the run for monitoring (e.g. its result aggregator)
+        self.context: Dict[str, Any] = {}
+        for node in nodes:
+            missing = [d for d in node.depends_on if d not in self.nodes]
+            if missing:
+                raise ValueError(f"Node '{node.name}' depends on unknown node(s): {', '.join(missing)}")
+        self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        indegree = {name: len(node.depends_on) for name, node in self.nodes.items()}
+        ready = [name for name, degree in indegree.items() if degree == 0]
+        order = []
+        while ready:
+            name = ready.pop()
+            order.append(name)
+            for other in self.nodes.values():
+                if name in other.depends_on:
+                    indegree[other.name] -= 1
+                    if indegree[other.name] == 0:
+                        ready.append(other.name)
+        if len(order) != len(self.nodes):
+            raise ValueError("Plan has a dependency cycle")
+        return order
+
+    def critical_path(self) -> Dict:
+        """Longest chain of measured node durations through the graph"""
+        longest: Dict[str, float] = {}
+        previous: Dict[str, Optional[str]] = {}
+        for name in self._topological_order():
+            node = self.nodes[name]
+            best = max(node.depends_on, key=lambda d: longest[d], default=None)
+            longest[name] = node.duration_ms + (longest[best] if best else 0.0)
+            previous[name] = best
+        if not longest:
+            return {"nodes": [], "duration_ms": 0.0}
+        end = max(longest, key=longest.get)
+        path = []
+        while end:
+            path.append(end)
+            end = previous[end]
+        return {"nodes": path[::-1], "duration_ms": round(longest[path[0]], 1)}
+
+    def summary(self) -> Dict:
+        serial_ms = sum(n.duration_ms for n in self.nodes.values())
+        return {
+            "run_id": self.run_id,
+            "status": self.status,
+            "elapsed_ms": round(self.elapsed_ms, 1),
+            "sum_of_steps_ms": round(serial_ms, 1),
+            "critical_path": self.critical_path(),
+            "nodes": [n.summary() for n in self.nodes.values()],
+        }
+
+
+class DagExecutor:
+    """Runs DagRuns on a shared thread pool, starting each node as soon as it is unblocked"""
+
+    def __init__(self, max_workers: int = DAG_MAX_WORKERS):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dag")
+        self._runs: "OrderedDict[str, DagRun]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def execute(self, run: DagRun) -> DagRun:
+        with self._lock:
+            self._runs[run.run_id] = run
+            while len(self._runs) > RECENT_RUNS:
+                self._runs.popitem(last=False)
+
+        started = time.perf_counter()
+        now = lambda: (time.perf_counter() - started) * 1000
+        run.status = "running"
+        running = {}
+
+        def call(node: DagNode, upstream: Dict[str, str]) -> str:
+            node.started_ms = now()
+            node.status = "running"
+            try:
+                return node.run(upstream)
+            finally:
+                node.finished_ms = now()
+
+        def schedule():
+            """Submit every unblocked node; skipping a node can unblock further skips"""
+            changed = True
+            while changed:
+                changed = False
+                for node in run.nodes.values():
+                    if node.status != "pending":
+                        continue
+                    upstream = [run.nodes[d] for d in node.depends_on]
+                    if any(u.status in ("failed", "skipped") for u in upstream):
+                        node.status = "skipped"
+                        node.error = "upstream step failed"
+                        changed = True
+                    elif all(u.status == "completed" for u in upstream):
+                        node.status = "queued"
+                        running[self.pool.submit(call, node, {u.name: u.output for u in upstream})] = node
+
+        schedule()
+        while running:
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                node = running.pop(future)
+                try:
+                    node.output = future.result()
+                    node.status = "completed"
+                    logger.info(f"✅ [{run.run_id}] {node.name} completed in {node.duration_ms:.0f} ms")
+                except Exception as e:
+                    node.status = "failed"
+                    node.error = str(e)
+                    logger.error(f"❌ [{run.run_id}] {node.name} failed after {node.duration_ms:.0f} ms: {e}")
+            schedule()
+
+        run.elapsed_ms = now()
+        statuses = {n.status for n in run.nodes.values()}
+        run.status = "completed" if statuses == {"completed"} else "partial" if "completed" in statuses else "failed"
+        logger.info(f"🏁 [{run.run_id}] {run.status} in {run.elapsed_ms:.0f} ms "
+                    f"(critical path {run.critical_path()['duration_ms']:.0f} ms)")
+        return run
+
+    def get_run(self, run_id: Optional[str] = None) -> Optional[DagRun]:
+        """A recent run by id, or the latest one"""
+        with self._lock:
+            if run_id:
+                return self._runs.get(run_id)
+            return next(reversed(self._runs.values()), None)
+
+
+def with_upstream(task: str, query: str, upstream: Dict[str, str]) -> str:
+    """Prompt for a dependent node: its task, the original request and upstream findings"""
+    prompt = f"{task}\n\nOriginal request: {query}"
+    for name, output in upstream.items():
+        text = output or ""
+        if len(text) > UPSTREAM_CONTEXT_CHARS:
+            text = text[:UPSTREAM_CONTEXT_CHARS] + " …"
+        prompt += f"\n\nFindings from {name.replace('_', ' ')}:\n{text}"
+    return prompt
+
+
+# ---- AgentCore runtime calls ---------------------------------------------
+
+def _result_text(result) -> str:
+    """Answer text of an entrypoint result (fast-path string or model message)"""
+    if isinstance(result, str):
+        return result
+    if isinstance(result, dict):
+        if isinstance(result.get("content"), list):
+            return "\n".join(item["text"] for item in result["content"] if "text" in item)
+        if "text" in result:
+            return result["text"]
+    return json.dumps(result, indent=2)
+
+
+def _response_text(body: str) -> str:
+    """Answer text from a JSON agent runtime response body"""
+    try:
+        data = json.loads(body)
+    except json.JSONDecodeError:
+        return body
+    if not isinstance(data, dict):
+        return str(data)
+    return _result_text(data.get("result", data))
+
+
+class AgentRuntimeInvoker:
+    """Calls specialist AgentCore runtimes by agent name"""
+
+    def __init__(self, arns: Dict[str, str], client=None):
+        self.arns = dict(arns)
+        self._client = client
+        self._client_lock = threading.Lock()
+
+    def client(self):
+        with self._client_lock:
+            if self._client is None:
+                self._client = boto3.client(
+                    "bedrock-agentcore",
+                    region_name=AGENT_REGION,
+                    config=BotoConfig(max_pool_connections=max(DAG_MAX_WORKERS, 10),
+                                      read_timeout=AGENT_READ_TIMEOUT,
+                                      retries={"max_attempts": 2, "mode": "standard"}),
+                )
+            return self._client
+
+    def invoke(self, agent: str, prompt: str, session_id: Optional[str] = None,
+               on_text: Optional[Callable[[str], None]] = None, fast_path: bool = True) -> str:
+        """
+        Full answer text of ``agent``; ``on_text`` receives it piece by piece
+        as it arrives from streaming (text/event-stream) runtimes, or once
+        for plain JSON responses. ``fast_path=False`` makes the agent answer
+        with the model instead of its deterministic fast-path rules.
+        """
+        arn = self.arns.get(agent)
+        if not arn:
+            raise ValueError(f"No runtime ARN configured for agent '{agent}'")
+        response = self.client().invoke_agent_runtime(
+            agentRuntimeArn=arn,
+            runtimeSessionId=session_id or str(uuid.uuid4()),
+            payload=json.dumps({"inputText": prompt, "stream": True, "fast_path": fast_path}).encode("utf-8"),
+            contentType="application/json",
+            accept="text/event-stream",
+        )
+        stream = response.get("response")
+        if stream is not None and "text/event-stream" in response.get("contentType", ""):
+            parts = []
+            for event in parse_event_stream(stream.iter_lines()):
+                if event["type"] == "error":
+                    raise RuntimeError(f"Agent {agent} failed: {event.get('error')}")
+                if event["type"] == "token":
+                    part = event.get("text", "")
+                elif event["type"] == "result" and not parts:
+                    # Fast-path answers (and non-streaming agents) send the whole text at once
+                    part = _result_text(event.get("result", ""))
+                else:
+                    continue
+                parts.append(part)
+                if on_text is not None:
+                    on_text(part)
+            text = "".join(parts)
+        else:
+            text = _response_text(stream.read().decode("utf-8") if stream is not None else "")
+            if on_text is not None and text:
+                on_text(text)
+        if not text.strip():
+            raise RuntimeError(f"Agent {agent} returned an empty response")
+        return text
@@ -0,0 +1,260 @@
+# ============================================
+# agent_pool.py - Per-Session Agent Instances for AgentCore Entrypoints
+# ============================================
+"""
+Bounded pool of Strands agents keyed by AgentCore runtime session id.
+
+A single module-level agent shares one conversation (and one
+``SummarizingConversationManager``) between every session the container
+serves: concurrent invocations contend for it, and the context of all
+users keeps growing until it is summarized. Here each runtime session gets
+its own agent, built lazily on its first LLM request by the agent module's
+``create_agent()``; every agent of a module uses the module's one
+``BedrockModel`` (one Bedrock client and connection pool per container).
+
+Calls for one session are serialized (a Strands agent handles one call at
+a time); different sessions run in parallel. The least recently used
+session is evicted when the pool is full, and sessions idle for longer
+than ``AGENT_SESSION_TTL`` seconds are dropped on the next access.
+Requests without a session id (local testing) share the "default" session.
+``{"action": "reset_session"}`` clears the calling session's conversation
+while the runtime session itself stays warm.
+
+``serve`` is the async entrypoint body. With ``"stream": true`` in the
+payload it returns an event stream (sent by the runtime as server-sent
+events): model tokens as they are generated, tool calls as they start and
+finish, then the final result; fast-path answers arrive as a single result
+event. Clients read the stream with ``parse_event_stream``; without
+``stream`` the response is the usual JSON. Blocking work - the fast path,
+lock waits, and Strands' synchronous tools, which run through the event
+loop's default executor - runs on one shared thread pool of
+``TOOL_WORKERS`` threads, so a container keeps serving other invocations
+while tools compute.
+"""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, Optional, Union
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+
+logger = logging.getLogger(__name__)
+
+AGENT_POOL_SIZE = int(os.environ.get("AGENT_POOL_SIZE", 32))
+AGENT_SESSION_TTL = int(os.environ.get("AGENT_SESSION_TTL", 1800))
+TOOL_WORKERS = int(os.environ.get("TOOL_WORKERS", 16))
+LOCK_POLL_SECONDS = 0.05
+DEFAULT_SESSION = "default"
+POOL_STATS_ACTION = "agent_pool_stats"
+RESET_ACTION = "reset_session"
+
+
+def parse_event_stream(lines: Iterable[bytes]) -> Iterator[Dict]:
+    """Events of a streamed response (``data:`` lines); plain text events become tokens"""
+    for line in lines:
+        line = line.decode("utf-8") if isinstance(line, bytes) else line
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        try:
+            event = json.loads(data)
+        except json.JSONDecodeError:
+            event = data
+        if isinstance(event, dict) and "type" in event:
+            yield event
+        elif isinstance(event, str):
+            yield {"type": "token", "text": event}
+        else:
+            yield {"type": "result", "result": event}
+
+
+def session_key(payload: Dict, context: Any = None) -> str:
+    """Runtime session id of a request (header via the request context, else the payload)"""
+    return getattr(context, "session_id", None) or payload.get("session_id") or DEFAULT_SESSION
+
+
+_tool_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_executor_loops = weakref.WeakSet()
+
+
+def get_tool_executor() -> ThreadPoolExecutor:
+    """
+    Thread pool shared by the fast path and agent tools of every invocation.
+    A closing event loop shuts its default executor down, so a pool left
+    behind by a closed loop is replaced.
+    """
+    global _tool_executor
+    with _executor_lock:
+        if _tool_executor is None or _tool_executor._shutdown:
+            _tool_executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="tool")
+            _executor_loops.clear()
+        return _tool_executor
+
+
+def _use_tool_executor(loop: asyncio.AbstractEventLoop):
+    """Route the loop's run_in_executor(None, ...) / asyncio.to_thread calls to the tool pool"""
+    executor = get_tool_executor()
+    if loop not in _executor_loops:
+        loop.set_default_executor(executor)
+        _executor_loops.add(loop)
+
+
+class _Session:
+    __slots__ = ("agent", "lock", "created", "last_used", "calls")
+
+    def __init__(self):
+        self.agent = None
+        self.lock = threading.Lock()
+        self.created = self.last_used = time.monotonic()
+        self.calls = 0
+
+
+class AgentPool:
+    """Lazily built agents per session id, LRU-evicted and dropped when idle"""
+
+    def __init__(self, name: str, factory: Callable[[], Any], max_sessions: int = AGENT_POOL_SIZE,
+                 idle_ttl: float = AGENT_SESSION_TTL):
+        self.name = name
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.evicted = 0
+        self.expired = 0
+
+    def _session(self, session_id: str) -> _Session:
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and now - session.last_used > self.idle_ttl:
+                del self._sessions[session_id]
+                self.expired += 1
+                session = None
+            if session is None:
+                session = self._sessions[session_id] = _Session()
+                while len(self._sessions) > self.max_sessions:
+                    evicted_id, _ = self._sessions.popitem(last=False)
+                    self.evicted += 1
+                    logger.info(f"♻️ {self.name}: evicted least recently used session {evicted_id[:12]}")
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_used = now
+            return session
+
+    def _agent(self, session: _Session, session_id: str):
+        """The session's agent, built on first use (caller holds the session lock)"""
+        if session.agent is None:
+            started = time.perf_counter()
+            session.agent = self.factory()
+            with self._lock:
+                self.created += 1
+            logger.info(f"🆕 {self.name}: agent for session {session_id[:12]} built in "
+                        f"{(time.perf_counter() - started) * 1000:.0f} ms")
+        session.calls += 1
+        return session.agent
+
+    def invoke(self, session_id: str, text: str):
+        """Ask the session's agent (building it on first use); returns the model message"""
+        session_id = session_id or DEFAULT_SESSION
+        session = self._session(session_id)
+        with session.lock:
+            return self._agent(session, session_id)(text).message
+
+    async def stream(self, session_id: str, text: str) -> AsyncIterator[Dict]:
+        """Token, tool progress and final result events from the session's agent"""
+        session_id = session_id or DEFAULT_SESSION
+        session = self._session(session_id)
+        # Poll instead of blocking a thread on the lock, so a cancelled stream never acquires it later
+        while not session.lock.acquire(blocking=False):
+            await asyncio.sleep(LOCK_POLL_SECONDS)
+        try:
+            agent = self._agent(session, session_id)
+            tools: Dict[str, str] = {}
+            result = None
+            async for event in agent.stream_async(text):
+                if event.get("data"):
+                    yield {"type": "token", "text": event["data"]}
+                elif "current_tool_use" in event:
+                    tool = event["current_tool_use"] or {}
+                    tool_use_id = tool.get("toolUseId")
+                    if tool_use_id and tool_use_id not in tools and tool.get("name"):
+                        tools[tool_use_id] = tool["name"]
+                        yield {"type": "tool", "name": tool["name"], "tool_use_id": tool_use_id, "status": "started"}
+                elif "message" in event:
+                    for block in event["message"].get("content", []):
+                        if "toolResult" in block:
+                            tool_use_id = block["toolResult"].get("toolUseId")
+                            yield {"type": "tool", "name": tools.get(tool_use_id), "tool_use_id": tool_use_id,
+                                   "status": block["toolResult"].get("status", "success")}
+                elif "result" in event:
+                    result = event["result"]
+            yield {"type": "result", "result": str(result) if result is not None else "", "path": "llm"}
+        finally:
+            session.lock.release()
+
+    def reset(self, session_id: str) -> bool:
+        """Forget a session's conversation; its next request starts a fresh agent"""
+        with self._lock:
+            return self._sessions.pop(session_id or DEFAULT_SESSION, None) is not None
+
+    def _action(self, payload: Dict, session_id: str) -> Optional[Dict]:
+        """Pool stats and context reset requests"""
+        if payload.get("action") == POOL_STATS_ACTION:
+            return {"result": json.dumps(self.stats(), indent=2), "path": f"fast:{POOL_STATS_ACTION}"}
+        if payload.get("action") == RESET_ACTION:
+            cleared = self.reset(session_id)
+            return {"result": "Session context cleared" if cleared else "No session context to clear",
+                    "path": f"fast:{RESET_ACTION}"}
+        return None
+
+    def handle(self, router, payload: Dict, context: Any = None) -> Dict:
+        """Entrypoint body: pool stats and reset actions, else the fast path with this session's agent as fallback"""
+        session_id = session_key(payload, context)
+        return self._action(payload, session_id) or \
+            router.handle(payload, lambda text: self.invoke(session_id, text))
+
+    async def serve(self, router, payload: Dict, context: Any = None) -> Union[Dict, AsyncIterator[Dict]]:
+        """Async entrypoint body: a JSON response, or an event stream when the payload asks to stream"""
+        loop = asyncio.get_running_loop()
+        _use_tool_executor(loop)
+        if not payload.get("stream"):
+            return await loop.run_in_executor(None, self.handle, router, payload, context)
+        return self._events(router, payload, session_key(payload, context))
+
+    async def _events(self, router, payload: Dict, session_id: str) -> AsyncIterator[Dict]:
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            answered = await loop.run_in_executor(None, lambda: self._action(payload, session_id)
+                                                  or router.answer(payload))
+            if answered is not None:
+                yield {"type": "result", **answered}
+                return
+            async for event in self.stream(session_id, router.message(payload) or "No prompt provided"):
+                if event["type"] == "result":
+                    elapsed = (time.perf_counter() - started) * 1000
+                    router.record_llm(elapsed)
+                    event["elapsed_ms"] = round(elapsed, 1)
+                yield event
+        except Exception as e:
+            logger.error(f"❌ {self.name}: streaming invocation failed: {e}")
+            yield {"type": "error", "error": str(e)}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "agent": self.name,
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "agents_built": self.created,
+                "evicted": self.evicted,
+                "expired": self.expired,
+                "busy": sum(1 for s in self._sessions.values() if s.lock.locked()),
+            }
@@ -0,0 +1,266 @@
+# ============================================
+# covariance_cache.py - Cached Covariance / Volatility Estimators
+# ============================================
+"""
+Per-universe covariance estimators that are built once from local price
+history and then updated incrementally.
+
+Each estimator keeps
+  * running sample moments (Welford mean and co-moment matrix), and
+  * a RiskMetrics-style EWMA covariance,
+both updated in O(N^2) per new daily bar instead of O(T*N^2) from scratch.
+The process-wide cache listens for bars appended to the price history
+(``price_history.append_closes``) and rolls every universe the bar covers
+forward on the spot; universes it misses catch up from the files on their
+next use, or on ``refresh`` once the history has been downloaded.
+Any portfolio that is a subset of a cached universe is served by extracting
+the sub-matrix. Estimators are persisted as .npz files in
+``COVARIANCE_CACHE_DIR`` so a fresh container starts warm.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+import hashlib
+import logging
+import os
+import threading
+
+import numpy as np
+
+from price_history import add_bar_listener, load_price_matrix
+
+logger = logging.getLogger(__name__)
+
+EWMA_LAMBDA = float(os.environ.get("EWMA_LAMBDA", 0.94))
+COVARIANCE_CACHE_DIR = os.environ.get("COVARIANCE_CACHE_DIR", "/tmp/finops_covariance_cache")
+
+
+class CovarianceEstimator:
+    """Incrementally updated sample and EWMA covariance for one symbol universe"""
+
+    def __init__(self, symbols: Sequence[str], lam: float = EWMA_LAMBDA):
+        self.symbols = [s.upper() for s in symbols]
+        self.index = {s: i for i, s in enumerate(self.symbols)}
+        self.lam = lam
+        n = len(self.symbols)
+        self.count = 0
+        self.mean = np.zeros(n)
+        self.comoment = np.zeros((n, n))
+        self.ewma = np.zeros((n, n))
+        self.last_prices: Optional[np.ndarray] = None
+        self.last_date: Optional[np.datetime64] = None
+
+    @classmethod
+    def from_prices(cls, symbols: Sequence[str], dates: np.ndarray, prices: np.ndarray,
+                    lam: float = EWMA_LAMBDA) -> "CovarianceEstimator":
+        """Bootstrap from a full price matrix in one vectorized pass"""
+        est = cls(symbols, lam)
+        returns = prices[1:] / prices[:-1] - 1.0
+        t = returns.shape[0]
+        est.count = t
+        est.mean = returns.mean(axis=0)
+        centered = returns - est.mean
+        est.comoment = centered.T @ centered
+
+        # Closed form of cov_t = lam * cov_{t-1} + (1 - lam) r_t r_t', seeded with the sample covariance
+        decay = (1 - lam) * lam ** np.arange(t - 1, -1, -1)
+        est.ewma = (returns * decay[:, None]).T @ returns + lam ** t * est.sample_cov()
+
+        est.last_prices = prices[-1].copy()
+        est.last_date = dates[-1]
+        return est
+
+    def update(self, prices: np.ndarray, date=None):
+        """Fold one new bar (prices for every symbol, same order) into both estimators"""
+        prices = np.asarray(prices, dtype=float)
+        if self.last_prices is None:
+            self.last_prices = prices
+            self.last_date = np.datetime64(date, "D") if date is not None else None
+            return
+
+        r = prices / self.last_prices - 1.0
+        self.count += 1
+        delta = r - self.mean
+        self.mean += delta / self.count
+        self.comoment += np.outer(delta, r - self.mean)
+        self.ewma *= self.lam
+        self.ewma += (1 - self.lam) * np.outer(r, r)
+
+        self.last_prices = prices
+        if date is not None:
+            self.last_date = np.datetime64(date, "D")
+
+    def sample_cov(self) -> np.ndarray:
+        return self.comoment / max(self.count - 1, 1)
+
+    def covariance(self, symbols: Sequence[str] = None, kind: str = "sample") -> np.ndarray:
+        """Covariance (sub-)matrix for ``symbols`` in the requested order"""
+        full = self.ewma if kind == "ewma" else self.sample_cov()
+        if symbols is None:
+            return full
+        idx = self._indices(symbols)
+        return full[np.ix_(idx, idx)]
+
+    def mean_returns(self, symbols: Sequence[str] = None) -> np.ndarray:
+        return self.mean if symbols is None else self.mean[self._indices(symbols)]
+
+    def volatility(self, symbols: Sequence[str] = None, kind: str = "ewma",
+                   annualize: int = 252) -> np.ndarray:
+        return np.sqrt(np.diag(self.covariance(symbols, kind)) * annualize)
+
+    def covers(self, symbols: Sequence[str]) -> bool:
+        return all(s.upper() in self.index for s in symbols)
+
+    def _indices(self, symbols: Sequence[str]) -> List[int]:
+        return [self.index[s.upper()] for s in symbols]
+
+    def save(self, path: str):
+        np.savez(path, symbols=np.array(self.symbols), lam=self.lam, count=self.count,
+                 mean=self.mean, comoment=self.comoment, ewma=self.ewma,
+                 last_prices=self.last_prices,
+                 last_date=np.array(self.last_date, dtype="datetime64[D]"))
+
+    @classmethod
+    def load(cls, path: str) -> "CovarianceEstimator":
+        with np.load(path) as data:
+            est = cls([str(s) for s in data["symbols"]], float(data["lam"]))
+            est.count = int(data["count"])
+            est.mean = data["mean"]
+            est.comoment = data["comoment"]
+            est.ewma = data["ewma"]
+            est.last_prices = data["last_prices"]
+            est.last_date = data["last_date"][()]
+        return est
+
+
+class CovarianceCache:
+    """Estimators keyed by symbol universe, kept in sync with local price history"""
+
+    def __init__(self, cache_dir: str = COVARIANCE_CACHE_DIR, lam: float = EWMA_LAMBDA):
+        self.cache_dir = cache_dir
+        self.lam = lam
+        self._estimators: Dict[Tuple[str, ...], CovarianceEstimator] = {}
+        self._lock = threading.Lock()
+        self._load_persisted()
+
+    @staticmethod
+    def universe_key(symbols: Sequence[str]) -> Tuple[str, ...]:
+        return tuple(sorted({s.upper() for s in symbols}))
+
+    def _path(self, key: Tuple[str, ...]) -> str:
+        digest = hashlib.sha1(",".join(key).encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"cov_{digest}.npz")
+
+    def _load_persisted(self):
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".npz"):
+                continue
+            try:
+                est = CovarianceEstimator.load(os.path.join(self.cache_dir, name))
+                self._estimators[self.universe_key(est.symbols)] = est
+            except Exception as e:
+                logger.warning(f"⚠️ Skipping unreadable covariance cache {name}: {e}")
+        if self._estimators:
+            logger.info(f"♻️ Loaded {len(self._estimators)} cached covariance universes")
+
+    def persist(self, key: Tuple[str, ...] = None):
+        """Write one (or every) estimator to disk"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        keys = [key] if key else list(self._estimators)
+        for k in keys:
+            self._estimators[k].save(self._path(k))
+
+    def estimator(self, symbols: Sequence[str]) -> CovarianceEstimator:
+        """
+        Smallest cached estimator covering ``symbols``, built on first use and
+        rolled forward with any bars added to the price history since.
+        """
+        with self._lock:
+            candidates = [est for est in self._estimators.values() if est.covers(symbols)]
+            if candidates:
+                est = min(candidates, key=lambda e: len(e.symbols))
+                if self._catch_up(est):
+                    self.persist(self.universe_key(est.symbols))
+                return est
+
+            key = self.universe_key(symbols)
+            dates, prices = load_price_matrix(list(key))
+            est = CovarianceEstimator.from_prices(key, dates, prices, self.lam)
+            self._estimators[key] = est
+            logger.info(f"🧮 Built covariance estimator for {len(key)} symbols from {len(dates)} bars")
+            self.persist(key)
+            return est
+
+    def _catch_up(self, est: CovarianceEstimator) -> bool:
+        """Apply bars newer than the estimator's last date; True if anything changed"""
+        try:
+            dates, prices = load_price_matrix(est.symbols)
+        except (FileNotFoundError, ValueError):
+            return False
+        new = dates > est.last_date if est.last_date is not None else np.ones(dates.size, dtype=bool)
+        for date, row in zip(dates[new], prices[new]):
+            est.update(row, date)
+        return bool(new.any())
+
+    def refresh(self, universes: Sequence[Sequence[str]] = ()) -> int:
+        """
+        Roll every cached estimator forward to the latest files and build the
+        given universes that no estimator covers yet - called after the price
+        history is (re)downloaded, so a cold cache is warm before the first
+        request. Universes without local history are skipped. Returns the
+        number of estimators built or changed.
+        """
+        changed = 0
+        with self._lock:
+            for key, est in self._estimators.items():
+                if self._catch_up(est):
+                    self.persist(key)
+                    changed += 1
+        for symbols in universes:
+            with self._lock:
+                covered = any(est.covers(symbols) for est in self._estimators.values())
+            if covered or not symbols:
+                continue
+            try:
+                self.estimator(symbols)
+                changed += 1
+            except (FileNotFoundError, ValueError) as e:
+                logger.warning(f"⚠️ Covariance cache not warmed for {', '.join(symbols)}: {e}")
+        return changed
+
+    def on_new_bar(self, bar: Dict[str, float], date) -> int:
+        """
+        Push one bar of closes into every universe whose symbols all have a
+        close in it (extra symbols are ignored). Returns the number of
+        estimators updated.
+        """
+        bar = {s.upper(): float(p) for s, p in bar.items()}
+        day = np.datetime64(date, "D")
+        updated = 0
+        with self._lock:
+            for key, est in self._estimators.items():
+                if set(est.symbols) <= bar.keys() and (est.last_date is None or day > est.last_date):
+                    est.update([bar[s] for s in est.symbols], day)
+                    self.persist(key)
+                    updated += 1
+        return updated
+
+    def covariance(self, symbols: Sequence[str], kind: str = "sample") -> np.ndarray:
+        return self.estimator(symbols).covariance(symbols, kind)
+
+    def moments(self, symbols: Sequence[str], kind: str = "sample") -> Tuple[np.ndarray, np.ndarray]:
+        """(mean daily returns, covariance) for ``symbols`` in the given order"""
+        est = self.estimator(symbols)
+        return est.mean_returns(symbols), est.covariance(symbols, kind)
+
+
+_default_cache: Optional[CovarianceCache] = None
+
+
+def get_covariance_cache() -> CovarianceCache:
+    """Process-wide cache shared by all risk tools"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = CovarianceCache()
+        add_bar_listener(_default_cache.on_new_bar)
+    return _default_cache
@@ -0,0 +1,313 @@
+# ============================================
+# evidence_index.py - Inverted Full-Text Index over Compliance Documents
+# ============================================
+"""
+Positional inverted index over compliance reports and evidence documents.
+
+Documents are split into passages at section boundaries (headings such as
+"Requirement 7", "SECTION 404", numbered or all-caps titles); long sections
+are cut into fixed-size line windows that keep their section title. Every
+passage is tokenized once and each term maps to the passages it occurs in
+with its positions. Search scores candidate passages with BM25, plus
+bonuses for adjacent query terms (phrases), for terms in the section title
+and for terms in the document's key or title that the passage itself
+lacks, and returns the top-k passages. Postings are scored as cached NumPy
+arrays, so a query touching every passage still costs a few vector ops.
+
+Documents are keyed by S3 key and ETag: ``update`` re-indexes only new or
+changed documents and drops removed ones, and the index is persisted in
+``EVIDENCE_INDEX_PATH`` so a fresh container starts warm.
+"""
+from collections import defaultdict
+from math import log
+from typing import Dict, Iterable, List, Optional, Tuple
+import heapq
+import logging
+import os
+import pickle
+import re
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EVIDENCE_INDEX_PATH = os.environ.get("EVIDENCE_INDEX_PATH", "/tmp/finops_report_cache/evidence_index.pkl")
+PASSAGE_MAX_LINES = 40
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Bonuses, as fractions of the matched terms' idf
+PHRASE_BONUS = 0.5
+TITLE_BONUS = 0.25
+DOC_CONTEXT_BONUS = 0.5
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:[-'.][a-z0-9]+)*")
+_HEADING = re.compile(
+    r"^(?:#{1,6}\s+\S.*"
+    r"|(?i:section|requirement|part|article|control|finding|appendix)\s+[\w.-]+\b.*"
+    r"|\d+(?:\.\d+)*\.?\s+[A-Z][^.!?]*"
+    r"|[A-Z][A-Z0-9 &/(),'-]{3,}:?)$"
+)
+_RULE = re.compile(r"^[\s=\-_*#─━═│┃┌┐└┘╔╗╚╝║]+$")
+_STOPWORDS = frozenset("a an and are as at be by for from has have in is it of on or that the this to was "
+                       "were what which with did does about".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def _is_heading(line: str) -> bool:
+    return len(line) <= 100 and not line.endswith((".", ",")) and bool(_HEADING.match(line))
+
+
+def split_passages(lines: Iterable[str], max_lines: int = PASSAGE_MAX_LINES) -> List[Dict]:
+    """Passages with their section title and 1-based line range"""
+    passages = []
+    section, start, buffer = "", 1, []
+
+    def flush(end: int):
+        text = "\n".join(buffer).strip()
+        if text:
+            passages.append({"section": section, "start": start, "end": end, "text": text})
+
+    line_no = 0
+    for line_no, raw in enumerate(lines, 1):
+        line = raw.strip()
+        if line and _RULE.match(line):
+            continue
+        if line and _is_heading(line):
+            flush(line_no - 1)
+            section, start, buffer = line.rstrip(":"), line_no, [line]
+            continue
+        if not buffer:
+            start = line_no
+        buffer.append(raw.rstrip())
+        if len(buffer) >= max_lines:
+            flush(line_no)
+            buffer = []
+    flush(line_no)
+    return passages
+
+
+class EvidenceIndex:
+    """Incrementally maintained positional index of document passages"""
+
+    def __init__(self, path: Optional[str] = EVIDENCE_INDEX_PATH):
+        self.path = path
+        self.documents: Dict[str, Dict] = {}                          # key -> {"etag", "passages", "terms"}
+        self.passages: Dict[int, Dict] = {}                           # id -> passage
+        self.postings: Dict[str, Dict[int, List[int]]] = defaultdict(dict)
+        self.total_length = 0
+        self.next_id = 0
+        self._lock = threading.RLock()
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}   # term -> (passage ids, tfs)
+        self._lengths: Optional[np.ndarray] = None
+        if path and os.path.exists(path):
+            self.load()
+
+    # ---- maintenance -----------------------------------------------------
+
+    def add_document(self, key: str, etag: Optional[str], lines: Iterable[str]):
+        with self._lock:
+            self.remove_document(key)
+            ids, touched = [], set()
+            passages = split_passages(lines)
+            title = passages[0]["section"] if passages else ""
+            doc_terms = sorted(set(tokenize(key)) | set(tokenize(title)))
+            for passage in passages:
+                pid = self.next_id
+                self.next_id += 1
+                tokens = tokenize(passage["text"])
+                passage.update(doc=key, length=len(tokens), title_terms=sorted(set(tokenize(passage["section"]))))
+                self.passages[pid] = passage
+                self.total_length += len(tokens)
+                for pos, term in enumerate(tokens):
+                    self.postings[term].setdefault(pid, []).append(pos)
+                touched.update(tokens)
+                ids.append(pid)
+            self.documents[key] = {"etag": etag, "passages": ids, "terms": doc_terms}
+            self._invalidate(touched)
+
+    def remove_document(self, key: str) -> bool:
+        with self._lock:
+            doc = self.documents.pop(key, None)
+            if not doc:
+                return False
+            touched = set()
+            for pid in doc["passages"]:
+                passage = self.passages.pop(pid)
+                self.total_length -= passage["length"]
+                terms = set(tokenize(passage["text"]))
+                touched |= terms
+                for term in terms:
+                    postings = self.postings.get(term)
+                    if postings is not None:
+                        postings.pop(pid, None)
+                        if not postings:
+                            del self.postings[term]
+            self._invalidate(touched)
+            return True
+
+    def _invalidate(self, terms: Iterable[str]):
+        for term in terms:
+            self._arrays.pop(term, None)
+        self._lengths = None
+
+    def _term_arrays(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self.postings.get(term)
+            if not postings:
+                return None
+            arrays = (np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                      np.fromiter((len(p) for p in postings.values()), dtype=float, count=len(postings)))
+            self._arrays[term] = arrays
+        return arrays
+
+    def _passage_lengths(self) -> np.ndarray:
+        if self._lengths is None or self._lengths.size < self.next_id:
+            lengths = np.zeros(self.next_id)
+            for pid, passage in self.passages.items():
+                lengths[pid] = passage["length"]
+            self._lengths = lengths
+        return self._lengths
+
+    def update(self, objects: Iterable, prefix: Optional[str] = None) -> Dict[str, List[str]]:
+        """
+        Sync with cached S3 objects (anything with key, etag and lines()).
+        When ``prefix`` is given, indexed documents under it that are no
+        longer present are removed.
+        """
+        with self._lock:
+            seen, indexed = set(), []
+            for obj in objects:
+                seen.add(obj.key)
+                current = self.documents.get(obj.key)
+                if current and current["etag"] == obj.etag:
+                    continue
+                self.add_document(obj.key, obj.etag, obj.lines())
+                indexed.append(obj.key)
+            removed = []
+            if prefix is not None:
+                removed = [k for k in self.documents if k.startswith(prefix) and k not in seen]
+                for key in removed:
+                    self.remove_document(key)
+            if indexed or removed:
+                logger.info(f"🗂️ Indexed {len(indexed)} document(s), removed {len(removed)}; "
+                            f"{len(self.passages):,} passages, {len(self.postings):,} terms")
+                self.save()
+            return {"indexed": indexed, "removed": removed}
+
+    # ---- search ----------------------------------------------------------
+
+    def search(self, query: str, top_k: int = 5, prefix: str = "") -> List[Dict]:
+        """Top-k passages for a free-text query, best first"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with self._lock:
+            n = len(self.passages)
+            if not n:
+                return []
+            avg_length = self.total_length / n
+            lengths = self._passage_lengths()
+            scores = np.zeros(self.next_id)
+            idf = {}
+            for term in terms:
+                arrays = self._term_arrays(term)
+                if arrays is None:
+                    continue
+                pids, tfs = arrays
+                idf[term] = log(1 + (n - pids.size + 0.5) / (pids.size + 0.5))
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[pids] / avg_length)
+                scores[pids] += idf[term] * tfs * (BM25_K1 + 1) / (tfs + norm)
+
+            matched = np.flatnonzero(scores)
+            if prefix:
+                matched = np.array([pid for pid in matched if self.passages[pid]["doc"].startswith(prefix)],
+                                   dtype=np.int64)
+            if not matched.size:
+                return []
+            k = min(matched.size, max(top_k * 5, 20))
+            candidates = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+
+            ranked = []
+            query_tokens = tokenize(query)
+            for pid in candidates.tolist():
+                passage = self.passages[pid]
+                score = float(scores[pid])
+                title_terms = set(passage["title_terms"])
+                doc_terms = set(self.documents[passage["doc"]]["terms"])
+                for term, weight in idf.items():
+                    if term in title_terms:
+                        score += TITLE_BONUS * weight
+                    elif term in doc_terms and pid not in self.postings[term]:
+                        score += DOC_CONTEXT_BONUS * weight
+                for first, second in self._adjacent_pairs(pid, query_tokens):
+                    score += PHRASE_BONUS * (idf[first] + idf[second])
+                ranked.append((score, pid))
+
+            hits = []
+            for score, pid in heapq.nlargest(top_k, ranked):
+                passage = self.passages[pid]
+                hits.append({"doc": passage["doc"], "section": passage["section"], "start": passage["start"],
+                             "end": passage["end"], "score": round(score, 3), "text": passage["text"]})
+            return hits
+
+    def _adjacent_pairs(self, pid: int, tokens: List[str]) -> List[Tuple[str, str]]:
+        """Query bigrams that occur as adjacent terms in the passage"""
+        pairs = []
+        for first, second in zip(tokens, tokens[1:]):
+            a = self.postings.get(first, {}).get(pid)
+            b = self.postings.get(second, {}).get(pid)
+            if a and b:
+                following = set(b)
+                if any(p + 1 in following for p in a):
+                    pairs.append((first, second))
+        return pairs
+
+    def stats(self) -> Dict:
+        return {"documents": len(self.documents), "passages": len(self.passages), "terms": len(self.postings)}
+
+    # ---- persistence -----------------------------------------------------
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump({"documents": self.documents, "passages": self.passages,
+                             "postings": dict(self.postings), "total_length": self.total_length,
+                             "next_id": self.next_id}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+
+    def load(self):
+        try:
+            with open(self.path, "rb") as f:
+                data = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ Ignoring unreadable evidence index {self.path}: {e}")
+            return
+        with self._lock:
+            self.documents = data["documents"]
+            self.passages = data["passages"]
+            self.postings = defaultdict(dict, data["postings"])
+            self.total_length = data["total_length"]
+            self.next_id = data["next_id"]
+        logger.info(f"♻️ Loaded evidence index: {len(self.documents)} documents, {len(self.passages):,} passages")
+
+
+def format_passages(hits: List[Dict], query: str, max_chars: int = 800) -> str:
+    """Render search hits for the model: source, section, line range and text"""
+    if not hits:
+        return f"\n🔎 No passages found for '{query}'\n"
+    result = f"\n🔎 TOP {len(hits)} PASSAGES for '{query}'\n"
+    for i, hit in enumerate(hits, 1):
+        text = hit["text"] if len(hit["text"]) <= max_chars else hit["text"][:max_chars].rstrip() + " …"
+        section = f" › {hit['section']}" if hit["section"] else ""
+        result += f"\n[{i}] {hit['doc']}{section} (lines {hit['start']}-{hit['end']}, score {hit['score']:.2f})\n"
+        result += f"{text}\n"
+    return result
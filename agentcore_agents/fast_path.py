@@ -0,0 +1,229 @@
+# ============================================
+# fast_path.py - Deterministic Pre-LLM Routing for Agent Entrypoints
+# ============================================
+"""
+Shared fast-path layer for the AgentCore entrypoints.
+
+Each agent registers rules that can answer a request without the model:
+
+  * structured rules fire when the payload (or a JSON prompt) carries the
+    keys they need, e.g. ``{"holdings": {...}, "portfolio_value": ...}``;
+  * text rules fire when one of their precompiled patterns matches the
+    user's question - the prompt up to the data the webapp appends
+    (``=== REAL-TIME FINANCIAL DATA ===`` and similar sections), so the
+    appended transactions or status lines never trigger a rule on their
+    own; rules created with ``match_enrichment=True`` see the whole prompt;
+  * ``{"tool": "<name>", "arguments": {...}}`` calls any registered tool
+    directly.
+
+A rule handler returns the answer text, or ``None`` when it cannot answer
+after all, in which case the next rule is tried and finally the LLM
+fallback. ``{"fast_path": false}`` skips the rules (not direct tool calls)
+for callers that need the model's reasoning over their prompt, such as
+the dependent steps of a supervisor plan.
+
+Every response carries the path it took (``fast:<rule>`` or ``llm``), and
+the router counts hits and latency per path: ``stats()`` returns them, and
+``{"action": "fast_path_stats"}`` returns them together with the tool
+cache counters.
+"""
+from typing import Callable, Dict, Iterable, List, Optional, Pattern
+import json
+import logging
+import re
+import threading
+import time
+
+from tool_cache import get_tool_cache
+
+logger = logging.getLogger(__name__)
+
+STATS_ACTION = "fast_path_stats"
+# Log a hit-rate summary every N requests
+STATS_LOG_INTERVAL = 100
+# Start of a data section appended to the user's question by the webapp
+_ENRICHMENT = re.compile(r"\n[ \t]*=== [A-Z][A-Z &/-]* ===")
+
+Handler = Callable[[str, Dict], Optional[str]]
+
+
+def compile_keywords(words: Iterable[str]) -> Pattern:
+    """One case-insensitive, word-bounded alternation for a keyword list"""
+    alternation = "|".join(sorted((re.escape(w) for w in words), key=len, reverse=True))
+    return re.compile(rf"\b(?:{alternation})\b", re.IGNORECASE)
+
+
+class FastPathRule:
+    """A named handler with the patterns and payload keys that trigger it"""
+
+    def __init__(self, name: str, handler: Handler, patterns: Iterable = (),
+                 payload_keys: Iterable[str] = (), require_all: bool = False, match_enrichment: bool = False):
+        self.name = name
+        self.handler = handler
+        self.patterns = [re.compile(p, re.IGNORECASE) if isinstance(p, str) else p for p in patterns]
+        self.payload_keys = tuple(payload_keys)
+        self.require_all = require_all
+        self.match_enrichment = match_enrichment
+
+    def matches_payload(self, payload: Dict) -> bool:
+        return bool(self.payload_keys) and all(payload.get(k) is not None for k in self.payload_keys)
+
+    def matches_text(self, text: str) -> bool:
+        if not self.patterns:
+            return False
+        hits = (p.search(text) for p in self.patterns)
+        return all(hits) if self.require_all else any(hits)
+
+
+class FastPathRouter:
+    """Tries an agent's deterministic rules before falling back to the LLM"""
+
+    def __init__(self, agent_name: str):
+        self.agent_name = agent_name
+        self.rules: List[FastPathRule] = []
+        self.tools: Dict[str, Callable] = {}
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._llm = 0
+        self._llm_ms = 0.0
+        self._hits: Dict[str, int] = {}
+        self._hit_ms: Dict[str, float] = {}
+        self._declined: Dict[str, int] = {}
+
+    def rule(self, name: str, patterns: Iterable = (), payload_keys: Iterable[str] = (),
+             require_all: bool = False, match_enrichment: bool = False):
+        """Decorator registering ``handler(text, payload) -> Optional[str]``; rules run in registration order"""
+        def register(handler: Handler) -> Handler:
+            self.rules.append(FastPathRule(name, handler, patterns, payload_keys, require_all, match_enrichment))
+            self._hits.setdefault(name, 0)
+            self._hit_ms.setdefault(name, 0.0)
+            self._declined.setdefault(name, 0)
+            return handler
+        return register
+
+    def register_tools(self, *tools: Callable):
+        """Expose tools for direct structured calls"""
+        for t in tools:
+            name = getattr(t, "tool_name", None) or t.__name__
+            self.tools[name] = t
+            key = f"tool:{name}"
+            self._hits.setdefault(key, 0)
+            self._hit_ms.setdefault(key, 0.0)
+            self._declined.setdefault(key, 0)
+
+    @staticmethod
+    def message(payload: Dict) -> str:
+        return payload.get("inputText") or payload.get("prompt") or ""
+
+    @staticmethod
+    def question(text: str) -> str:
+        """The user's own text, without the data sections the webapp appends to it"""
+        match = _ENRICHMENT.search(text)
+        return text[:match.start()] if match else text
+
+    @staticmethod
+    def structured(payload: Dict, text: str) -> Dict:
+        """The payload itself, merged with the prompt when the prompt is a JSON object"""
+        stripped = text.strip()
+        if stripped.startswith("{") and stripped.endswith("}"):
+            try:
+                parsed = json.loads(stripped)
+                if isinstance(parsed, dict):
+                    return {**payload, **parsed}
+            except json.JSONDecodeError:
+                pass
+        return payload
+
+    def answer(self, payload: Dict) -> Optional[Dict]:
+        """Answer from the stats action, a direct tool call or the first matching rule; None if none applies"""
+        started = time.perf_counter()
+        text = self.message(payload)
+        data = self.structured(payload, text)
+
+        if data.get("action") == STATS_ACTION:
+            stats = {**self.stats(), "tool_cache": get_tool_cache().stats()}
+            return {"result": json.dumps(stats, indent=2), "path": f"fast:{STATS_ACTION}"}
+
+        tool = self.tools.get(data.get("tool"))
+        if tool is not None:
+            try:
+                result = tool(**(data.get("arguments") or {}))
+            except Exception as e:
+                logger.error(f"❌ Direct call of tool '{data['tool']}' failed: {e}")
+                result = f"❌ Error calling tool '{data['tool']}': {str(e)}"
+            elapsed = (time.perf_counter() - started) * 1000
+            self._record(f"tool:{data['tool']}", elapsed)
+            return {"result": result, "path": f"fast:tool:{data['tool']}", "elapsed_ms": elapsed}
+
+        if data.get("fast_path") is False:
+            logger.info(f"🤖 {self.agent_name}: fast path bypassed by the caller - passing to agent")
+            return None
+
+        question = self.question(text)
+        structured_rules = [r for r in self.rules if r.matches_payload(data)]
+        text_rules = [r for r in self.rules if r not in structured_rules and text
+                      and r.matches_text(text if r.match_enrichment else question)]
+        for rule in structured_rules + text_rules:
+            try:
+                result = rule.handler(text, data)
+            except Exception as e:
+                logger.warning(f"⚠️ Fast path '{rule.name}' failed ({e}) - trying next route")
+                result = None
+            if result is None:
+                with self._lock:
+                    self._declined[rule.name] += 1
+                continue
+            elapsed = (time.perf_counter() - started) * 1000
+            self._record(rule.name, elapsed)
+            logger.info(f"⚡ {self.agent_name} fast path '{rule.name}' answered in {elapsed:.1f} ms")
+            return {"result": result, "path": f"fast:{rule.name}", "elapsed_ms": elapsed}
+
+        logger.info(f"🤖 {self.agent_name}: no fast path matched - passing to agent")
+        return None
+
+    def handle(self, payload: Dict, fallback: Callable[[str], str]) -> Dict:
+        """Answer from the first matching rule, else from ``fallback(text)`` (the LLM)"""
+        started = time.perf_counter()
+        answered = self.answer(payload)
+        if answered is not None:
+            return answered
+
+        result = fallback(self.message(payload) or "No prompt provided")
+        elapsed = (time.perf_counter() - started) * 1000
+        self.record_llm(elapsed)
+        return {"result": result, "path": "llm", "elapsed_ms": elapsed}
+
+    def record_llm(self, elapsed_ms: float):
+        """Count a request answered by the LLM (for callers that run the fallback themselves)"""
+        self._record(None, elapsed_ms)
+
+    def _record(self, rule_name: Optional[str], elapsed_ms: float):
+        with self._lock:
+            self._requests += 1
+            if rule_name is None:
+                self._llm += 1
+                self._llm_ms += elapsed_ms
+            else:
+                self._hits[rule_name] += 1
+                self._hit_ms[rule_name] += elapsed_ms
+            log_now = self._requests % STATS_LOG_INTERVAL == 0
+        if log_now:
+            logger.info(f"📊 Fast path stats: {json.dumps(self.stats())}")
+
+    def stats(self) -> Dict:
+        """Per-rule hit counts, hit rate and mean latency for each path"""
+        with self._lock:
+            fast = sum(self._hits.values())
+            return {
+                "agent": self.agent_name,
+                "requests": self._requests,
+                "fast_path": fast,
+                "llm": self._llm,
+                "hit_rate": fast / self._requests if self._requests else 0.0,
+                "avg_fast_ms": sum(self._hit_ms.values()) / fast if fast else 0.0,
+                "avg_llm_ms": self._llm_ms / self._llm if self._llm else 0.0,
+                "rules": {
+                    name: {"hits": self._hits[name], "declined": self._declined[name]}
+                    for name in self._hits
+                },
+            }
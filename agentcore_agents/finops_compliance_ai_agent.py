@@ -5,213 +5,207 @@ from strands import Agent, tool
 from strands.models import BedrockModel
 from strands.agent.conversation_manager import SummarizingConversationManager
 from bedrock_agentcore.runtime import BedrockAgentCoreApp
-import boto3
+from collections import Counter
+from typing import List
 import logging
+import os
+import time
+from compliance_reports import compact_summary, missing_report, parse_report, render_dashboard
+from evidence_index import EvidenceIndex, format_passages
+from agent_pool import AgentPool
+from fast_path import FastPathRouter, compile_keywords
+from report_store import ReportStore
+from sanctions_screening import MIN_MATCH_SCORE, SANCTIONS_LIST_PATH, format_screening_report, get_sanctions_index
+from tool_cache import memoize
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Initialize the AgentCore app
 app = BedrockAgentCoreApp()
+router = FastPathRouter("compliance")
+
+_COMPLIANCE_TOPICS = compile_keywords(["compliance", "compliant", "sox", "sarbanes-oxley", "pci", "pci-dss",
+                                       "aml", "anti-money laundering", "audit", "regulatory"])
+_STATUS_REQUEST = compile_keywords(["status", "summary", "summarize", "overview", "dashboard", "action items",
+                                    "deadlines", "scorecard"])
+# Questions about a specific document, evidence or counterparty need search, evidence or screening tools
+_SPECIFIC_REQUEST = compile_keywords(["say", "says", "said", "mention", "mentions", "requirement", "section",
+                                      "control", "finding", "evidence", "workpaper", "workpapers", "document",
+                                      "documents", "quarter", "sanction", "sanctions", "sanctioned", "ofac",
+                                      "counterparty", "counterparties", "screen", "screening", "sar", "why"])
 
 # S3 Configuration
-S3_BUCKET = "agentic-ai-compliance-agent"
+S3_BUCKET = os.environ.get("COMPLIANCE_S3_BUCKET", "agentic-ai-compliance-agent")
+# Evidence corpus (audit workpapers, policies, ... across quarters)
+EVIDENCE_PREFIX = os.environ.get("COMPLIANCE_EVIDENCE_PREFIX", "evidence/")
 COMPLIANCE_FILES = {
     "sox": "sox_compliance_report_2025.txt",
     "pci": "pci_dss_assessment_2025.txt",
     "aml": "aml_monitoring_report_2025.txt"
 }
 
+# Local mirror revalidated with conditional GETs on a shared S3 client
+report_store = ReportStore(S3_BUCKET)
+# Positional full-text index over the reports and the evidence corpus
+evidence_index = EvidenceIndex()
+
+@memoize(ttl=30)
+def fetch_reports() -> dict:
+    """Revalidate every report concurrently - unchanged ones cost a 304, at most every 30s"""
+    objects = report_store.fetch_many(COMPLIANCE_FILES.values())
+    return {report_type: objects[filename] for report_type, filename in COMPLIANCE_FILES.items()}
+
+def report_versions() -> dict:
+    """ETag of every compliance report"""
+    return {report_type: obj.etag for report_type, obj in fetch_reports().items()}
+
+@memoize(ttl=3600, version=lambda args: report_versions())
+def parsed_reports() -> dict:
+    """Structured record per report, parsed once per report version"""
+    records = {}
+    for report_type, obj in fetch_reports().items():
+        if obj.available:
+            records[report_type] = parse_report(report_type, obj.text())
+            logger.info(f"✅ {obj.key}: {obj.status} ({obj.size:,} bytes)")
+        else:
+            records[report_type] = missing_report(
+                report_type, f"Could not retrieve {report_type.upper()} report - {obj.error}")
+    return records
+
 @tool
-def analyze_compliance_reports() -> str:
+@memoize(ttl=900, version=lambda args: report_versions())
+def analyze_compliance_reports(structured: bool = False) -> str:
     """
     Retrieve and analyze compliance reports from S3.
-    Returns a comprehensive compliance status summary.
+    Returns a comprehensive compliance status summary. Set structured=True to get a
+    compact JSON record per report (scores, statuses, deficiencies, SARs, deadlines)
+    instead of the formatted dashboard.
     """
     try:
         logger.info(f"📥 Fetching compliance reports from S3 bucket: {S3_BUCKET}")
+        records = parsed_reports()
+        if structured:
+            return compact_summary(records)
+        return render_dashboard(records, S3_BUCKET)
         
-        # Initialize S3 client
-        s3_client = boto3.client('s3', region_name='us-west-2')
-        
-        reports = {}
-        
-        # Download each compliance report
-        for report_type, filename in COMPLIANCE_FILES.items():
-            try:
-                logger.info(f"📄 Downloading {filename}...")
-                response = s3_client.get_object(Bucket=S3_BUCKET, Key=filename)
-                content = response['Body'].read().decode('utf-8')
-                reports[report_type] = content
-                logger.info(f"✅ Successfully downloaded {filename} ({len(content)} chars)")
-            except Exception as e:
-                logger.error(f"❌ Error downloading {filename}: {e}")
-                reports[report_type] = f"Error: Could not retrieve {report_type.upper()} report - {str(e)}"
-        
-        # Analyze and summarize the reports
-        summary = """
-╔══════════════════════════════════════════════════════════════════════════╗
-║                    COMPLIANCE STATUS DASHBOARD                           ║
-╚══════════════════════════════════════════════════════════════════════════╝
+    except Exception as e:
+        logger.error(f"❌ Error in analyze_compliance_reports: {e}")
+        import traceback
+        logger.error(traceback.format_exc())
+        return f"❌ Error analyzing compliance reports: {str(e)}"
 
-"""
-        
-        # SOX Compliance Summary
-        if "sox" in reports and "Error" not in reports["sox"]:
-            sox_content = reports["sox"]
-            summary += """
-┌─────────────────────────────────────────────────────────────────────────┐
-│ 📊 SOX COMPLIANCE (Sarbanes-Oxley Act)                                  │
-└─────────────────────────────────────────────────────────────────────────┘
-"""
-            # Extract key information
-            if "Overall Compliance Score:" in sox_content:
-                score_line = [line for line in sox_content.split('\n') if "Overall Compliance Score:" in line][0]
-                summary += f"   {score_line.strip()}\n"
-            if "Status:" in sox_content:
-                status_lines = [line for line in sox_content.split('\n') if line.strip().startswith("Status:")]
-                if status_lines:
-                    summary += f"   {status_lines[0].strip()}\n"
-            if "Risk Level:" in sox_content:
-                risk_line = [line for line in sox_content.split('\n') if "Risk Level:" in line][0]
-                summary += f"   {risk_line.strip()}\n"
-            
-            summary += "\n   Key Findings:\n"
-            if "Section 404" in sox_content:
-                summary += "   • Section 404 (Internal Controls): ⚠️  Minor issues identified\n"
-                summary += "     - IT access management needs improvement\n"
-                summary += "     - Database admin privileges require segregation\n"
-            if "MEDIUM PRIORITY" in sox_content:
-                summary += "   • 1 Medium Priority deficiency (Segregation of Duties)\n"
-            if "LOW PRIORITY" in sox_content:
-                summary += "   • 2 Low Priority deficiencies (Password Policy, Audit Logs)\n"
-            
-            summary += "\n   ✅ Action Items:\n"
-            summary += "   • Implement role-based access control - Due: Nov 30, 2025\n"
-            summary += "   • Force password reset for finance users - Due: Oct 31, 2025\n"
-            summary += "   • Enable audit logging in AP system - Due: Dec 15, 2025\n"
-        else:
-            summary += "\n📊 SOX COMPLIANCE: ❌ Report not available\n"
-        
-        summary += "\n"
-        
-        # PCI-DSS Compliance Summary
-        if "pci" in reports and "Error" not in reports["pci"]:
-            pci_content = reports["pci"]
-            summary += """
-┌─────────────────────────────────────────────────────────────────────────┐
-│ 💳 PCI-DSS COMPLIANCE (Payment Card Industry)                           │
-└─────────────────────────────────────────────────────────────────────────┘
-"""
-            if "Report of Compliance (ROC) Status:" in pci_content:
-                summary += "   Report of Compliance (ROC) Status: ✅ COMPLIANT\n"
-            if "Validation Level:" in pci_content:
-                level_line = [line for line in pci_content.split('\n') if "Validation Level:" in line][0]
-                summary += f"   {level_line.strip()}\n"
-            
-            summary += "\n   Assessment Results:\n"
-            summary += "   • 10 out of 12 requirements: ✅ FULLY COMPLIANT\n"
-            summary += "   • 2 requirements: ⚠️  REQUIRE ATTENTION\n"
-            
-            summary += "\n   Issues Identified:\n"
-            summary += "   • Requirement 3 (Protect stored cardholder data):\n"
-            summary += "     - 3 legacy reports contain full PAN data\n"
-            summary += "   • Requirement 7 (Restrict access):\n"
-            summary += "     - 8 terminated employees had active accounts (now disabled)\n"
-            
-            summary += "\n   ✅ Action Items:\n"
-            summary += "   • Remove full PAN from legacy reports - Due: Nov 15, 2025\n"
-            summary += "   • Enhance offboarding process - Due: Oct 31, 2025\n"
-            summary += "   • Implement automated account deactivation\n"
-            
-            summary += "\n   Next Assessment: September 2026\n"
-        else:
-            summary += "\n💳 PCI-DSS COMPLIANCE: ❌ Report not available\n"
+@tool
+def review_compliance_evidence(prefix: str = "", keyword: str = "", max_matches: int = 20) -> str:
+    """
+    Sync and review the compliance evidence documents stored under an S3 prefix
+    (defaults to the configured evidence prefix). Only new or changed documents are downloaded.
+    Reports document counts per folder (e.g. per quarter) and what changed since the last sync;
+    with a keyword, lists matching lines from the documents.
+    """
+    try:
+        prefix = prefix or EVIDENCE_PREFIX
+        sync = report_store.sync(prefix)
+        documents = report_store.cached_objects(prefix)
+        folders = Counter(doc.key[len(prefix):].split("/", 1)[0] if "/" in doc.key[len(prefix):] else "(root)"
+                          for doc in documents)
         
-        summary += "\n"
+        result = f"\n📂 COMPLIANCE EVIDENCE (s3://{S3_BUCKET}/{prefix})\n"
+        result += f"Documents: {sync['objects']:,} | New: {len(sync['added'])} | Changed: {len(sync['changed'])} | "
+        result += f"Removed: {len(sync['removed'])} | Failed: {len(sync['failed'])}\n"
+        if folders:
+            result += "\nBy folder:\n"
+            for folder, count in sorted(folders.items()):
+                result += f"• {folder}: {count} document(s)\n"
+        for label, keys in (("New", sync["added"]), ("Changed", sync["changed"])):
+            if keys:
+                result += f"\n{label} since last sync:\n"
+                result += "".join(f"• {key}\n" for key in keys[:max_matches])
         
-        # AML Compliance Summary
-        if "aml" in reports and "Error" not in reports["aml"]:
-            aml_content = reports["aml"]
-            summary += """
-┌─────────────────────────────────────────────────────────────────────────┐
-│ 🔍 AML MONITORING (Anti-Money Laundering)                               │
-└─────────────────────────────────────────────────────────────────────────┘
-"""
-            if "Overall AML Program Status:" in aml_content:
-                summary += "   Overall AML Program Status: ✅ EFFECTIVE\n"
-            
-            summary += "\n   Q3 2025 Activity:\n"
-            if "Alerts Generated:" in aml_content:
-                summary += "   • Total Alerts: 487 (12 escalated, 2 SARs filed)\n"
-            if "SARs Filed:" in aml_content:
-                summary += "   • Suspicious Activity Reports: 2 filed with FinCEN\n"
-            if "Customer Due Diligence:" in aml_content:
-                summary += "   • Customer Due Diligence: 100% completion rate\n"
-            if "Training Compliance:" in aml_content:
-                summary += "   • Training Compliance: 98% of staff current\n"
-            
-            summary += "\n   Key Alerts:\n"
-            summary += "   • SAR #2025-0891: Structuring activity detected ($450K)\n"
-            summary += "   • SAR #2025-0903: Suspected trade-based money laundering ($2.3M)\n"
-            summary += "   • 2 transactions blocked (OFAC sanctions matches)\n"
-            
-            summary += "\n   ✅ Action Items:\n"
-            summary += "   • Complete AML training for 3 overdue employees - Due: Oct 31\n"
-            summary += "   • Implement enhanced crypto monitoring - Due: Nov 15, 2025\n"
-            summary += "   • Update beneficial ownership procedures - Due: Dec 1, 2025\n"
-        else:
-            summary += "\n🔍 AML MONITORING: ❌ Report not available\n"
+        if keyword:
+            needle = keyword.lower()
+            matches = []
+            for doc in documents:
+                for line_no, line in enumerate(doc.lines(), 1):
+                    if needle in line.lower():
+                        matches.append(f"• {doc.key}:{line_no}: {line.strip()[:200]}")
+                        if len(matches) >= max_matches:
+                            break
+                if len(matches) >= max_matches:
+                    break
+            result += f"\n🔎 Lines mentioning '{keyword}':\n"
+            result += "\n".join(matches) + "\n" if matches else "No matches found\n"
         
-        # Overall Summary
-        summary += """
-
-╔══════════════════════════════════════════════════════════════════════════╗
-║                        OVERALL COMPLIANCE STATUS                         ║
-╚══════════════════════════════════════════════════════════════════════════╝
-
-✅ SOX Compliance: COMPLIANT (94.5% score, minor exceptions)
-✅ PCI-DSS: COMPLIANT (Level 2 Merchant validation)
-✅ AML Program: EFFECTIVE (2 SARs filed, monitoring active)
-
-🎯 PRIORITY ACTIONS (Next 30 Days):
-   1. Complete AML training for overdue employees (Oct 31)
-   2. Force password reset for finance users (Oct 31)
-   3. Enhance employee offboarding process (Oct 31)
-   4. Implement DB admin role segregation (Nov 30)
-   5. Remove PAN data from legacy reports (Nov 15)
-   6. Implement enhanced crypto monitoring (Nov 15)
-
-📊 COMPLIANCE TREND: ↑ IMPROVING
-   - SOX deficiency rate decreased from 7.2% to 5.5%
-   - All critical findings from previous audits resolved
-   - Proactive monitoring and remediation in place
+        return result
+    except Exception as e:
+        logger.error(f"❌ Error in review_compliance_evidence: {e}")
+        return f"❌ Error reviewing compliance evidence: {str(e)}"
 
-🔔 NEXT REVIEWS:
-   - SOX Audit: January 2026
-   - PCI-DSS Assessment: September 2026
-   - AML Program Testing: January 2026
+@memoize(ttl=30)
+def refresh_evidence_index() -> dict:
+    """Sync the evidence prefix and re-index only new or changed documents"""
+    report_store.sync(EVIDENCE_PREFIX)
+    reports = [obj for obj in fetch_reports().values() if obj.available]
+    changes = evidence_index.update(reports + report_store.cached_objects(EVIDENCE_PREFIX), prefix=EVIDENCE_PREFIX)
+    return {**changes, **evidence_index.stats()}
 
-═══════════════════════════════════════════════════════════════════════════
+@tool
+def search_compliance_documents(query: str, top_k: int = 5) -> str:
+    """
+    Full-text search over the SOX, PCI-DSS and AML reports and the evidence documents.
+    Returns the top_k most relevant passages with their document, section and line range,
+    e.g. query "PCI Requirement 7 terminated accounts". Use this to answer specific questions
+    with the exact report text.
+    """
+    try:
+        if not query.strip():
+            return "⚠️ A search query is required"
+        refresh_evidence_index()
+        return format_passages(evidence_index.search(query, top_k=max(1, min(top_k, 20))), query)
+    except Exception as e:
+        logger.error(f"❌ Error in search_compliance_documents: {e}")
+        return f"❌ Error searching compliance documents: {str(e)}"
 
-📎 Full reports available in S3: s3://agentic-ai-compliance-agent/
-"""
+@tool
+def screen_counterparties(counterparties: List[str] = None, transactions: List[dict] = None,
+                          min_score: float = MIN_MATCH_SCORE, max_candidates: int = 3) -> str:
+    """
+    Screen counterparty names against the OFAC sanctions list with fuzzy matching
+    (spelling variants, transliterations, word order, legal-form suffixes).
+    Pass counterparty names, or transactions whose merchant/counterparty fields are screened.
+    Returns scored candidate list matches (0-1) for every name at or above min_score.
+    """
+    try:
+        names = list(counterparties or [])
+        for txn in transactions or []:
+            name = txn.get("counterparty") or txn.get("merchant")
+            if name:
+                names.append(name)
+        names = list(dict.fromkeys(n.strip() for n in names if n and n.strip()))
+        if not names:
+            return "⚠️ No counterparty names provided for screening"
         
-        return summary
+        index = get_sanctions_index()
+        if index is None:
+            return (f"⚠️ Sanctions list not found at {SANCTIONS_LIST_PATH} - download it with "
+                    f"`make sanctions-list` or set SANCTIONS_LIST_PATH")
         
+        started = time.perf_counter()
+        results = index.screen(names, min_score=min_score, max_candidates=max(1, max_candidates))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        return format_screening_report(results, index.stats(), elapsed_ms, min_score)
     except Exception as e:
-        logger.error(f"❌ Error in analyze_compliance_reports: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
-        return f"❌ Error analyzing compliance reports: {str(e)}"
+        logger.error(f"❌ Error in screen_counterparties: {e}")
+        return f"❌ Error screening counterparties: {str(e)}"
+
+# One model client shared by every session's agent
+bedrock_model = BedrockModel(
+    model_id="us.anthropic.claude-3-7-sonnet-20250219-v1:0",
+    temperature=0.0,
+)
 
 def create_agent():
-    """Create the Compliance Agent"""
-    bedrock_model = BedrockModel(
-        model_id="us.anthropic.claude-3-7-sonnet-20250219-v1:0",
-        temperature=0.0,
-    )
-    
+    """Create a Compliance Agent (one per runtime session)"""
     conversation_manager = SummarizingConversationManager(
         summary_ratio=0.5,
         preserve_recent_messages=5,
@@ -226,26 +220,51 @@ When the user asks about compliance, SOX, PCI-DSS, AML, regulations, or audits:
 2. Present the compliance status summary
 3. Highlight critical action items and deadlines
 
-You have access to real compliance reports stored in S3. Always retrieve the latest reports to provide accurate compliance status.""",
-        tools=[analyze_compliance_reports],
+You have access to real compliance reports stored in S3. Always retrieve the latest reports to provide accurate compliance status.
+To answer a specific question (a score, a deadline, a SAR) call analyze_compliance_reports(structured=True),
+which returns compact JSON records instead of the full dashboard.
+For questions about supporting evidence, audit workpapers or documents from past quarters,
+use review_compliance_evidence (optionally with a keyword).
+For questions about what a report or document says on a specific topic (e.g. "what did the PCI
+assessment say about Requirement 7?"), use search_compliance_documents and quote the passages.
+To check counterparties or transactions against the OFAC sanctions list, call screen_counterparties
+with all the names in one call.""",
+        tools=[analyze_compliance_reports, review_compliance_evidence, search_compliance_documents,
+               screen_counterparties],
         conversation_manager=conversation_manager,
     )
     
     return agent
 
-# Create the agent instance
-agent = create_agent()
+# Agent instances per runtime session, built on first use
+pool = AgentPool("compliance", create_agent)
+
+@router.rule("compliance_dashboard", patterns=[_COMPLIANCE_TOPICS, _STATUS_REQUEST], require_all=True)
+def _compliance_dashboard_route(text, data):
+    """Status and summary requests are answered entirely by the S3 report dashboard"""
+    if _SPECIFIC_REQUEST.search(router.question(text)):
+        return None
+    summary = analyze_compliance_reports(structured=data.get("format") == "structured")
+    return None if summary.startswith("❌ Error") else summary
+
+@router.rule("sanctions_screening", payload_keys=("counterparties",))
+def _sanctions_screening_route(text, data):
+    """Bulk screening requests carry the names in the payload and never need the model"""
+    return screen_counterparties(counterparties=data["counterparties"],
+                                 min_score=float(data.get("min_score", MIN_MATCH_SCORE)))
+
+router.register_tools(analyze_compliance_reports, review_compliance_evidence, search_compliance_documents,
+                      screen_counterparties)
 
 # Define the entrypoint for AgentCore
 @app.entrypoint
-def invoke(payload):
-    """Process user input and return a response"""
+async def invoke(payload, context=None):
+    """Process user input and return a response (an event stream when the payload sets "stream")"""
     try:
         user_message = payload.get("inputText") or payload.get("prompt", "No prompt provided")
         logger.info(f"📥 Received compliance query: {user_message[:100]}...")
         
-        result = agent(user_message)
-        return {"result": result.message}
+        return await pool.serve(router, payload, context)
         
     except Exception as e:
         logger.error(f"❌ Error in invoke: {e}")
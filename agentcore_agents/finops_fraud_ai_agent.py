@@ -12,12 +12,25 @@ from strands.agent.conversation_manager import SummarizingConversationManager
 from bedrock_agentcore.runtime import BedrockAgentCoreApp
 import boto3
 import json
+import re
 from typing import List
+from fraud_graph import AccountMerchantGraph, format_ring_report
+from agent_pool import AgentPool
+from fast_path import FastPathRouter
+from tool_cache import memoize
 
 # Initialize the AgentCore app
 app = BedrockAgentCoreApp()
+router = FastPathRouter("fraud_detection")
+
+# "Transaction #n:" blocks as written by the webapp's query enrichment
+_TRANSACTION_BLOCK = re.compile(r'Transaction #\d+:\s*\n((?:[ \t]*-[^\n]*\n?)+)')
+_TRANSACTION_FIELD = re.compile(r'-\s*([A-Za-z ]+):\s*\$?([^\n]+)')
+_FIELD_NAMES = {"account": "account_id", "merchant": "merchant", "amount": "amount",
+                "risk score": "risk_score", "status": "flag", "transaction id": "transaction_id"}
 
 @tool
+@memoize(ttl=300)
 def analyze_transaction_pattern(transactions: List[dict], threshold: float = 0.7) -> str:
     """Analyze transaction patterns for fraud detection"""
     try:
@@ -42,13 +55,35 @@ def analyze_transaction_pattern(transactions: List[dict], threshold: float = 0.7
     except Exception as e:
         return f"Error analyzing transactions: {str(e)}"
 
+@tool
+@memoize(ttl=300)
+def detect_fraud_rings(transactions: List[dict], min_accounts: int = 3, top_n: int = 5) -> str:
+    """
+    Detect coordinated fraud rings: groups of accounts densely linked through
+    shared merchants or counterparties. Each transaction needs account_id and
+    merchant (or counterparty); amount and risk_score are used when present.
+    Returns ranked clusters and high-degree hub merchants.
+    """
+    try:
+        if not transactions:
+            return "⚠️ No transactions provided for ring analysis"
+        
+        graph = AccountMerchantGraph.from_transactions(transactions)
+        hub_degree = graph.hub_threshold()
+        rings = graph.find_rings(min_accounts=min_accounts, hub_degree=hub_degree, top_n=top_n)
+        n_accounts, n_merchants = graph.counts.shape
+        return format_ring_report(rings, graph.hubs(hub_degree), graph.n_transactions, n_accounts, n_merchants)
+    except Exception as e:
+        return f"Error detecting fraud rings: {str(e)}"
+
+# One model client shared by every session's agent
+bedrock_model = BedrockModel(
+    model_id="us.anthropic.claude-3-7-sonnet-20250219-v1:0",
+    temperature=0.0,
+)
+
 def create_agent():
-    """Create the Fraud Detection Agent"""
-    bedrock_model = BedrockModel(
-        model_id="us.anthropic.claude-3-7-sonnet-20250219-v1:0",
-        temperature=0.0,
-    )
-    
+    """Create a Fraud Detection Agent (one per runtime session)"""
     conversation_manager = SummarizingConversationManager(
         summary_ratio=0.5,
         preserve_recent_messages=5,
@@ -59,23 +94,57 @@ def create_agent():
         system_prompt="""You are an enterprise-grade fraud detection AI agent.
 Analyze transactions for fraud, calculate risk scores, and provide actionable recommendations.
 You can access shared context from other agents via memory to make informed decisions.
-When you identify fraud patterns that have compliance implications, note them for other agents.""",
-        tools=[analyze_transaction_pattern],
+When you identify fraud patterns that have compliance implications, note them for other agents.
+When transactions include account and merchant details, use detect_fraud_rings to find coordinated
+groups of accounts and explain why each cluster is suspicious.""",
+        tools=[analyze_transaction_pattern, detect_fraud_rings],
         conversation_manager=conversation_manager,
     )
     
     return agent
 
-# Create the agent instance
-agent = create_agent()
+# Agent instances per runtime session, built on first use
+pool = AgentPool("fraud_detection", create_agent)
+
+def parse_transactions(text: str) -> List[dict]:
+    """Transactions listed as "Transaction #n:" blocks of "- Field: value" lines"""
+    transactions = []
+    for n, block in enumerate(_TRANSACTION_BLOCK.findall(text), 1):
+        txn = {"transaction_id": f"TXN-{n:04d}"}
+        for field, value in _TRANSACTION_FIELD.findall(block):
+            key = _FIELD_NAMES.get(field.strip().lower())
+            if not key:
+                continue
+            value = value.strip()
+            if key in ("amount", "risk_score"):
+                try:
+                    value = float(value.replace(",", ""))
+                except ValueError:
+                    continue
+            txn[key] = value
+        transactions.append(txn)
+    return transactions
+
+def transaction_report(transactions: List[dict]) -> str:
+    """Pattern analysis, plus ring detection when accounts and merchants are known"""
+    report = analyze_transaction_pattern(transactions)
+    if any(t.get("account_id") or t.get("account") for t in transactions) and \
+            any(t.get("merchant") or t.get("counterparty") for t in transactions):
+        report += detect_fraud_rings(transactions)
+    return report
+
+@router.rule("transactions", patterns=[_TRANSACTION_BLOCK], payload_keys=("transactions",))
+def _transactions_route(text, data):
+    transactions = data.get("transactions") or parse_transactions(router.question(text))
+    return transaction_report(transactions) if transactions else None
+
+router.register_tools(analyze_transaction_pattern, detect_fraud_rings)
 
 # Define the entrypoint for AgentCore
 @app.entrypoint
-def invoke(payload):
-    """Process user input and return a response"""
-    user_message = payload.get("prompt", "No prompt provided")
-    result = agent(user_message)
-    return {"result": result.message}
+async def invoke(payload, context=None):
+    """Process user input and return a response (an event stream when the payload sets "stream")"""
+    return await pool.serve(router, payload, context)
 
 # For local testing
 if __name__ == "__main__":
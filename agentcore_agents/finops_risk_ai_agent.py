@@ -5,6 +5,15 @@ from strands import Agent, tool
 from strands.models import BedrockModel
 from strands.agent.conversation_manager import SummarizingConversationManager
 from bedrock_agentcore.runtime import BedrockAgentCoreApp
+from typing import Dict, List
+from risk_engine import VaREngine, format_attribution, format_var_report, normalize_weights, parse_portfolio_request
+from stress_testing import SCENARIO_LIBRARY, StressTestEngine, format_stress_report
+from var_backtest import backtest_portfolios, format_backtest_report
+from portfolio_optimizer import format_rebalance, normalize_holdings, rebalance
+from agent_pool import AgentPool
+from fast_path import FastPathRouter
+from price_history import history_version
+from tool_cache import memoize
 import re
 import logging
 
@@ -13,8 +22,17 @@ logger = logging.getLogger(__name__)
 
 # Initialize the AgentCore app
 app = BedrockAgentCoreApp()
+router = FastPathRouter("risk_analysis")
+
+_K_VALUE_PATTERN = re.compile(r'\$?(\d+)k\b', re.IGNORECASE)
+_NUMBER_VALUE_PATTERN = re.compile(r'\$?([\d,]+)')
+
+def _holdings_version(args):
+    """Price-history results stay valid until the holdings' files are refreshed"""
+    return history_version(sorted(args.get("holdings") or {}))
 
 @tool
+@memoize(ttl=3600)
 def calculate_value_at_risk(portfolio_value: float, volatility: float = 0.15) -> str:
     """Calculate Value at Risk for portfolio"""
     try:
@@ -37,19 +55,127 @@ def calculate_value_at_risk(portfolio_value: float, volatility: float = 0.15) ->
     except Exception as e:
         return f"Error calculating Value at Risk: {str(e)}"
 
+def portfolio_var_report(portfolio_value: float, holdings: Dict[str, float], horizon_days: int = 1,
+                         confidence: float = 0.95, method: str = "all") -> str:
+    """Run the VaR engine on weighted holdings and render the report"""
+    symbols, weights = normalize_weights(holdings)
+    engine = VaREngine.from_price_history(symbols)
+    methods = ("parametric", "historical", "monte_carlo") if method == "all" else (method,)
+    results = engine.calculate(weights, portfolio_value, confidence, horizon_days, methods)
+    report = format_var_report(results, dict(zip(symbols, weights)))
+    if len(symbols) > 1:
+        report += format_attribution(engine.attribution(weights, portfolio_value, confidence, horizon_days))
+    return report
+
+@tool
+@memoize(ttl=900, version=_holdings_version)
+def calculate_portfolio_var(portfolio_value: float, holdings: Dict[str, float], horizon_days: int = 1,
+                            confidence: float = 0.95, method: str = "all") -> str:
+    """
+    Calculate VaR and CVaR (Expected Shortfall) for a multi-asset portfolio from local price history,
+    with component, marginal and incremental VaR for each holding.
+    holdings maps ticker symbols to portfolio weights, e.g. {"SPY": 0.6, "AGG": 0.3, "GLD": 0.1}.
+    horizon_days is in trading days (1 month = 21). method is "parametric", "historical",
+    "monte_carlo" or "all".
+    """
+    try:
+        if portfolio_value <= 0:
+            return "⚠️ Portfolio value must be greater than zero"
+        if not holdings:
+            return "⚠️ At least one holding is required"
+        if not 0.5 < confidence < 1:
+            return "⚠️ Confidence must be between 0.5 and 1"
+        return portfolio_var_report(portfolio_value, holdings, horizon_days, confidence, method)
+    except FileNotFoundError as e:
+        return f"⚠️ {e}"
+    except Exception as e:
+        return f"Error calculating portfolio VaR: {str(e)}"
+
+@tool
+@memoize(ttl=900, version=_holdings_version)
+def stress_test_portfolio(portfolio_value: float, holdings: Dict[str, float], scenarios: List[str] = None,
+                          history_horizon_days: int = 0) -> str:
+    """
+    Stress test a portfolio against historical and hypothetical shock scenarios.
+    holdings maps ticker symbols to weights. scenarios optionally restricts the run to named
+    library scenarios; history_horizon_days > 0 also replays every rolling window of that
+    length from local price history. Returns the worst-case losses and scenario ranking.
+    """
+    try:
+        if portfolio_value <= 0:
+            return "⚠️ Portfolio value must be greater than zero"
+        if not holdings:
+            return "⚠️ At least one holding is required"
+        result = StressTestEngine().run(
+            [{"name": "Portfolio", "value": portfolio_value, "holdings": holdings}],
+            scenario_names=scenarios,
+            history_horizon=history_horizon_days or None,
+        )
+        report = format_stress_report(result)
+        report += f"\nAvailable scenarios: {', '.join(SCENARIO_LIBRARY)}\n"
+        return report
+    except Exception as e:
+        return f"Error running stress test: {str(e)}"
+
+@tool
+@memoize(ttl=3600, version=_holdings_version)
+def backtest_var_model(holdings: Dict[str, float], confidence: float = 0.99, window_days: int = 250,
+                       method: str = "parametric", years: int = 10) -> str:
+    """
+    Backtest the 1-day VaR model for a portfolio over local price history.
+    holdings maps ticker symbols to weights. method is "parametric" or "historical".
+    Reports exceptions, Kupiec POF and Christoffersen independence tests, and the Basel traffic-light zone
+    (only for 99% confidence with at least 250 test days).
+    """
+    try:
+        if not holdings:
+            return "⚠️ At least one holding is required"
+        symbols, weights = normalize_weights(holdings)
+        result = backtest_portfolios(symbols, weights, window=window_days, confidence=confidence,
+                                     method=method, lookback=years * 252 + window_days)
+        name = ", ".join(f"{w * 100:.0f}% {s}" for s, w in zip(symbols, weights))
+        return format_backtest_report(result, [name])
+    except Exception as e:
+        return f"Error backtesting VaR model: {str(e)}"
+
+@tool
+@memoize(ttl=900, version=_holdings_version)
+def optimize_portfolio(holdings: Dict[str, float], objective: str = "min_variance",
+                       target_volatility: float = 0.0, max_weight: float = 1.0) -> str:
+    """
+    Compute rebalancing target weights for a long-only portfolio.
+    holdings maps ticker symbols to current weights (include zero-weight candidates to allow buying them).
+    objective is "min_variance" or "target_risk"; target_volatility is annualized (e.g. 0.10 for 10%).
+    max_weight caps every position (e.g. 0.4 for 40%).
+    """
+    try:
+        if not holdings:
+            return "⚠️ At least one holding is required"
+        holdings = normalize_holdings(holdings)
+        plan = rebalance(list(holdings), holdings, objective, target_volatility or None, max_weight)
+        result = f"\n⚖️ PORTFOLIO REBALANCING ({objective.replace('_', ' ')})\n"
+        result += "Symbol | Current | Target | Trade\n"
+        for symbol in plan["symbols"]:
+            result += (f"{symbol} | {plan['current_weights'][symbol] * 100:.1f}% | "
+                       f"{plan['target_weights'][symbol] * 100:.1f}% | {plan['trades'][symbol] * 100:+.1f}%\n")
+        result += f"\n💡 {format_rebalance(plan)}\n"
+        return result
+    except Exception as e:
+        return f"Error optimizing portfolio: {str(e)}"
+
 def extract_portfolio_value(text):
     """Extract portfolio value from text - handles $100k, $100,000, etc."""
     logger.info(f"Attempting to extract portfolio value from: {text[:100]}...")
     
     # Pattern 1: $100k or 100k format
-    match = re.search(r'\$?(\d+)k\b', text, re.IGNORECASE)
+    match = _K_VALUE_PATTERN.search(text)
     if match:
         value = float(match.group(1)) * 1000
         logger.info(f"✅ Extracted {value} from 'k' pattern")
         return value
     
     # Pattern 2: $100,000 or 100000 format
-    match = re.search(r'\$?([\d,]+)', text)
+    match = _NUMBER_VALUE_PATTERN.search(text)
     if match:
         value_str = match.group(1).replace(',', '')
         if len(value_str) >= 5:  # Only substantial amounts
@@ -60,13 +186,48 @@ def extract_portfolio_value(text):
     logger.info("❌ No portfolio value found")
     return None
 
+# The risk rules also read the portfolio data the webapp appends to vague questions, so they see the whole prompt
+@router.rule("portfolio_var", patterns=[_K_VALUE_PATTERN, _NUMBER_VALUE_PATTERN],
+             payload_keys=("portfolio_value", "holdings"), match_enrichment=True)
+def _portfolio_var_route(text, data):
+    """Holdings and a value known - run the multi-asset engine directly"""
+    if data.get("holdings"):
+        request = {"portfolio_value": float(data["portfolio_value"]), "holdings": data["holdings"],
+                   "horizon_days": int(data.get("horizon_days", 1)),
+                   "confidence": float(data.get("confidence", 0.95))}
+    else:
+        request = parse_portfolio_request(text)
+        request["portfolio_value"] = request["portfolio_value"] or extract_portfolio_value(text)
+    if not (request["portfolio_value"] and request["holdings"]):
+        return None
+    logger.info(f"💰 Portfolio ${request['portfolio_value']:,.0f} with holdings {request['holdings']} - calculating directly")
+    try:
+        return portfolio_var_report(request["portfolio_value"], request["holdings"],
+                                    request["horizon_days"], request["confidence"], data.get("method", "all"))
+    except FileNotFoundError as e:
+        # Say which history is missing rather than falling through to the single-volatility estimate
+        logger.warning(f"⚠️ {e}")
+        return f"⚠️ Cannot calculate a multi-asset VaR: {e}"
+
+@router.rule("single_var", patterns=[_K_VALUE_PATTERN, _NUMBER_VALUE_PATTERN], payload_keys=("portfolio_value",),
+             match_enrichment=True)
+def _single_var_route(text, data):
+    """Only a value known - single-volatility VaR"""
+    portfolio_value = data.get("portfolio_value") or parse_portfolio_request(text)["portfolio_value"] \
+        or extract_portfolio_value(text)
+    if not portfolio_value:
+        return None
+    logger.info(f"💰 Portfolio value found: ${float(portfolio_value):,.0f} - calculating directly")
+    return calculate_value_at_risk(float(portfolio_value), float(data.get("volatility", 0.15)))
+
+# One model client shared by every session's agent
+bedrock_model = BedrockModel(
+    model_id="us.anthropic.claude-3-7-sonnet-20250219-v1:0",
+    temperature=0.0,
+)
+
 def create_agent():
-    """Create the Risk Analysis Agent"""
-    bedrock_model = BedrockModel(
-        model_id="us.anthropic.claude-3-7-sonnet-20250219-v1:0",
-        temperature=0.0,
-    )
-    
+    """Create a Risk Analysis Agent (one per runtime session)"""
     conversation_manager = SummarizingConversationManager(
         summary_ratio=0.5,
         preserve_recent_messages=5,
@@ -74,37 +235,32 @@ def create_agent():
     
     agent = Agent(
         model=bedrock_model,
-        system_prompt="""You are a VaR calculator. When you see portfolio information, extract it and calculate immediately.""",
-        tools=[calculate_value_at_risk],
+        system_prompt="""You are a VaR calculator. When you see portfolio information, extract it and calculate immediately.
+If the holdings and their weights are known, use calculate_portfolio_var; otherwise fall back to calculate_value_at_risk.
+For stress tests or "what if" market shock questions, use stress_test_portfolio.
+To show whether the VaR model is calibrated (backtesting, exceptions, Kupiec, Christoffersen), use backtest_var_model.
+For rebalancing, hedging or risk-reduction recommendations, use optimize_portfolio to give concrete target weights.""",
+        tools=[calculate_portfolio_var, calculate_value_at_risk, stress_test_portfolio, backtest_var_model,
+               optimize_portfolio],
         conversation_manager=conversation_manager,
     )
     
     return agent
 
-# Create the agent instance
-agent = create_agent()
+# Agent instances per runtime session, built on first use
+pool = AgentPool("risk_analysis", create_agent)
+
+router.register_tools(calculate_portfolio_var, calculate_value_at_risk, stress_test_portfolio,
+                      backtest_var_model, optimize_portfolio)
 
 # Define the entrypoint for AgentCore
 @app.entrypoint
-def invoke(payload):
-    """Process user input with PREPROCESSING to extract portfolio value"""
+async def invoke(payload, context=None):
+    """Answer deterministically when the portfolio is known, otherwise ask the agent (streamed on request)"""
     try:
         user_message = payload.get("inputText") or payload.get("prompt", "No prompt provided")
         logger.info(f"📥 Received message: {user_message[:100]}...")
-        
-        # CRITICAL: Extract portfolio value BEFORE sending to agent
-        portfolio_value = extract_portfolio_value(user_message)
-        
-        if portfolio_value:
-            # We found a value - calculate directly, bypass agent
-            logger.info(f"💰 Portfolio value found: ${portfolio_value:,.0f} - calculating directly")
-            result = calculate_value_at_risk(portfolio_value)
-            return {"result": result}
-        else:
-            # No value found - let agent handle it
-            logger.info("🤖 No portfolio value found - passing to agent")
-            result = agent(user_message)
-            return {"result": result.message}
+        return await pool.serve(router, payload, context)
             
     except Exception as e:
         logger.error(f"❌ Error in invoke: {e}")
@@ -120,15 +276,13 @@ if __name__ == "__main__":
         "What's my risk?"
     ]
     
-    print("🧪 Testing extraction locally:\n")
+    print("🧪 Testing fast path locally:\n")
     for query in test_queries:
         print(f"Query: {query}")
-        value = extract_portfolio_value(query)
-        if value:
-            print(f"✅ Extracted: ${value:,.0f}")
-            print(calculate_value_at_risk(value))
-        else:
-            print("❌ No value found - would ask agent")
+        response = router.handle({"inputText": query}, lambda text: "❌ No value found - would ask agent")
+        print(f"Path: {response['path']}")
+        print(response["result"])
         print("-" * 60)
+    print(router.stats())
     
     app.run()
\ No newline at end of file
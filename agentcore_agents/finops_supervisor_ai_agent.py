@@ -10,164 +10,249 @@ from strands import Agent, tool
 from strands.models import BedrockModel
 from strands.agent.conversation_manager import SummarizingConversationManager
 from bedrock_agentcore.runtime import BedrockAgentCoreApp
-from typing import List, Dict
+from typing import Callable, Dict, List, Optional
+from agent_dag import AgentRuntimeInvoker, DagExecutor, DagNode, DagRun, with_upstream
+from portfolio_optimizer import format_rebalance, normalize_holdings, rebalance
+from risk_engine import parse_portfolio_request
+from agent_pool import AgentPool
+from fast_path import FastPathRouter, compile_keywords
+from result_aggregator import RECOMMENDATIONS, StreamingAggregator
+from query_router import AGENT_ORDER, OUT_OF_SCOPE_RESPONSE, get_query_router
+from tool_cache import memoize
 import json
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
 
 # Initialize the AgentCore app
 app = BedrockAgentCoreApp()
+router = FastPathRouter("supervisor")
+
+# Only an explicit request for the plan itself is answered with the plan JSON; questions that merely
+# mention routing or agents go to the model
+_PLAN_REQUEST = compile_keywords(["decompose", "task decomposition", "execution plan", "task plan", "plan only"])
+_BREAKDOWN_REQUEST = re.compile(r"\bbreak\b.{0,40}\binto (?:sub-?)?tasks\b", re.IGNORECASE)
+
+# Specialist AgentCore runtimes, called directly when executing a plan
+SPECIALIST_ARNS = {
+    "fraud_detection": os.environ.get(
+        "FRAUD_AGENT_ARN", "arn:aws:bedrock-agentcore:us-west-2:513826297540:runtime/finops_fraud_ai_agent-cTzcGF6lW7"),
+    "compliance": os.environ.get(
+        "COMPLIANCE_AGENT_ARN", "arn:aws:bedrock-agentcore:us-west-2:513826297540:runtime/finops_compliance_ai_agent-lCD0fT7TCE"),
+    "risk_analysis": os.environ.get(
+        "RISK_AGENT_ARN", "arn:aws:bedrock-agentcore:us-west-2:513826297540:runtime/finops_risk_ai_agent-W2U22y3F6H"),
+}
+invoker = AgentRuntimeInvoker(SPECIALIST_ARNS)
+executor = DagExecutor()
+
+# Compliance review starts from the fraud findings (SAR candidates, sanctions hits) when both run
+_DEPENDENCIES = {"compliance": ["fraud_detection"]}
+
+# Plan steps run on the specialists' model (fast_path=False), so the compliance step can act on the
+# fraud findings passed to it instead of returning the static report dashboard
+_SUBTASKS = {
+    "fraud_detection": "Analyze transactions for fraud patterns and suspicious activities",
+    "compliance": "Identify the regulatory obligations this request raises (SAR filing, sanctions screening, "
+                  "SOX/PCI-DSS/AML controls), taking any fraud findings below into account",
+    "risk_analysis": "Calculate risk metrics and assess portfolio exposure",
+}
+_COMPREHENSIVE_TASKS = {
+    "fraud_detection": "Comprehensive fraud detection scan",
+    "compliance": "Compliance review of the request and any fraud findings below",
+    "risk_analysis": "Risk assessment",
+}
 
 @tool
+@memoize(ttl=3600)
 def decompose_task(query: str) -> str:
     """
     Analyze a financial query and decompose it into subtasks for specialist agents.
     Returns a structured plan with which agents to invoke and in what order.
     """
-    # Analyze query for keywords
-    query_lower = query.lower()
+    # Route with the keyword table shared with the webapp, then the intent classifier
+    routing = get_query_router().route(query, default=AGENT_ORDER)
     
     plan = {
         "original_query": query,
         "subtasks": [],
-        "agent_sequence": [],
-        "priority": "normal"
+        "agent_sequence": routing["agents"],
+        "priority": routing["priority"],
+        "routing": {key: routing[key] for key in ("source", "decision", "confidence") if key in routing}
     }
+    if routing["decision"] == "reject":
+        plan["note"] = OUT_OF_SCOPE_RESPONSE
     
-    # Fraud detection tasks
-    if any(word in query_lower for word in ['fraud', 'suspicious', 'anomaly', 'transaction', 'unusual']):
-        plan["subtasks"].append({
-            "task": "Analyze transactions for fraud patterns and suspicious activities",
-            "agent": "fraud_detection",
-            "priority": 1
-        })
-        plan["agent_sequence"].append("fraud_detection")
-    
-    # Compliance tasks
-    if any(word in query_lower for word in ['compliance', 'sox', 'pci', 'regulation', 'audit', 'regulatory', 'aml', 'kyc']):
-        plan["subtasks"].append({
-            "task": "Check compliance status and regulatory requirements",
-            "agent": "compliance",
-            "priority": 2
-        })
-        plan["agent_sequence"].append("compliance")
-    
-    # Risk analysis tasks
-    if any(word in query_lower for word in ['risk', 'var', 'portfolio', 'volatility', 'market', 'exposure', 'hedge']):
+    # Without a classifier and with no specific keywords, invoke all agents for comprehensive analysis
+    tasks = _COMPREHENSIVE_TASKS if routing["default"] else _SUBTASKS
+    for agent_name in routing["agents"]:
         plan["subtasks"].append({
-            "task": "Calculate risk metrics and assess portfolio exposure",
-            "agent": "risk_analysis",
-            "priority": 3
+            "task": tasks[agent_name],
+            "agent": agent_name,
+            "priority": AGENT_ORDER.index(agent_name) + 1,
+            "depends_on": [d for d in _DEPENDENCIES.get(agent_name, []) if d in routing["agents"]]
         })
-        plan["agent_sequence"].append("risk_analysis")
-    
-    # If no specific keywords, invoke all agents for comprehensive analysis
-    if not plan["agent_sequence"]:
-        plan["subtasks"] = [
-            {"task": "Comprehensive fraud detection scan", "agent": "fraud_detection", "priority": 1},
-            {"task": "Compliance review", "agent": "compliance", "priority": 2},
-            {"task": "Risk assessment", "agent": "risk_analysis", "priority": 3}
-        ]
-        plan["agent_sequence"] = ["fraud_detection", "compliance", "risk_analysis"]
-    
-    # Set priority based on urgency keywords
-    if any(word in query_lower for word in ['urgent', 'immediate', 'critical', 'emergency', 'alert']):
-        plan["priority"] = "high"
     
     return json.dumps(plan, indent=2)
 
 @tool
 def route_to_agent(agent_name: str, subtask: str) -> str:
     """
-    Route a specific subtask to the appropriate specialist agent.
-    This is a placeholder that represents the routing decision.
+    Route a specific subtask to the appropriate specialist agent (fraud_detection,
+    compliance or risk_analysis) and return that agent's response.
     """
-    routing_info = {
-        "target_agent": agent_name,
-        "subtask": subtask,
-        "status": "routed",
-        "context_shared": True
-    }
+    try:
+        if agent_name not in SPECIALIST_ARNS:
+            return f"⚠️ Unknown agent '{agent_name}'. Choose one of: {', '.join(SPECIALIST_ARNS)}"
+        run = executor.execute(DagRun([DagNode(agent_name, lambda upstream: invoker.invoke(agent_name, subtask),
+                                               agent=agent_name, task=subtask)]))
+        node = run.nodes[agent_name]
+        if node.status != "completed":
+            return f"❌ Error routing to {agent_name}: {node.error}"
+        return f"### {agent_name.replace('_', ' ').title()} ({node.duration_ms / 1000:.1f}s)\n\n{node.output}"
+    except Exception as e:
+        logger.error(f"❌ Error in route_to_agent: {e}")
+        return f"❌ Error routing to {agent_name}: {str(e)}"
+
+def _agent_node(subtask: Dict, query: str, aggregator: StreamingAggregator) -> DagNode:
+    agent_name, task = subtask["agent"], subtask["task"]
     
-    return json.dumps(routing_info, indent=2)
+    def run(upstream):
+        try:
+            output = invoker.invoke(agent_name, with_upstream(task, query, upstream),
+                                    on_text=lambda text: aggregator.feed(agent_name, text), fast_path=False)
+        except Exception as e:
+            aggregator.fail(agent_name, str(e))
+            raise
+        aggregator.complete(agent_name)
+        return output
+    return DagNode(agent_name, run, depends_on=subtask.get("depends_on", []), agent=agent_name, task=task)
+
+def build_plan_run(plan: Dict, on_update: Optional[Callable[[Dict], None]] = None) -> DagRun:
+    """
+    Dependency graph for a decompose_task plan: one node per subtask, streaming into a shared
+    aggregator (provisional summaries go to on_update), plus a final aggregation node
+    """
+    aggregator = StreamingAggregator([subtask["agent"] for subtask in plan["subtasks"]], on_update)
+    nodes = [_agent_node(subtask, plan["original_query"], aggregator) for subtask in plan["subtasks"]]
+    if nodes:
+        nodes.append(DagNode("aggregate", lambda upstream: json.dumps(_final_aggregation(aggregator), indent=2),
+                             depends_on=[n.name for n in nodes], task="Aggregate specialist findings"))
+    run = DagRun(nodes)
+    run.context["aggregator"] = aggregator
+    return run
+
+@tool
+def execute_plan(query: str) -> str:
+    """
+    Decompose a financial query and execute the plan end to end: call the specialist agents
+    (independent ones in parallel, dependent ones with upstream findings), then aggregate.
+    Returns every agent's findings, the aggregated report and per-step timing.
+    """
+    try:
+        plan = json.loads(decompose_task(query))
+        if not plan["subtasks"]:
+            return plan.get("note") or "⚠️ No specialist agents apply to this query"
+        
+        run = executor.execute(build_plan_run(plan))
+        summary = run.summary()
+        
+        result = f"\n🧭 EXECUTION PLAN {run.run_id} - {run.status.upper()}\n"
+        result += (f"Wall time: {summary['elapsed_ms'] / 1000:.1f}s | Sum of steps: {summary['sum_of_steps_ms'] / 1000:.1f}s | "
+                   f"Critical path: {' → '.join(summary['critical_path']['nodes'])}\n")
+        result += "\nSteps:\n"
+        for node in summary["nodes"]:
+            after = f" (after {', '.join(node['depends_on'])})" if node["depends_on"] and node["node"] != "aggregate" else ""
+            timing = (f"{node['started_ms'] / 1000:.1f}s → {node['finished_ms'] / 1000:.1f}s"
+                      if node["finished_ms"] is not None else "not run")
+            error = f" - {node['error']}" if node["error"] else ""
+            result += f"• {node['node']}{after}: {node['status']} [{timing}]{error}\n"
+        
+        for node in run.nodes.values():
+            if node.agent and node.status == "completed":
+                result += f"\n### {node.agent.replace('_', ' ').title()}\n\n{node.output}\n"
+        aggregator = run.context["aggregator"]
+        aggregate = run.nodes.get("aggregate")
+        if aggregate is not None and aggregate.status == "completed":
+            result += f"\n### Aggregated Assessment\n\n{aggregate.output}\n"
+        else:
+            result += f"\n### Aggregated Assessment (partial)\n\n{json.dumps(aggregator.summary(), indent=2)}\n"
+        if aggregator.first_summary_ms is not None:
+            result += (f"\nFirst provisional summary after {aggregator.first_summary_ms / 1000:.1f}s "
+                       f"({aggregator.updates} updates)\n")
+        return result
+    except Exception as e:
+        logger.error(f"❌ Error in execute_plan: {e}")
+        return f"❌ Error executing plan: {str(e)}"
 
 @tool
+@memoize(ttl=300)
 def aggregate_results(results: List[Dict]) -> str:
     """
     Aggregate results from multiple specialist agents into a coherent final report.
     Identifies conflicts, synthesizes insights, and provides actionable recommendations.
     """
-    aggregation = {
-        "executive_summary": "",
-        "key_findings": [],
-        "cross_agent_insights": [],
-        "conflicts": [],
-        "recommendations": [],
-        "confidence_score": 0.0
-    }
-    
-    # Analyze results for patterns
-    fraud_found = any("high-risk" in str(r).lower() or "fraud" in str(r).lower() for r in results)
-    compliance_issues = any("violation" in str(r).lower() or "non-compliant" in str(r).lower() for r in results)
-    high_risk = any("high risk" in str(r).lower() or "elevated" in str(r).lower() for r in results)
-    
-    # Build executive summary
-    if fraud_found or compliance_issues or high_risk:
-        aggregation["executive_summary"] = "⚠️ Critical issues identified requiring immediate attention."
-        aggregation["confidence_score"] = 0.85
-    else:
-        aggregation["executive_summary"] = "✅ No critical issues detected. Systems operating within normal parameters."
-        aggregation["confidence_score"] = 0.92
-    
-    # Extract key findings
-    if fraud_found:
-        aggregation["key_findings"].append("Potential fraudulent activities detected")
-    if compliance_issues:
-        aggregation["key_findings"].append("Compliance violations identified")
-    if high_risk:
-        aggregation["key_findings"].append("Elevated risk levels observed")
-    
-    # Cross-agent insights
-    if fraud_found and compliance_issues:
-        aggregation["cross_agent_insights"].append(
-            "Fraud patterns correlate with compliance gaps - suggest integrated remediation"
-        )
-    
-    if fraud_found and high_risk:
-        aggregation["cross_agent_insights"].append(
-            "Fraudulent activities contributing to increased portfolio risk"
-        )
-    
-    # Recommendations
-    if fraud_found:
-        aggregation["recommendations"].append("Immediate transaction review and account freeze for high-risk items")
-    if compliance_issues:
-        aggregation["recommendations"].append("Conduct compliance audit and implement corrective controls")
-    if high_risk:
-        aggregation["recommendations"].append("Rebalance portfolio and implement risk mitigation strategies")
-    
-    return json.dumps(aggregation, indent=2)
+    aggregator = StreamingAggregator()
+    for i, r in enumerate(results):
+        if isinstance(r, dict):
+            name = r.get("agent") or r.get("agent_name") or f"result_{i + 1}"
+            # The agent name itself ("fraud_detection") is not a finding; values keep their line breaks
+            text = "\n".join(str(v) for k, v in r.items() if k not in ("agent", "agent_name"))
+        else:
+            name, text = f"result_{i + 1}", str(r)
+        aggregator.feed(name, text)
+        aggregator.complete(name)
+    return json.dumps(_final_aggregation(aggregator), indent=2)
+
+def _final_aggregation(aggregator: StreamingAggregator) -> Dict:
+    """Aggregator summary with concrete rebalance weights when elevated risk was reported"""
+    aggregation = aggregator.summary()
+    if aggregator.has_issue("risk"):
+        plan = _rebalance_plan([aggregator.text()])
+        if plan:
+            aggregation["rebalance_plan"] = plan
+            aggregation["recommendations"] = [
+                f"{format_rebalance(plan)} and implement risk mitigation strategies" if r == RECOMMENDATIONS["risk"] else r
+                for r in aggregation["recommendations"]
+            ]
+    return aggregation
+
+def _rebalance_plan(results: List[Dict]) -> Dict:
+    """Minimum-variance target weights for holdings mentioned in the specialist results"""
+    holdings = normalize_holdings(parse_portfolio_request(" ".join(str(r) for r in results))["holdings"])
+    if len(holdings) < 2:
+        return {}
+    try:
+        return rebalance(list(holdings), holdings, "min_variance")
+    except Exception as e:
+        logger.warning(f"⚠️ Could not compute rebalance weights: {e}")
+        return {}
 
 @tool
-def monitor_agent_progress(agent_name: str, status: str) -> str:
+def monitor_agent_progress(run_id: str = "", agent_name: str = "") -> str:
     """
-    Monitor the progress of specialist agents during task execution.
-    Tracks completion status and handles failures.
+    Progress of a plan execution (the latest one unless run_id is given): status, start and
+    finish offsets and duration of every step, optionally for one agent only.
     """
-    monitoring = {
-        "agent": agent_name,
-        "status": status,
-        "timestamp": "current",
-        "health": "operational" if status == "completed" else "processing"
-    }
-    
-    return json.dumps(monitoring, indent=2)
+    run = executor.get_run(run_id or None)
+    if run is None:
+        return f"⚠️ No plan execution found{f' with id {run_id}' if run_id else ''}"
+    summary = run.summary()
+    if "aggregator" in run.context:
+        summary["aggregation"] = run.context["aggregator"].summary()
+    if agent_name:
+        summary["nodes"] = [n for n in summary["nodes"] if n["agent"] == agent_name or n["node"] == agent_name]
+    return json.dumps(summary, indent=2)
+
+# One model client shared by every session's agent
+bedrock_model = BedrockModel(
+    model_id="us.anthropic.claude-3-7-sonnet-20250219-v1:0",
+    temperature=0.0,
+)
 
 def create_agent():
-    """Create the Supervisor Agent"""
-    bedrock_model = BedrockModel(
-        model_id="us.anthropic.claude-3-7-sonnet-20250219-v1:0",
-        temperature=0.0,
-    )
-    
+    """Create a Supervisor Agent (one per runtime session)"""
     conversation_manager = SummarizingConversationManager(
         summary_ratio=0.5,
         preserve_recent_messages=5,
@@ -191,10 +276,11 @@ Specialist Agents Available:
 - **risk_analysis**: Calculates VaR, portfolio risk, market volatility, and exposure metrics
 
 Process Flow:
-1. Use decompose_task() to analyze the query and create an execution plan
-2. Use route_to_agent() to assign subtasks to appropriate specialists
-3. Use monitor_agent_progress() to track execution
-4. Use aggregate_results() to synthesize final recommendations
+1. Use execute_plan() to decompose the query, call the specialist agents (in parallel where
+   possible) and aggregate their findings in one step
+2. Use decompose_task() only to show the plan, route_to_agent() to ask one specialist a follow-up
+3. Use monitor_agent_progress() to check step status and timing of a plan execution
+4. Use aggregate_results() to synthesize findings you collected yourself
 
 Communication Style:
 - Be decisive and clear in your orchestration decisions
@@ -204,6 +290,7 @@ Communication Style:
 
 You are the strategic coordinator ensuring comprehensive, accurate financial analysis.""",
         tools=[
+            execute_plan,
             decompose_task,
             route_to_agent,
             aggregate_results,
@@ -214,16 +301,25 @@ You are the strategic coordinator ensuring comprehensive, accurate financial ana
     
     return agent
 
-# Create the agent instance
-agent = create_agent()
+# Agent instances per runtime session, built on first use
+pool = AgentPool("supervisor", create_agent)
+
+@router.rule("aggregate", payload_keys=("results",))
+def _aggregate_route(text, data):
+    return aggregate_results(data["results"]) if isinstance(data["results"], list) else None
+
+@router.rule("decompose", patterns=[_PLAN_REQUEST, _BREAKDOWN_REQUEST], payload_keys=("plan_for",))
+def _decompose_route(text, data):
+    """The plan for {"plan_for": "<query>"} or for a question that asks for its decomposition"""
+    return decompose_task(data.get("plan_for") or router.question(text))
+
+router.register_tools(execute_plan, decompose_task, route_to_agent, aggregate_results, monitor_agent_progress)
 
 # Define the entrypoint for AgentCore
 @app.entrypoint
-def invoke(payload):
-    """Process user input and return a response"""
-    user_message = payload.get("prompt", "No prompt provided")
-    result = agent(user_message)
-    return {"result": result.message}
+async def invoke(payload, context=None):
+    """Process user input and return a response (an event stream when the payload sets "stream")"""
+    return await pool.serve(router, payload, context)
 
 # For local testing
 if __name__ == "__main__":
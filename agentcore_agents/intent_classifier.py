@@ -0,0 +1,280 @@
+# ============================================
+# intent_classifier.py - Offline Intent Classifier for Agent Routing
+# ============================================
+"""
+Small TF-IDF + linear intent classifier that scores a query against every
+specialist agent without a network call or an LLM round-trip.
+
+Features are suffix-stripped word unigrams and bigrams hashed (CRC32) into
+a fixed number of buckets, weighted by sublinear TF x IDF and
+L2-normalized, so no vocabulary has to ship with the model. Each agent has its own one-vs-rest
+logistic model, so a query can score high for several agents (fan-out to
+all of them) or for none (out of scope). Training examples with no labels
+are off-topic negatives.
+
+The trained model is a compressed ``.npz`` (weights, biases, IDF, labels)
+loaded from ``INTENT_MODEL_PATH``; it is small and read-only, so it ships
+in the webapp and in every agent container. Retrain offline with
+
+    python intent_classifier.py train intent_training.jsonl intent_model.npz
+    python intent_classifier.py eval intent_model.npz intent_holdout.jsonl
+    python intent_classifier.py bench intent_model.npz
+
+where the example files hold one ``{"text": ..., "labels": [...]}`` per
+line; ``intent_holdout.jsonl`` is kept out of training.
+"""
+from math import exp, log, sqrt
+from typing import Dict, List, Optional, Sequence
+import json
+import logging
+import os
+import threading
+import zlib
+
+import numpy as np
+from scipy import sparse
+from scipy.optimize import minimize
+
+from query_router import tokenize
+
+logger = logging.getLogger(__name__)
+
+INTENT_MODEL_PATH = os.environ.get(
+    "INTENT_MODEL_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_model.npz")
+)
+HASH_BUCKETS = 1 << 14
+L2_PENALTY = 0.3
+
+# An agent is routed to at ROUTE_THRESHOLD; below it, agents scoring at
+# least FAN_OUT_MARGIN above their prior - the score of a query with no
+# known words, sigmoid(bias) - are all invoked; if none does, reject.
+# A fixed fan-out threshold below a label's prior would send every unknown
+# query to that agent.
+ROUTE_THRESHOLD = 0.5
+FAN_OUT_MARGIN = 0.1
+
+_SUFFIXES = (b"ing", b"ed", b"es", b"s")
+
+
+def _stem(word: bytes) -> bytes:
+    """Crude suffix stripping so "sanctioned" and "sanctions" share a feature"""
+    if len(word) > 4:
+        for suffix in _SUFFIXES:
+            if word.endswith(suffix):
+                return word[:-len(suffix)]
+    return word
+
+
+def _features(text: str, buckets: int) -> Dict[int, float]:
+    """Hashed unigram and bigram counts over stemmed words"""
+    words = [_stem(w) for w in tokenize(text)]
+    counts: Dict[int, float] = {}
+    for gram in words + [a + b" " + b for a, b in zip(words, words[1:])]:
+        bucket = zlib.crc32(gram) % buckets
+        counts[bucket] = counts.get(bucket, 0.0) + 1.0
+    return counts
+
+
+def _tf_matrix(texts: Sequence[str], buckets: int) -> sparse.csr_matrix:
+    indptr, indices, data = [0], [], []
+    for text in texts:
+        counts = _features(text, buckets)
+        indices.extend(counts)
+        data.extend(counts.values())
+        indptr.append(len(indices))
+    matrix = sparse.csr_matrix((np.asarray(data, dtype=np.float32), indices, indptr), shape=(len(texts), buckets))
+    matrix.data = 1 + np.log(matrix.data)   # sublinear tf
+    return matrix
+
+
+def _tfidf(tf: sparse.csr_matrix, idf: np.ndarray) -> sparse.csr_matrix:
+    weighted = tf.multiply(idf.reshape(1, -1)).tocsr()
+    norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1 / norms) @ weighted
+
+
+class IntentClassifier:
+    """One-vs-rest logistic regression over hashed TF-IDF features"""
+
+    def __init__(self, labels: Sequence[str], weights: np.ndarray, bias: np.ndarray, idf: np.ndarray):
+        self.labels = list(labels)
+        self.weights = np.asarray(weights, dtype=np.float32)     # labels x buckets
+        self.weights_t = np.ascontiguousarray(self.weights.T)   # buckets x labels
+        self.bias = np.asarray(bias, dtype=np.float32)
+        self.idf = np.asarray(idf, dtype=np.float32)
+        self.buckets = self.idf.shape[0]
+        # Single queries touch a dozen buckets: plain Python over the (sparse) trained rows
+        # beats a dozen tiny NumPy calls
+        trained = np.flatnonzero(np.any(self.weights_t != 0, axis=1))
+        self._rows = {int(b): tuple(self.weights_t[b].tolist()) for b in trained}
+        self._idf = self.idf.tolist()
+        self._bias = self.bias.tolist()
+        self.priors = {label: 1 / (1 + exp(-b)) for label, b in zip(self.labels, self._bias)}
+
+    # ---- training --------------------------------------------------------
+
+    @classmethod
+    def train(cls, texts: Sequence[str], labels: Sequence[Sequence[str]], label_names: Sequence[str] = None,
+              buckets: int = HASH_BUCKETS, l2: float = L2_PENALTY) -> "IntentClassifier":
+        """Fit on texts with zero or more labels each (no labels = out of scope)"""
+        label_names = list(label_names or sorted({l for ls in labels for l in ls}))
+        tf = _tf_matrix(texts, buckets)
+        document_freq = np.bincount(tf.indices, minlength=buckets)
+        idf = (np.log((1 + len(texts)) / (1 + document_freq)) + 1).astype(np.float32)
+        X = _tfidf(tf, idf)
+        n = X.shape[0]
+
+        weights = np.zeros((len(label_names), buckets), dtype=np.float32)
+        bias = np.zeros(len(label_names), dtype=np.float32)
+        for k, name in enumerate(label_names):
+            y = np.array([1.0 if name in ls else 0.0 for ls in labels])
+
+            def loss(params):
+                w, b = params[:-1], params[-1]
+                z = X @ w + b
+                p = 1 / (1 + np.exp(-z))
+                value = np.sum(np.logaddexp(0, z) - y * z) / n + 0.5 * l2 * w @ w / n
+                grad_w = X.T @ (p - y) / n + l2 * w / n
+                return value, np.append(grad_w, np.sum(p - y) / n)
+
+            result = minimize(loss, np.zeros(buckets + 1), jac=True, method="L-BFGS-B")
+            weights[k], bias[k] = result.x[:-1], result.x[-1]
+        logger.info(f"🧠 Trained intent classifier on {n} examples: {', '.join(label_names)}")
+        return cls(label_names, weights, bias, idf)
+
+    def save(self, path: str = INTENT_MODEL_PATH):
+        np.savez_compressed(path, labels=np.array(self.labels), weights=self.weights.astype(np.float16),
+                            bias=self.bias, idf=self.idf.astype(np.float16))
+
+    @classmethod
+    def load(cls, path: str = INTENT_MODEL_PATH) -> "IntentClassifier":
+        with np.load(path) as data:
+            return cls([str(l) for l in data["labels"]], data["weights"], data["bias"], data["idf"])
+
+    # ---- prediction ------------------------------------------------------
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        """Per-label probabilities for a batch of queries (rows follow ``texts``)"""
+        if not len(texts):
+            return np.zeros((0, len(self.labels)), dtype=np.float32)
+        X = _tfidf(_tf_matrix(texts, self.buckets), self.idf)
+        z = np.asarray(X @ self.weights_t) + self.bias
+        return 1 / (1 + np.exp(-z))
+
+    def scores(self, text: str) -> Dict[str, float]:
+        """Per-label probabilities for one query, without building a sparse matrix"""
+        z = [0.0] * len(self.labels)
+        norm = 0.0
+        for bucket, count in _features(text, self.buckets).items():
+            value = (1 + log(count)) * self._idf[bucket]
+            norm += value * value
+            row = self._rows.get(bucket)
+            if row:
+                for i, weight in enumerate(row):
+                    z[i] += value * weight
+        scale = 1 / sqrt(norm) if norm else 0.0
+        return {label: 1 / (1 + exp(-(z[i] * scale + self._bias[i]))) for i, label in enumerate(self.labels)}
+
+    def decide(self, scores: Dict[str, float], route_threshold: float = ROUTE_THRESHOLD,
+               fan_out_margin: float = FAN_OUT_MARGIN) -> Dict:
+        """
+        Routing decision from label scores: "route" to every confident agent,
+        "fan_out" to every plausible agent (clearly above its prior) when
+        none is confident, or "reject"
+        """
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        confident = [l for l in ranked if scores[l] >= route_threshold]
+        plausible = [l for l in ranked if scores[l] >= self.priors[l] + fan_out_margin]
+        if confident:
+            decision, agents = "route", confident
+        elif plausible:
+            decision, agents = "fan_out", plausible
+        else:
+            decision, agents = "reject", []
+        return {"decision": decision, "agents": agents, "confidence": scores[ranked[0]] if ranked else 0.0,
+                "scores": {l: round(scores[l], 4) for l in ranked}}
+
+    def classify(self, text: str, **thresholds) -> Dict:
+        return self.decide(self.scores(text), **thresholds)
+
+    def classify_batch(self, texts: Sequence[str], **thresholds) -> List[Dict]:
+        probabilities = self.predict_proba(texts)
+        return [self.decide(dict(zip(self.labels, row.tolist())), **thresholds) for row in probabilities]
+
+
+_classifier: Optional[IntentClassifier] = None
+_classifier_lock = threading.Lock()
+_load_failed = False
+
+
+def get_intent_classifier(path: str = None) -> Optional[IntentClassifier]:
+    """The shipped model, loaded once; None when the artifact is missing or unreadable"""
+    global _classifier, _load_failed
+    with _classifier_lock:
+        if _classifier is None and not _load_failed:
+            try:
+                _classifier = IntentClassifier.load(path or INTENT_MODEL_PATH)
+                logger.info(f"🧠 Loaded intent classifier ({', '.join(_classifier.labels)})")
+            except Exception as e:
+                _load_failed = True
+                logger.warning(f"⚠️ Intent classifier unavailable ({e}) - keyword routing only")
+        return _classifier
+
+
+def load_examples(path: str) -> List[Dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(model: IntentClassifier, examples: Sequence[Dict]) -> Dict:
+    """
+    Held-out routing quality: share of in-scope examples whose agents include
+    a correct one (and no rejection), and share of off-topic examples rejected
+    """
+    decisions = model.classify_batch([e["text"] for e in examples])
+    in_scope = [(e, d) for e, d in zip(examples, decisions) if e.get("labels")]
+    off_topic = [(e, d) for e, d in zip(examples, decisions) if not e.get("labels")]
+    routed = [e for e, d in in_scope if set(d["agents"]) & set(e["labels"])]
+    rejected = [e for e, d in off_topic if d["decision"] == "reject"]
+    return {
+        "in_scope_accuracy": len(routed) / len(in_scope) if in_scope else 1.0,
+        "off_topic_rejected": len(rejected) / len(off_topic) if off_topic else 1.0,
+        "errors": [{"text": e["text"], "labels": e.get("labels", []), "decision": d["decision"], "agents": d["agents"]}
+                   for e, d in in_scope + off_topic if e not in routed and e not in rejected],
+    }
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    logging.basicConfig(level=logging.INFO)
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "train" and len(sys.argv) == 4:
+        examples = load_examples(sys.argv[2])
+        model = IntentClassifier.train([e["text"] for e in examples], [e.get("labels", []) for e in examples],
+                                       label_names=["fraud_detection", "compliance", "risk_analysis"])
+        model.save(sys.argv[3])
+        print(f"Saved {sys.argv[3]} ({os.path.getsize(sys.argv[3]):,} bytes)")
+    elif command == "eval" and len(sys.argv) == 4:
+        report = evaluate(IntentClassifier.load(sys.argv[2]), load_examples(sys.argv[3]))
+        print(json.dumps(report, indent=2))
+    elif command == "bench" and len(sys.argv) == 3:
+        model = IntentClassifier.load(sys.argv[2])
+        queries = ["Check these transactions for fraud", "What is our SOX compliance status?",
+                   "Calculate the VaR of my portfolio", "What's the weather like tomorrow?"] * 2500
+        started = time.perf_counter()
+        for q in queries:
+            model.classify(q)
+        single = (time.perf_counter() - started) / len(queries)
+        started = time.perf_counter()
+        model.classify_batch(queries)
+        batch = (time.perf_counter() - started) / len(queries)
+        print(f"single: {single * 1e6:.1f} µs/query | batch of {len(queries):,}: {batch * 1e6:.1f} µs/query")
+        for q in queries[:4]:
+            print(f"{q!r}: {model.classify(q)}")
+    else:
+        print("usage: intent_classifier.py train <examples.jsonl> <model.npz> | eval <model.npz> <examples.jsonl> "
+              "| bench <model.npz>")
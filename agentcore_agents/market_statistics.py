@@ -0,0 +1,143 @@
+# ============================================
+# market_statistics.py - Cross-Asset Correlation and Rolling Statistics
+# ============================================
+"""
+Correlation matrices and rolling volatility for symbol universes from the
+local price history.
+
+Everything is computed on the aligned (T x N) return matrix in a handful of
+array operations: one ``corrcoef`` for the correlation matrix and cumulative
+sums for every rolling window. Results are cached by (symbol set, window,
+as-of date) in a bounded LRU, so repeated dashboard requests for the same
+universe are served without touching the price files.
+"""
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple
+import logging
+import os
+import threading
+
+import numpy as np
+
+from price_history import load_price_matrix, load_series
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS = 252
+CORRELATION_CACHE_SIZE = int(os.environ.get("CORRELATION_CACHE_SIZE", 64))
+
+_cache: "OrderedDict[Tuple, Dict]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def rolling_volatility(returns: np.ndarray, window: int) -> np.ndarray:
+    """Annualized rolling volatility of each column; row t covers returns t .. t + window - 1"""
+    zeros = np.zeros((1, returns.shape[1]))
+    c1 = np.concatenate([zeros, np.cumsum(returns, axis=0)])
+    c2 = np.concatenate([zeros, np.cumsum(returns ** 2, axis=0)])
+    s1 = c1[window:] - c1[:-window]
+    s2 = c2[window:] - c2[:-window]
+    variance = np.maximum((s2 - s1 ** 2 / window) / (window - 1), 0.0)
+    return np.sqrt(variance * TRADING_DAYS)
+
+
+def _resolve_as_of(symbols: Sequence[str], as_of: Optional[str], directory: str = None) -> str:
+    """Latest date every symbol has data for, capped at ``as_of``"""
+    last = min(load_series(s, directory)[0][-1] for s in symbols)
+    if as_of is not None:
+        last = min(last, np.datetime64(as_of, "D"))
+    return str(last)
+
+
+def correlation_statistics(symbols: Sequence[str], window: int = TRADING_DAYS, vol_window: int = 21,
+                           as_of: Optional[str] = None, directory: str = None) -> Dict:
+    """
+    Correlation matrix of daily returns over the last ``window`` days and
+    ``vol_window``-day rolling volatility for every symbol.
+    """
+    symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+    if len(symbols) < 2:
+        raise ValueError("Correlation needs at least two symbols")
+    if vol_window < 2 or window <= vol_window:
+        raise ValueError("window must be larger than vol_window, and vol_window at least 2")
+
+    resolved = _resolve_as_of(symbols, as_of, directory)
+    key = (frozenset(symbols), window, vol_window, resolved)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            return _reorder(cached, symbols)
+
+    dates, prices = load_price_matrix(symbols, lookback=window, as_of=resolved, directory=directory)
+    returns = prices[1:] / prices[:-1] - 1.0
+    if returns.shape[0] <= vol_window:
+        raise ValueError(f"Not enough overlapping history for a {vol_window}-day rolling window")
+
+    std = returns.std(axis=0, ddof=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        correlation = np.corrcoef(returns, rowvar=False)
+    correlation = np.where(np.isfinite(correlation), correlation, 0.0)
+    np.fill_diagonal(correlation, 1.0)
+    rolling = rolling_volatility(returns, vol_window)
+
+    result = {
+        "symbols": symbols,
+        "as_of": str(dates[-1]),
+        "start": str(dates[0]),
+        "window": window,
+        "vol_window": vol_window,
+        "observations": int(returns.shape[0]),
+        "correlation": correlation,
+        "volatility": std * np.sqrt(TRADING_DAYS),
+        "rolling_dates": dates[vol_window:].astype(str),
+        "rolling_volatility": rolling,
+    }
+    logger.info(f"🔗 Correlation for {len(symbols)} symbols over {returns.shape[0]} days")
+
+    with _cache_lock:
+        _cache[key] = result
+        _cache.move_to_end(key)
+        while len(_cache) > CORRELATION_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
+
+
+def _reorder(result: Dict, symbols: Sequence[str]) -> Dict:
+    """Serve a cached result in the caller's symbol order"""
+    if list(symbols) == result["symbols"]:
+        return result
+    index = {s: i for i, s in enumerate(result["symbols"])}
+    idx = [index[s] for s in symbols]
+    return {
+        **result,
+        "symbols": list(symbols),
+        "correlation": result["correlation"][np.ix_(idx, idx)],
+        "volatility": result["volatility"][idx],
+        "rolling_volatility": result["rolling_volatility"][:, idx],
+    }
+
+
+def correlation_payload(result: Dict, top_pairs: int = 10) -> Dict:
+    """JSON-ready form of ``correlation_statistics`` with the most correlated pairs"""
+    symbols = result["symbols"]
+    corr = result["correlation"]
+    upper_i, upper_j = np.triu_indices(len(symbols), k=1)
+    values = corr[upper_i, upper_j]
+    order = np.argsort(-np.abs(values), kind="stable")[:top_pairs]
+    return {
+        "symbols": symbols,
+        "as_of": result["as_of"],
+        "start": result["start"],
+        "window": result["window"],
+        "vol_window": result["vol_window"],
+        "observations": result["observations"],
+        "correlation": np.round(corr, 4).tolist(),
+        "volatility": dict(zip(symbols, np.round(result["volatility"], 4).tolist())),
+        "rolling_volatility": {
+            "dates": result["rolling_dates"].tolist(),
+            "series": dict(zip(symbols, np.round(result["rolling_volatility"].T, 4).tolist())),
+        },
+        "top_pairs": [{"pair": [symbols[upper_i[k]], symbols[upper_j[k]]], "correlation": float(values[k])}
+                      for k in order],
+    }
@@ -0,0 +1,157 @@
+# ============================================
+# monte_carlo.py - Parallel Chunked Monte Carlo Simulation
+# ============================================
+"""
+Monte Carlo VaR / Expected Shortfall simulated in fixed-size chunks.
+
+Chunks are sized from a memory budget rather than a fixed path count: one
+chunk holds a few (paths x horizon x assets) float64 arrays, so the paths per
+chunk are the budget share of each chunk in flight divided by
+``horizon x assets x 8`` bytes (times the arrays alive at once).
+
+Every chunk draws from its own child of one ``numpy.random.SeedSequence``, so
+chunk ``i`` produces the same paths no matter which worker runs it or in what
+order chunks finish. Chunks are dispatched in rounds across a process pool;
+after each round the running VaR/ES and their batch-means confidence
+intervals are updated, and simulation stops as soon as both intervals are
+tighter than the requested relative tolerance.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+from typing import Dict, Optional, Tuple
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 25_000   # upper bound: small problems gain nothing from larger chunks
+MIN_CHUNK_SIZE = 500          # below this the per-chunk tail estimates are too noisy for batch means
+DEFAULT_CHUNKS_PER_ROUND = 8
+MC_MAX_WORKERS = int(os.environ.get("MC_MAX_WORKERS", os.cpu_count() or 1))
+MC_MEMORY_BUDGET = int(os.environ.get("MC_MEMORY_BUDGET_MB", 512)) * 2 ** 20  # bytes for all chunks in flight
+_ARRAYS_PER_PATH = 3          # shocks, shocks @ chol.T and daily are alive together
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+
+
+def _get_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Module-level pool, reused across requests so workers stay warm"""
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != max_workers:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = ProcessPoolExecutor(max_workers=max_workers)
+        _pool_workers = max_workers
+    return _pool
+
+
+def _path_bytes(horizon: int, n_assets: int) -> int:
+    """Peak bytes one simulated path needs while its chunk is being generated"""
+    return _ARRAYS_PER_PATH * max(1, horizon) * max(1, n_assets) * 8
+
+
+def chunk_size_for(horizon: int, n_assets: int, concurrent: int = 1,
+                   budget: int = MC_MEMORY_BUDGET) -> int:
+    """Paths per chunk so that ``concurrent`` chunks in flight fit in ``budget`` bytes"""
+    paths = budget // (max(1, concurrent) * _path_bytes(horizon, n_assets))
+    return int(min(DEFAULT_CHUNK_SIZE, max(MIN_CHUNK_SIZE, paths)))
+
+
+def simulate_portfolio_returns(rng: np.random.Generator, mean: np.ndarray, chol: np.ndarray,
+                               weights: np.ndarray, horizon: int, n_paths: int) -> np.ndarray:
+    """Portfolio horizon returns for ``n_paths`` simulated daily paths"""
+    shocks = rng.standard_normal((n_paths, horizon, mean.size))
+    daily = mean + shocks @ chol.T
+    asset_growth = np.prod(1.0 + daily, axis=1)
+    return (asset_growth - 1.0) @ weights
+
+
+def tail_losses(portfolio_returns: np.ndarray, confidence: float) -> Tuple[float, float]:
+    """(VaR, CVaR) as positive fractional losses from a sample of returns"""
+    losses = -np.asarray(portfolio_returns)
+    var_pct = float(np.quantile(losses, confidence))
+    tail = losses[losses >= var_pct]
+    cvar_pct = float(tail.mean()) if tail.size else var_pct
+    return var_pct, cvar_pct
+
+
+def _simulate_chunk(args) -> np.ndarray:
+    """Worker entry point: one chunk of paths from its own seed stream"""
+    seed_seq, mean, chol, weights, horizon, n_paths = args
+    rng = np.random.default_rng(seed_seq)
+    return simulate_portfolio_returns(rng, mean, chol, weights, horizon, n_paths)
+
+
+def run_monte_carlo(mean: np.ndarray, chol: np.ndarray, weights: np.ndarray, horizon: int,
+                    confidence: float = 0.95, max_paths: int = 1_000_000,
+                    chunk_size: Optional[int] = None, chunks_per_round: int = DEFAULT_CHUNKS_PER_ROUND,
+                    tolerance: float = 0.01, ci_level: float = 0.95, seed: Optional[int] = None,
+                    max_workers: Optional[int] = None, memory_budget: int = MC_MEMORY_BUDGET) -> Dict:
+    """
+    Simulate portfolio returns until VaR and ES converge or ``max_paths`` is hit.
+
+    Convergence: the half-width of the batch-means confidence interval of both
+    VaR and ES, relative to the estimate, is at most ``tolerance``. Results are
+    reproducible for a given ``seed``, ``chunk_size`` and ``chunks_per_round``
+    regardless of ``max_workers``. Without an explicit ``chunk_size`` it is
+    derived from ``memory_budget`` for a full round in flight, so it does not
+    depend on ``max_workers`` either.
+    """
+    max_workers = max_workers or MC_MAX_WORKERS
+    if chunk_size is None:
+        chunk_size = chunk_size_for(horizon, mean.size, chunks_per_round, memory_budget)
+    in_flight = min(chunks_per_round, max_workers) if max_workers > 1 else 1
+    # A floor-sized (or explicit) chunk may not fit ``in_flight`` times: run fewer at once
+    fits = max(1, memory_budget // (chunk_size * _path_bytes(horizon, mean.size)))
+    if fits < in_flight:
+        logger.warning(f"⚠️ Monte Carlo memory budget fits {fits} chunk(s) of {chunk_size:,} paths "
+                       f"at once (horizon {horizon}, {mean.size} assets)")
+        in_flight = fits
+    n_chunks = max(1, -(-max_paths // chunk_size))
+    children = np.random.SeedSequence(seed).spawn(n_chunks)
+    z = NormalDist().inv_cdf(0.5 + ci_level / 2)
+    tasks = [(child, mean, chol, weights, horizon, chunk_size) for child in children]
+
+    samples, chunk_var, chunk_cvar = [], [], []
+    converged = False
+    var_pct = cvar_pct = var_half = cvar_half = float("nan")
+
+    for start in range(0, n_chunks, chunks_per_round):
+        batch = tasks[start:start + chunks_per_round]
+        if in_flight > 1 and len(batch) > 1:
+            # map() yields in submission order, keeping aggregation deterministic
+            pool = _get_pool(max_workers)
+            outputs = [returns for i in range(0, len(batch), in_flight)
+                       for returns in pool.map(_simulate_chunk, batch[i:i + in_flight])]
+        else:
+            outputs = [_simulate_chunk(task) for task in batch]
+
+        for returns in outputs:
+            samples.append(returns)
+            v, c = tail_losses(returns, confidence)
+            chunk_var.append(v)
+            chunk_cvar.append(c)
+
+        var_pct, cvar_pct = tail_losses(np.concatenate(samples), confidence)
+        if len(chunk_var) >= 2:
+            var_half = z * float(np.std(chunk_var, ddof=1)) / np.sqrt(len(chunk_var))
+            cvar_half = z * float(np.std(chunk_cvar, ddof=1)) / np.sqrt(len(chunk_cvar))
+            if var_half <= tolerance * abs(var_pct) and cvar_half <= tolerance * abs(cvar_pct):
+                converged = True
+                break
+
+    n_paths = len(samples) * chunk_size
+    logger.info(f"🎲 Monte Carlo: {n_paths:,} paths, converged={converged}, "
+                f"VaR ±{var_half:.5f}, ES ±{cvar_half:.5f}")
+    return {
+        "var_pct": var_pct,
+        "cvar_pct": cvar_pct,
+        "var_ci_halfwidth": var_half,
+        "cvar_ci_halfwidth": cvar_half,
+        "paths": n_paths,
+        "chunk_size": chunk_size,
+        "converged": converged,
+    }
@@ -0,0 +1,178 @@
+# ============================================
+# price_history.py - Local Price History Store
+# ============================================
+"""
+Loads daily closing prices from local CSV files.
+
+One file per symbol (``<SYMBOL>.csv``) in ``PRICE_HISTORY_DIR``, in the layout
+yfinance/Yahoo exports use: a ``Date`` column plus ``Adj Close`` and/or
+``Close``. The webapp's ``FinancialDataService.save_price_history`` writes
+files in this layout: the webapp refreshes them on startup, and
+``make price-history`` does the same from a shell or cron job. They live
+next to the agents, so ``agentcore launch`` ships them with the container
+and risk calculations never depend on network access at request time.
+A symbol without a file is reported by name rather than papered over.
+
+``append_closes`` adds one day's closes to existing files and tells the
+registered bar listeners (the covariance cache), so estimators roll forward
+by one bar instead of being rebuilt from the full history.
+"""
+from typing import Callable, Dict, List, Sequence, Tuple
+import csv
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PRICE_HISTORY_DIR = os.environ.get(
+    "PRICE_HISTORY_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "price_history")
+)
+
+# symbol -> (file mtime, dates, closes)
+_series_cache: Dict[str, Tuple[float, np.ndarray, np.ndarray]] = {}
+# Called with ({SYMBOL: close}, date) after every append_closes
+_bar_listeners: List[Callable[[Dict[str, float], np.datetime64], object]] = []
+
+
+def _symbol_path(symbol: str, directory: str) -> str:
+    return os.path.join(directory, f"{symbol.upper()}.csv")
+
+
+def available_symbols(directory: str = None) -> List[str]:
+    """Symbols that have a local history file"""
+    directory = directory or PRICE_HISTORY_DIR
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name[:-4].upper() for name in os.listdir(directory) if name.lower().endswith(".csv"))
+
+
+def missing_symbols(symbols: Sequence[str], directory: str = None) -> List[str]:
+    """Symbols (upper-cased) that have no local history file"""
+    directory = directory or PRICE_HISTORY_DIR
+    return [s.upper() for s in symbols if not os.path.exists(_symbol_path(s, directory))]
+
+
+def load_series(symbol: str, directory: str = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Load (dates, closes) for one symbol, re-reading only when the file changes"""
+    directory = directory or PRICE_HISTORY_DIR
+    path = _symbol_path(symbol, directory)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No local price history for {symbol.upper()} in {directory}")
+
+    mtime = os.path.getmtime(path)
+    cached = _series_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1], cached[2]
+
+    dates, closes = [], []
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        column = "Adj Close" if "Adj Close" in (reader.fieldnames or []) else "Close"
+        for row in reader:
+            value = row.get(column)
+            if not value or value in ("null", "NaN"):
+                continue
+            dates.append(row["Date"][:10])
+            closes.append(float(value))
+
+    dates = np.array(dates, dtype="datetime64[D]")
+    closes = np.array(closes, dtype=float)
+    order = np.argsort(dates, kind="stable")
+    dates, closes = dates[order], closes[order]
+
+    _series_cache[path] = (mtime, dates, closes)
+    logger.info(f"📈 Loaded {len(closes)} bars for {symbol.upper()}")
+    return dates, closes
+
+
+def history_version(symbols: Sequence[str], directory: str = None) -> List[float]:
+    """File mtimes for ``symbols`` (0 when missing) - changes whenever the history is refreshed"""
+    directory = directory or PRICE_HISTORY_DIR
+    versions = []
+    for symbol in symbols:
+        path = _symbol_path(symbol, directory)
+        versions.append(os.path.getmtime(path) if os.path.exists(path) else 0.0)
+    return versions
+
+
+def add_bar_listener(listener: Callable[[Dict[str, float], np.datetime64], object]):
+    """Register ``listener(bar, date)`` for bars appended with ``append_closes``"""
+    if listener not in _bar_listeners:
+        _bar_listeners.append(listener)
+
+
+def append_closes(bar: Dict[str, float], date, directory: str = None) -> Dict[str, float]:
+    """
+    Append one day's closes to the symbols' history files (creating missing
+    files) and notify the bar listeners. Closes dated on or before a file's
+    last bar are skipped; returns the closes that were appended.
+    """
+    directory = directory or PRICE_HISTORY_DIR
+    day = np.datetime64(date, "D")
+    os.makedirs(directory, exist_ok=True)
+    appended = {}
+    for symbol, close in bar.items():
+        symbol = symbol.upper()
+        path = _symbol_path(symbol, directory)
+        if os.path.exists(path):
+            dates, _ = load_series(symbol, directory)
+            if dates.size and day <= dates[-1]:
+                continue
+            with open(path, newline="") as f:
+                fieldnames = next(csv.reader(f), None) or ["Date", "Close"]
+        else:
+            fieldnames = ["Date", "Close"]
+        row = {"Date": str(day), "Close": float(close), "Adj Close": float(close)}
+        with open(path, "a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames, restval="", extrasaction="ignore")
+            if f.tell() == 0:
+                writer.writeheader()
+            writer.writerow(row)
+        appended[symbol] = float(close)
+
+    if appended:
+        for listener in list(_bar_listeners):
+            try:
+                listener(appended, day)
+            except Exception as e:
+                logger.warning(f"⚠️ Price bar listener failed: {e}")
+    return appended
+
+
+def load_price_matrix(symbols: Sequence[str], lookback: int = None,
+                      as_of: str = None, directory: str = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Load closes for several symbols aligned on their common trading dates.
+
+    Returns (dates[T], prices[T, N]) with columns in the order of ``symbols``.
+    """
+    if not symbols:
+        raise ValueError("At least one symbol is required")
+    missing = missing_symbols(symbols, directory)
+    if missing:
+        raise FileNotFoundError(f"No price history for {', '.join(missing)} "
+                                f"(refresh {directory or PRICE_HISTORY_DIR} with `make price-history`)")
+
+    series = [load_series(symbol, directory) for symbol in symbols]
+    common = series[0][0]
+    for dates, _ in series[1:]:
+        common = np.intersect1d(common, dates, assume_unique=True)
+    if as_of is not None:
+        common = common[common <= np.datetime64(as_of, "D")]
+    if lookback is not None:
+        common = common[-(lookback + 1):]
+    if common.size < 2:
+        raise ValueError(f"Not enough overlapping history for {', '.join(symbols)}")
+
+    prices = np.empty((common.size, len(symbols)))
+    for j, (dates, closes) in enumerate(series):
+        prices[:, j] = closes[np.searchsorted(dates, common)]
+    return common, prices
+
+
+def simple_returns(prices: np.ndarray, horizon: int = 1) -> np.ndarray:
+    """Overlapping ``horizon``-day simple returns along axis 0"""
+    return prices[horizon:] / prices[:-horizon] - 1.0
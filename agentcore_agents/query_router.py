@@ -0,0 +1,239 @@
+# ============================================
+# query_router.py - Compiled Keyword Router for Specialist Agents
+# ============================================
+"""
+Single source of truth for keyword routing of queries to the specialist
+agents, shared by the webapp (``AgentCoreClient._determine_agents`` and
+``route_query`` in ``finance_webapp_v1.0.py``) and the supervisor's
+``decompose_task``.
+
+The keyword table is compiled into a hashed vocabulary - every keyword
+with its plural forms, mapped to its route - plus a table of multi-word
+phrases keyed by their first word. A query is case- and punctuation-folded
+in one byte-translation pass, split into words and intersected with the
+vocabulary, so matching is word-bounded ("var" no longer fires on
+"various", "stock" on "stockholm") and costs one pass however many
+keywords there are; phrases are only checked when their first word
+occurs. Decisions are cached per normalized query (the joined words) in a
+bounded LRU.
+
+When no keyword matches, the shipped intent classifier (``intent_classifier``)
+scores the query instead of silently defaulting to one agent: confident
+agents are routed to, low-confidence queries fan out to every plausible
+agent, and off-topic ones are rejected without an agent call.
+
+Run ``python query_router.py`` for a benchmark against the substring
+scans it replaces.
+"""
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence
+import threading
+
+AGENT_ORDER = ("fraud_detection", "compliance", "risk_analysis")
+
+AGENT_KEYWORDS: Dict[str, Sequence[str]] = {
+    "fraud_detection": ("fraud", "fraudulent", "transaction", "suspicious", "anomaly", "anomalies",
+                        "unusual", "chargeback"),
+    "compliance": ("compliance", "compliant", "sox", "sarbanes-oxley", "pci", "pci-dss", "regulation",
+                   "regulatory", "audit", "aml", "anti-money laundering", "kyc", "sanction", "ofac"),
+    "risk_analysis": ("risk", "var", "value at risk", "portfolio", "stress", "stress test", "volatility",
+                      "stock", "market", "exposure", "hedge", "calculate"),
+}
+PRIORITY_KEYWORDS = ("urgent", "immediate", "immediately", "critical", "emergency", "alert")
+
+ROUTER_CACHE_SIZE = 4096
+OUT_OF_SCOPE_RESPONSE = ("I can help with fraud detection, compliance (SOX, PCI-DSS, AML, sanctions) and "
+                         "portfolio risk questions. Could you rephrase your request in one of those areas?")
+_PRIORITY = "_priority"
+# Lower-cases ASCII and blanks out ASCII punctuation in one C-level pass over
+# the UTF-8 bytes; non-ASCII bytes are kept so accented words stay intact
+_FOLD = bytes(c if c >= 128 or chr(c).isalnum() else 32 for c in range(256)).lower()
+
+
+def tokenize(text: str) -> List[bytes]:
+    return (text or "").encode("utf-8", "ignore").translate(_FOLD).split()
+
+
+def _forms(word: bytes) -> Iterable[bytes]:
+    yield word
+    yield word + b"s"
+    yield word + b"es"
+    if word.endswith(b"y"):
+        yield word[:-1] + b"ies"
+
+
+class QueryRouter:
+    """Routes a query to agents with a compiled keyword vocabulary and an LRU of decisions"""
+
+    def __init__(self, keywords: Dict[str, Sequence[str]] = None,
+                 priority_keywords: Sequence[str] = PRIORITY_KEYWORDS,
+                 cache_size: int = ROUTER_CACHE_SIZE, classifier=None):
+        self.classifier = classifier
+        self.keywords = dict(keywords or AGENT_KEYWORDS)
+        self.order = [a for a in AGENT_ORDER if a in self.keywords] + \
+                     [a for a in self.keywords if a not in AGENT_ORDER]
+        # word form -> (route, keyword); first word -> [(b" phrase words ", route, keyword)]
+        self.vocabulary: Dict[bytes, tuple] = {}
+        self.phrases: Dict[bytes, List[tuple]] = {}
+        tables = list(self.keywords.items()) + [(_PRIORITY, priority_keywords)]
+        for route, words in tables:
+            for keyword in words:
+                parts = tokenize(keyword)
+                if len(parts) == 1:
+                    for form in _forms(parts[0]):
+                        self.vocabulary.setdefault(form, (route, keyword))
+                else:
+                    for form in _forms(parts[-1]):
+                        phrase = b" ".join(parts[:-1] + [form])
+                        self.phrases.setdefault(parts[0], []).append((b" %s " % phrase, route, keyword))
+
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _scan(self, tokens: List[bytes], text: bytes) -> tuple:
+        """(agents in canonical order, matched keywords per agent, high priority?, classifier decision)"""
+        words = set(tokens)
+        hits = [self.vocabulary[w] for w in words.intersection(self.vocabulary)]
+        starts = words.intersection(self.phrases)
+        if starts:
+            padded = b" %s " % text
+            hits.extend((route, keyword) for w in starts for phrase, route, keyword in self.phrases[w]
+                        if phrase in padded)
+
+        matched: Dict[str, List[str]] = {}
+        urgent = False
+        for route, keyword in hits:
+            if route == _PRIORITY:
+                urgent = True
+            elif keyword not in matched.setdefault(route, []):
+                matched[route].append(keyword)
+        agents = tuple(a for a in self.order if a in matched)
+        intent = None
+        if not agents and self.classifier is not None:
+            intent = self.classifier.classify(text.decode("utf-8", "ignore"))
+        return agents, {a: tuple(sorted(w)) for a, w in matched.items()}, urgent, intent
+
+    def _decision(self, query: str) -> tuple:
+        tokens = tokenize(query)
+        key = b" ".join(tokens)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+        decision = self._scan(tokens, key)
+        if self.cache_size:
+            with self._lock:
+                self._cache[key] = decision
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return decision
+
+    def route(self, query: str, default: Optional[Sequence[str]] = ("fraud_detection",)) -> Dict:
+        """
+        Agents to invoke for ``query``, in canonical order.
+
+        When no keyword matches, the classifier decides (``decision`` is
+        "route", "fan_out" or "reject" - the latter with no agents); without
+        a classifier ``default`` is used (the webapp falls back to fraud
+        detection, the supervisor to every agent).
+        """
+        agents, matched, urgent, intent = self._decision(query)
+        routing = {
+            "agents": list(agents),
+            "matched": {a: list(w) for a, w in matched.items()},
+            "priority": "high" if urgent else "normal",
+            "source": "keywords",
+            "decision": "route",
+            "default": False,
+        }
+        if not agents:
+            if intent is not None:
+                routing.update(agents=list(intent["agents"]), source="classifier", decision=intent["decision"],
+                               confidence=round(intent["confidence"], 4), scores=intent["scores"])
+            else:
+                routing.update(agents=list(default or []), source="default", default=True)
+        return routing
+
+    def agents_for(self, query: str, default: Optional[Sequence[str]] = ("fraud_detection",)) -> List[str]:
+        return self.route(query, default)["agents"]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses,
+                    "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+_router: Optional[QueryRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_query_router() -> QueryRouter:
+    """Process-wide router, with the shipped intent classifier when it can be loaded"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            from intent_classifier import get_intent_classifier
+            _router = QueryRouter(classifier=get_intent_classifier())
+        return _router
+
+
+# ---- benchmark -----------------------------------------------------------
+
+def _legacy_determine_agents(query: str) -> List[str]:
+    """The substring scans this module replaces (webapp AgentCoreClient version)"""
+    query_lower = query.lower()
+    agents = []
+    if any(word in query_lower for word in ['fraud', 'transaction', 'suspicious', 'anomaly']):
+        agents.append('fraud_detection')
+    if any(word in query_lower for word in ['compliance', 'sox', 'pci', 'regulation', 'regulatory']):
+        agents.append('compliance')
+    if any(word in query_lower for word in ['risk', 'var', 'portfolio', 'stress', 'volatility', 'stock', 'calculate']):
+        agents.append('risk_analysis')
+    return agents or ['fraud_detection']
+
+
+if __name__ == "__main__":
+    import random
+    import time
+
+    samples = [
+        "Check these transactions for fraud and tell me if anything looks suspicious",
+        "What is our SOX and PCI-DSS compliance status?",
+        "Calculate the 99% VaR for a $2M portfolio of AAPL, MSFT and GOOGL",
+        "Run a stress test on the portfolio and review the AML audit findings",
+        "URGENT: unusual wire activity from accounts in various regions, hedge our market exposure",
+        "Give me an overview of last quarter",
+        "Summarize the regulatory changes affecting our stockholm office",
+    ]
+    random.seed(42)
+    filler = "please review the attached quarterly summary for our finance team and advise".split()
+    queries = [f"{random.choice(samples)} {' '.join(random.choices(filler, k=random.randint(5, 40)))}"
+               for _ in range(20000)]
+
+    def bench(label: str, fn, items):
+        started = time.perf_counter()
+        for q in items:
+            fn(q)
+        elapsed = time.perf_counter() - started
+        print(f"{label:<34} {len(items) / elapsed:>12,.0f} queries/s  ({elapsed * 1e6 / len(items):.2f} µs/query)")
+
+    print(f"Routing {len(queries):,} queries ({len(set(queries)):,} distinct)\n")
+    bench("substring scans (legacy)", _legacy_determine_agents, queries)
+    bench("compiled router, cold cache", QueryRouter(cache_size=0).agents_for, queries)
+    router = QueryRouter()
+    router_warm = [random.choice(samples) for _ in range(20000)]
+    bench("compiled router, repeated queries", router.agents_for, router_warm)
+    print(f"\nDecision cache: {router.stats()}")
+
+    print("\nRouting differences (legacy -> compiled):")
+    for q in samples:
+        old, new = _legacy_determine_agents(q), get_query_router().agents_for(q)
+        if old != new:
+            print(f"  {q[:60]!r}: {old} -> {new}")
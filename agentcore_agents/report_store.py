@@ -0,0 +1,245 @@
+# ============================================
+# report_store.py - Cached, Conditional S3 Report Fetching
+# ============================================
+"""
+Local on-disk mirror of S3 objects revalidated with conditional GETs.
+
+Every fetch sends ``If-None-Match`` with the cached ETag, so an unchanged
+object costs a 304 and no body transfer; changed bodies are streamed to
+disk in chunks rather than read into memory. Fetches for several keys run
+concurrently on one pooled, module-level S3 client. When S3 is unreachable
+the last cached copy is served.
+
+``sync(prefix)`` mirrors a whole prefix: it pages through the listing,
+compares every ETag with a local manifest of object versions and fetches
+only new or changed objects on a bounded worker pool, so a repeated sync
+of an unchanged corpus costs the LIST calls alone. Cached objects are read
+back line by line.
+
+``S3_ENDPOINT_URL`` points the client at a local S3 stand-in (MinIO,
+``moto_server``, LocalStack) for testing.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional
+import hashlib
+import json
+import logging
+import os
+import threading
+
+import boto3
+from botocore.config import Config as BotoConfig
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+S3_REGION = os.environ.get("AWS_REGION", "us-west-2")
+S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL") or None
+S3_MAX_WORKERS = int(os.environ.get("S3_MAX_WORKERS", 8))
+REPORT_CACHE_DIR = os.environ.get("REPORT_CACHE_DIR", "/tmp/finops_report_cache")
+STREAM_CHUNK_BYTES = 1 << 20
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_s3_client():
+    """Process-wide S3 client; its connection pool is shared by all fetch threads"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = boto3.client(
+                "s3",
+                region_name=S3_REGION,
+                endpoint_url=S3_ENDPOINT_URL,
+                config=BotoConfig(max_pool_connections=max(S3_MAX_WORKERS, 10),
+                                  retries={"max_attempts": 3, "mode": "standard"}),
+            )
+        return _client
+
+
+class CachedObject:
+    """An S3 object mirrored on local disk"""
+
+    def __init__(self, key: str, etag: Optional[str], path: str, size: int = 0,
+                 status: str = "cached", error: Optional[str] = None):
+        self.key = key
+        self.etag = etag
+        self.path = path
+        self.size = size
+        # "downloaded", "not_modified", "stale" (S3 failed, cached copy served) or "missing"
+        self.status = status
+        self.error = error
+
+    @property
+    def available(self) -> bool:
+        return self.status != "missing"
+
+    def text(self) -> str:
+        with open(self.path, encoding="utf-8") as f:
+            return f.read()
+
+    def lines(self) -> Iterator[str]:
+        """Stream the cached body one line at a time"""
+        with open(self.path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                yield line.rstrip("\n")
+
+
+class ReportStore:
+    """Conditional-GET mirror of objects in one bucket"""
+
+    def __init__(self, bucket: str, cache_dir: str = REPORT_CACHE_DIR, client=None,
+                 max_workers: int = S3_MAX_WORKERS):
+        self.bucket = bucket
+        self.cache_dir = os.path.join(cache_dir, bucket)
+        self.client = client
+        self.max_workers = max_workers
+        self.manifest_path = os.path.join(self.cache_dir, "manifest.json")
+        self._manifest_lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _s3(self):
+        return self.client or get_s3_client()
+
+    def _paths(self, key: str):
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        base = os.path.join(self.cache_dir, digest)
+        return f"{base}.body", f"{base}.json"
+
+    def _cached(self, key: str) -> Optional[Dict]:
+        body_path, meta_path = self._paths(key)
+        if not (os.path.exists(body_path) and os.path.exists(meta_path)):
+            return None
+        with open(meta_path) as f:
+            return json.load(f)
+
+    def fetch(self, key: str) -> CachedObject:
+        """Revalidate one object; download the body only when it changed"""
+        body_path, meta_path = self._paths(key)
+        meta = self._cached(key)
+        request = {"Bucket": self.bucket, "Key": key}
+        if meta and meta.get("etag"):
+            request["IfNoneMatch"] = meta["etag"]
+
+        try:
+            response = self._s3().get_object(**request)
+        except ClientError as e:
+            code = e.response.get("Error", {}).get("Code")
+            status = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+            if meta and (code in ("304", "NotModified") or status == 304):
+                return CachedObject(key, meta["etag"], body_path, meta.get("size", 0), "not_modified")
+            return self._fallback(key, meta, body_path, e)
+        except Exception as e:
+            return self._fallback(key, meta, body_path, e)
+
+        tmp_path = f"{body_path}.tmp"
+        size = 0
+        with open(tmp_path, "wb") as f:
+            for chunk in response["Body"].iter_chunks(STREAM_CHUNK_BYTES):
+                f.write(chunk)
+                size += len(chunk)
+        os.replace(tmp_path, body_path)
+        etag = response.get("ETag")
+        with open(meta_path, "w") as f:
+            json.dump({"key": key, "etag": etag, "size": size,
+                       "last_modified": str(response.get("LastModified"))}, f)
+        logger.info(f"✅ Downloaded s3://{self.bucket}/{key} ({size:,} bytes)")
+        return CachedObject(key, etag, body_path, size, "downloaded")
+
+    def _fallback(self, key: str, meta: Optional[Dict], body_path: str, error: Exception) -> CachedObject:
+        if meta:
+            logger.warning(f"⚠️ Serving cached s3://{self.bucket}/{key} - revalidation failed: {error}")
+            return CachedObject(key, meta.get("etag"), body_path, meta.get("size", 0), "stale", str(error))
+        logger.error(f"❌ Error downloading s3://{self.bucket}/{key}: {error}")
+        return CachedObject(key, None, body_path, 0, "missing", str(error))
+
+    def fetch_many(self, keys: Iterable[str]) -> Dict[str, CachedObject]:
+        """Revalidate several objects concurrently"""
+        keys = list(keys)
+        if len(keys) <= 1:
+            return {key: self.fetch(key) for key in keys}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(keys))) as pool:
+            return dict(zip(keys, pool.map(self.fetch, keys)))
+
+    # ---- prefix sync -----------------------------------------------------
+
+    def list_objects(self, prefix: str = "") -> Iterator[Dict]:
+        """Every object under ``prefix``, following pagination"""
+        paginator = self._s3().get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for item in page.get("Contents", []):
+                if item["Key"].endswith("/"):
+                    continue
+                yield {"key": item["Key"], "etag": item.get("ETag"), "size": item.get("Size", 0),
+                       "last_modified": str(item.get("LastModified"))}
+
+    def load_manifest(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def _save_manifest(self, manifest: Dict[str, Dict]):
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def sync(self, prefix: str = "") -> Dict:
+        """
+        Bring the local mirror of ``prefix`` up to date.
+
+        Returns the keys that were added, changed, removed, failed or left
+        unchanged since the previous sync.
+        """
+        with self._manifest_lock:
+            manifest = self.load_manifest()
+            listed = {item["key"]: item for item in self.list_objects(prefix)}
+            previous = {k: v for k, v in manifest.items() if k.startswith(prefix)}
+
+            added = [k for k in listed if k not in previous]
+            changed = [k for k in listed if k in previous and previous[k].get("etag") != listed[k]["etag"]]
+            removed = [k for k in previous if k not in listed]
+            unchanged = [k for k in listed if k in previous and k not in changed]
+
+            fetched = self.fetch_many(added + changed)
+            failed = [k for k, obj in fetched.items() if obj.status in ("missing", "stale")]
+            for key in added + changed:
+                if key not in failed:
+                    obj = fetched[key]
+                    manifest[key] = {**listed[key], "etag": obj.etag, "size": obj.size}
+            for key in removed:
+                manifest.pop(key, None)
+                for path in self._paths(key):
+                    if os.path.exists(path):
+                        os.remove(path)
+            self._save_manifest(manifest)
+
+        logger.info(f"🔄 Synced s3://{self.bucket}/{prefix}: {len(listed)} objects, "
+                    f"{len(added)} new, {len(changed)} changed, {len(removed)} removed, {len(failed)} failed")
+        return {
+            "prefix": prefix,
+            "objects": len(listed),
+            "added": added,
+            "changed": [k for k in changed if k not in failed],
+            "removed": removed,
+            "failed": failed,
+            "unchanged": unchanged,
+        }
+
+    def cached_objects(self, prefix: str = "") -> List[CachedObject]:
+        """Locally mirrored objects under ``prefix`` as of the last sync"""
+        objects = []
+        for key, meta in sorted(self.load_manifest().items()):
+            if key.startswith(prefix):
+                body_path, _ = self._paths(key)
+                if os.path.exists(body_path):
+                    objects.append(CachedObject(key, meta.get("etag"), body_path, meta.get("size", 0)))
+        return objects
+
+    def stream_lines(self, key: str) -> Iterator[str]:
+        """Read an object straight from S3 line by line, without caching it"""
+        response = self._s3().get_object(Bucket=self.bucket, Key=key)
+        for line in response["Body"].iter_lines(STREAM_CHUNK_BYTES):
+            yield line.decode("utf-8", errors="replace")
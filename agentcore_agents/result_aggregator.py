@@ -0,0 +1,263 @@
+# ============================================
+# result_aggregator.py - Incremental Aggregation of Streamed Agent Results
+# ============================================
+"""
+Aggregates specialist agent outputs as they stream in instead of after all
+of them have finished.
+
+Every signal the supervisor looks for - fraud, compliance violations,
+elevated risk, and their "all clear" counterparts - is one alternative of a
+single compiled, word-bounded pattern, so each line of output is scanned
+once no matter how many signals there are. Agent output is consumed line
+by line as it streams in (the unfinished line is held back until its end
+arrives), so a phrase split across chunks is still found whole.
+
+A negated term flips its kind: "no signs of fraud", "not fraudulent",
+"zero violations", "didn't find any high-risk transactions" or a count of
+zero ("High-Risk Transactions: 0") are all-clear signals, and "not fully
+compliant" is an issue. Headings - markdown headings, bold or ALL-CAPS
+title lines and short "Label:" lines such as "🔍 FRAUD DETECTION ANALYSIS" -
+name a topic rather than report a finding and are skipped.
+
+Findings, conflicts (one agent reports an issue another agent reports as
+clear), recommendations and the confidence score are kept current after
+every line. A provisional summary is published to ``on_update`` as soon
+as the first agent reports and again whenever the picture changes; the
+summary is final once every expected agent has completed or failed.
+"""
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import functools
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# (domain, kind, pattern) - terms are matched as whole words in lower-cased lines
+SIGNAL_PATTERNS = (
+    ("fraud", "issue", r"fraud(?:ulent)?(?: activit(?:y|ies)| transactions?| patterns?| rings?)?"
+                       r"|high-risk (?:transactions?|accounts?|merchants?)"
+                       r"|suspicious (?:activit(?:y|ies)|transactions?|clusters?|patterns?)|account takeovers?"),
+    ("compliance", "clear", r"(?:fully )?compliant|in compliance"),
+    ("compliance", "issue", r"non-?complian(?:t|ce)|violations?|breach(?:es)? of"),
+    ("risk", "clear", r"low risk|within (?:risk |var |concentration )?limits?"),
+    ("risk", "issue", r"high risk|elevated(?: risk| volatility| exposure)?|limit breach(?:es)?"
+                      r"|(?:exceeds?|breach(?:es|ed)?) (?:the |its |our )?(?:risk |var |concentration )?limits?"),
+)
+_SIGNALS = re.compile(r"\b(?:%s)\b" % "|".join(pattern for _, _, pattern in SIGNAL_PATTERNS))
+_CLASSIFIERS = [(domain, kind, re.compile(pattern)) for domain, kind, pattern in SIGNAL_PATTERNS]
+# A negation up to three words before a term ("no signs of", "not", "zero", "didn't find any") ...
+_NEGATION_BEFORE = re.compile(r"\b(?:no|not|zero|without|never|none|nor|free of|0|\w+n't)"
+                              r"(?:[ -]+[\w'-]+){0,3}[ -]*$")
+# ... or a zero count right after it ("High-Risk Transactions: 0", "violations found: none")
+_ZERO_AFTER = re.compile(r"\s*(?:detected|found|flagged|identified)?\s*:\s*(?:0|none|no)\b")
+_NEGATION_WINDOW = 48
+_HEADING_WORDS = 5
+# Lines are scanned when complete; a line longer than this is scanned up to its last space
+_MAX_PENDING = 4096
+_FLIPPED = {"issue": "clear", "clear": "issue"}
+
+
+@functools.lru_cache(maxsize=256)
+def _classify(phrase: str) -> Tuple[str, str]:
+    return next((domain, kind) for domain, kind, pattern in _CLASSIFIERS if pattern.fullmatch(phrase))
+
+
+def is_heading(line: str) -> bool:
+    """Markdown heading, bold or ALL-CAPS title line, or a short "Label:" line"""
+    stripped = line.strip()
+    if not stripped:
+        return False
+    if stripped.startswith("#") or (stripped.startswith("**") and stripped.rstrip(":").endswith("**")):
+        return True
+    letters = [c for c in stripped if c.isalpha()]
+    if letters and not any(c.islower() for c in letters) and not any(c.isdigit() for c in stripped):
+        return True
+    return stripped.endswith(":") and len(stripped.split()) <= _HEADING_WORDS
+
+
+def scan_signals(text: str) -> List[Tuple[str, str]]:
+    """(domain, kind) of every signal in ``text``, line by line, with negations flipped and headings skipped"""
+    signals = []
+    for line in text.splitlines():
+        if is_heading(line):
+            continue
+        line = line.lower()
+        for match in _SIGNALS.finditer(line):
+            domain, kind = _classify(match.group())
+            if _NEGATION_BEFORE.search(line, max(0, match.start() - _NEGATION_WINDOW), match.start()) or \
+                    _ZERO_AFTER.match(line, match.end()):
+                kind = _FLIPPED[kind]
+            signals.append((domain, kind))
+    return signals
+
+
+FINDINGS = {
+    "fraud": "Potential fraudulent activities detected",
+    "compliance": "Compliance violations identified",
+    "risk": "Elevated risk levels observed",
+}
+RECOMMENDATIONS = {
+    "fraud": "Immediate transaction review and account freeze for high-risk items",
+    "compliance": "Conduct compliance audit and implement corrective controls",
+    "risk": "Rebalance portfolio and implement risk mitigation strategies",
+}
+CROSS_AGENT_INSIGHTS = (
+    (("fraud", "compliance"), "Fraud patterns correlate with compliance gaps - suggest integrated remediation"),
+    (("fraud", "risk"), "Fraudulent activities contributing to increased portfolio risk"),
+)
+ISSUES_CONFIDENCE = 0.85
+CLEAR_CONFIDENCE = 0.92
+CONFLICT_PENALTY = 0.1
+
+
+class StreamingAggregator:
+    """Thread-safe running aggregation of agent output streams"""
+
+    def __init__(self, agents: Sequence[str] = (), on_update: Optional[Callable[[Dict], None]] = None):
+        self.expected = list(agents)
+        self.on_update = on_update
+        self._signals: Dict[str, Dict[str, set]] = {}    # agent -> domain -> {"issue", "clear"}
+        self._text: Dict[str, List[str]] = {}
+        self._pending: Dict[str, str] = {}
+        self._completed: List[str] = []
+        self._failed: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self.first_summary_ms: Optional[float] = None
+        self.updates = 0
+
+    # ---- input -----------------------------------------------------------
+
+    def feed(self, agent: str, chunk: str):
+        """Add one chunk of an agent's output; scans the lines it completes and publishes if they add a finding"""
+        if not chunk:
+            return
+        with self._lock:
+            self._text.setdefault(agent, []).append(chunk)
+            pending = self._pending.get(agent, "") + chunk
+            cut = pending.rfind("\n") + 1
+            if not cut and len(pending) > _MAX_PENDING:
+                cut = pending.rfind(" ") + 1 or len(pending)
+            self._pending[agent] = pending[cut:]
+            changed = self._add_signals(agent, pending[:cut])
+        if changed:
+            self._publish()
+
+    def _add_signals(self, agent: str, lines: str) -> bool:
+        """Record the signals in complete lines (caller holds the lock); True if the published picture changes"""
+        if not lines:
+            return False
+        agent_signals = self._signals.setdefault(agent, {})
+        new = [(d, k) for d, k in set(scan_signals(lines)) if k not in agent_signals.get(d, ())]
+        if not new:
+            return False
+        before = self._state()
+        for domain, kind in new:
+            agent_signals.setdefault(domain, set()).add(kind)
+        return bool(self._completed) and self._state() != before
+
+    def _flush(self, agent: str):
+        """Scan the unfinished last line of a finished agent (caller holds the lock)"""
+        self._add_signals(agent, self._pending.pop(agent, ""))
+
+    def complete(self, agent: str, text: Optional[str] = None) -> Dict:
+        """Mark an agent finished (feeding ``text`` first if it was not streamed)"""
+        if text is not None and agent not in self._text:
+            self.feed(agent, text)
+        with self._lock:
+            self._flush(agent)
+            if agent not in self._completed:
+                self._completed.append(agent)
+        return self._publish()
+
+    def fail(self, agent: str, error: str) -> Dict:
+        with self._lock:
+            self._flush(agent)
+            self._failed[agent] = error
+        return self._publish()
+
+    # ---- state -----------------------------------------------------------
+
+    def _state(self) -> tuple:
+        return tuple(sorted(self._issues())), tuple(c["domain"] for c in self._conflicts())
+
+    def _issues(self) -> List[str]:
+        return [d for d in FINDINGS if any("issue" in s.get(d, ()) for s in self._signals.values())]
+
+    def _conflicts(self) -> List[Dict]:
+        conflicts = []
+        for domain in FINDINGS:
+            issue = [a for a, s in self._signals.items() if "issue" in s.get(domain, ())]
+            clear = [a for a, s in self._signals.items() if "clear" in s.get(domain, ()) and a not in issue]
+            if issue and clear:
+                conflicts.append({"domain": domain, "reported_by": issue, "cleared_by": clear})
+        return conflicts
+
+    def has_issue(self, domain: str) -> bool:
+        with self._lock:
+            return domain in self._issues()
+
+    def text(self, agent: Optional[str] = None) -> str:
+        with self._lock:
+            agents = [agent] if agent else list(self._text)
+            return "\n".join("".join(self._text.get(a, [])) for a in agents)
+
+    @property
+    def final(self) -> bool:
+        with self._lock:
+            return self._is_final()
+
+    def _is_final(self) -> bool:
+        finished = set(self._completed) | set(self._failed)
+        return bool(finished) and all(a in finished for a in self.expected)
+
+    def summary(self) -> Dict:
+        with self._lock:
+            issues = self._issues()
+            conflicts = self._conflicts()
+            final = self._is_final()
+            pending = [a for a in self.expected if a not in self._completed and a not in self._failed]
+
+            status = f"{len(self._completed)}/{len(self.expected) or len(self._completed)} agents reported"
+            if issues:
+                executive_summary = "⚠️ Critical issues identified requiring immediate attention."
+                confidence = ISSUES_CONFIDENCE
+            else:
+                executive_summary = "✅ No critical issues detected. Systems operating within normal parameters."
+                confidence = CLEAR_CONFIDENCE
+            if not final:
+                executive_summary = f"⏳ Provisional ({status}): {executive_summary}"
+            confidence -= CONFLICT_PENALTY * len(conflicts)
+            if self.expected:
+                confidence *= len(self._completed) / len(self.expected)
+
+            return {
+                "executive_summary": executive_summary,
+                "key_findings": [FINDINGS[d] for d in issues],
+                "cross_agent_insights": [text for domains, text in CROSS_AGENT_INSIGHTS
+                                         if all(d in issues for d in domains)],
+                "conflicts": [f"{c['domain'].title()}: {', '.join(c['reported_by'])} reported issues, "
+                              f"{', '.join(c['cleared_by'])} reported none" for c in conflicts],
+                "recommendations": [RECOMMENDATIONS[d] for d in issues],
+                "confidence_score": round(max(confidence, 0.0), 2),
+                "status": "final" if final else "provisional",
+                "agents_reported": list(self._completed),
+                "agents_pending": pending,
+                "agents_failed": dict(self._failed),
+            }
+
+    def _publish(self) -> Dict:
+        summary = self.summary()
+        with self._lock:
+            self.updates += 1
+            if self.first_summary_ms is None:
+                self.first_summary_ms = (time.perf_counter() - self._started) * 1000
+        logger.info(f"📣 {summary['executive_summary']} (confidence {summary['confidence_score']:.2f})")
+        if self.on_update is not None:
+            try:
+                self.on_update(summary)
+            except Exception as e:
+                logger.warning(f"⚠️ Aggregation update listener failed: {e}")
+        return summary
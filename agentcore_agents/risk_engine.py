@@ -0,0 +1,299 @@
+# ============================================
+# risk_engine.py - Multi-Asset VaR / CVaR Engine
+# ============================================
+"""
+Value at Risk and Expected Shortfall (CVaR) for weighted multi-asset
+portfolios, computed from local price history (see price_history.py).
+
+Three methods are available:
+  * parametric  - variance/covariance (delta-normal) VaR
+  * historical  - empirical quantile of overlapping horizon returns
+  * monte_carlo - correlated daily paths compounded over the horizon
+
+All figures are reported as positive losses in currency units.
+"""
+from statistics import NormalDist
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+import re
+
+import numpy as np
+
+from covariance_cache import get_covariance_cache
+from monte_carlo import run_monte_carlo, tail_losses
+from price_history import load_price_matrix, simple_returns
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS = 252
+HORIZON_DAYS = {"day": 1, "week": 5, "month": 21, "quarter": 63, "year": 252}
+NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+                "ten": 10, "a": 1, "an": 1}
+METHODS = ("parametric", "historical", "monte_carlo")
+
+_VALUE_PATTERN = re.compile(r'\$\s?(\d[\d,]*(?:\.\d+)?)\s*([kKmM])?\b|\b(\d+(?:\.\d+)?)\s*([kKmM])\b')
+_HOLDING_PATTERN = re.compile(
+    r'(\d+(?:\.\d+)?)\s*%\s*(?:of\s+(?:it\s+)?)?(?:(?:went|is|are|was|in|into|allocated)\s+)*(?:to\s+|into\s+|in\s+)?\$?([A-Z][A-Z.\-]{0,5})\b'
+)
+_CONFIDENCE_PATTERN = re.compile(
+    r'(?:VaR|CVaR|confidence)\D{0,15}?(9\d(?:\.\d+)?)\s*%|(9\d(?:\.\d+)?)\s*%\s*(?:VaR|CVaR|confidence|conf)',
+    re.IGNORECASE
+)
+_HORIZON_PATTERN = re.compile(r'\b(\d+|one|two|three|four|five|six|ten|a|an)[\s-]+(day|week|month|quarter|year)s?\b',
+                              re.IGNORECASE)
+
+
+def parse_portfolio_request(text: str) -> Dict:
+    """
+    Pull portfolio value, holdings, horizon and confidence out of free text,
+    e.g. "Calculate: VaR 95%, $100k, 60% SPY + 30% AGG + 10% GLD, 1 month".
+    Missing pieces are returned as None (confidence/horizon get defaults).
+    """
+    request = {"portfolio_value": None, "holdings": {}, "horizon_days": 1, "confidence": 0.95}
+
+    for match in _VALUE_PATTERN.finditer(text):
+        digits = (match.group(1) or match.group(3)).replace(',', '')
+        suffix = (match.group(2) or match.group(4) or '').lower()
+        value = float(digits) * {"k": 1e3, "m": 1e6}.get(suffix, 1)
+        if value >= 1000:
+            request["portfolio_value"] = value
+            break
+
+    for weight, symbol in _HOLDING_PATTERN.findall(text):
+        if symbol in ("VAR", "CVAR", "VAR.", "I"):
+            continue
+        request["holdings"][symbol] = request["holdings"].get(symbol, 0.0) + float(weight) / 100.0
+
+    match = _CONFIDENCE_PATTERN.search(text)
+    if match:
+        request["confidence"] = float(match.group(1) or match.group(2)) / 100.0
+
+    match = _HORIZON_PATTERN.search(text)
+    if match:
+        count = match.group(1).lower()
+        count = NUMBER_WORDS.get(count) or int(count)
+        request["horizon_days"] = count * HORIZON_DAYS[match.group(2).lower()]
+
+    return request
+
+
+def normalize_weights(holdings: Dict[str, float]) -> Tuple[List[str], np.ndarray]:
+    """Split a {symbol: weight} dict into symbols and weights summing to 1"""
+    symbols = [s.upper() for s in holdings]
+    weights = np.array([float(w) for w in holdings.values()])
+    total = weights.sum()
+    if total <= 0:
+        raise ValueError("Holdings weights must sum to a positive number")
+    return symbols, weights / total
+
+
+class VaREngine:
+    """VaR/CVaR calculator over a matrix of daily asset prices"""
+
+    def __init__(self, symbols: Sequence[str], prices: np.ndarray,
+                 mean: Optional[np.ndarray] = None, cov: Optional[np.ndarray] = None):
+        self.symbols = list(symbols)
+        self.prices = np.asarray(prices, dtype=float)
+        self.returns = simple_returns(self.prices)
+        self.mean = self.returns.mean(axis=0) if mean is None else np.asarray(mean)
+        self.cov = np.atleast_2d(np.cov(self.returns, rowvar=False) if cov is None else cov)
+
+    @classmethod
+    def from_price_history(cls, symbols: Sequence[str], lookback: int = None,
+                           as_of: str = None, estimator: str = "sample") -> "VaREngine":
+        """
+        Build an engine from the local price history store. Full-history
+        requests take their moments from the shared covariance cache;
+        ``estimator="ewma"`` uses the EWMA covariance instead of the sample one.
+        """
+        _, prices = load_price_matrix(symbols, lookback=lookback, as_of=as_of)
+        if lookback is None and as_of is None:
+            mean, cov = get_covariance_cache().moments(symbols, kind=estimator)
+            return cls(symbols, prices, mean, cov)
+        return cls(symbols, prices)
+
+    def _result(self, method: str, losses_pct: Tuple[float, float], value: float,
+                confidence: float, horizon: int, weights: np.ndarray) -> Dict:
+        var_pct, cvar_pct = losses_pct
+        return {
+            "method": method,
+            "confidence": confidence,
+            "horizon_days": horizon,
+            "portfolio_value": value,
+            "var": value * var_pct,
+            "cvar": value * cvar_pct,
+            "var_pct": var_pct,
+            "cvar_pct": cvar_pct,
+            "annual_volatility": float(np.sqrt(weights @ self.cov @ weights * TRADING_DAYS)),
+            "observations": int(self.returns.shape[0]),
+        }
+
+    def parametric(self, weights: np.ndarray, value: float, confidence: float = 0.95,
+                   horizon: int = 1) -> Dict:
+        """Delta-normal VaR with square-root-of-time scaling"""
+        mu = float(weights @ self.mean) * horizon
+        sigma = float(np.sqrt(weights @ self.cov @ weights * horizon))
+        z = NormalDist().inv_cdf(1 - confidence)
+        var_pct = -(mu + z * sigma)
+        cvar_pct = sigma * NormalDist().pdf(z) / (1 - confidence) - mu
+        return self._result("parametric", (var_pct, cvar_pct), value, confidence, horizon, weights)
+
+    def historical(self, weights: np.ndarray, value: float, confidence: float = 0.95,
+                   horizon: int = 1) -> Dict:
+        """Empirical quantile of overlapping horizon-day portfolio returns"""
+        if self.prices.shape[0] <= horizon + 1:
+            raise ValueError(f"Not enough history for a {horizon}-day historical VaR")
+        portfolio_returns = simple_returns(self.prices, horizon) @ weights
+        return self._result("historical", tail_losses(portfolio_returns, confidence),
+                            value, confidence, horizon, weights)
+
+    def monte_carlo(self, weights: np.ndarray, value: float, confidence: float = 0.95,
+                    horizon: int = 1, max_paths: int = 1_000_000, tolerance: float = 0.01,
+                    seed: Optional[int] = None, max_workers: Optional[int] = None) -> Dict:
+        """Correlated normal daily returns compounded per asset over the horizon"""
+        chol = np.linalg.cholesky(self.cov + 1e-12 * np.eye(len(self.symbols)))
+        simulation = run_monte_carlo(self.mean, chol, weights, horizon, confidence,
+                                     max_paths=max_paths, tolerance=tolerance,
+                                     seed=seed, max_workers=max_workers)
+        result = self._result("monte_carlo", (simulation["var_pct"], simulation["cvar_pct"]),
+                              value, confidence, horizon, weights)
+        result["paths"] = simulation["paths"]
+        result["converged"] = simulation["converged"]
+        result["var_ci"] = value * simulation["var_ci_halfwidth"]
+        return result
+
+    def attribution(self, weights: np.ndarray, value: float, confidence: float = 0.95,
+                    horizon: int = 1) -> Dict:
+        """
+        Marginal, component and incremental parametric VaR for every holding.
+
+        With dollar exposures x, VaR(x) = -h*mu'x + z*sqrt(h)*sqrt(x'Σx) is
+        homogeneous of degree one, so the Euler components x_i * dVaR/dx_i sum
+        exactly to the total. Incremental VaR (the change from dropping a
+        holding) uses sigma^2 - 2*x_i*(Σx)_i + x_i^2*Σ_ii, so the whole
+        breakdown costs one matrix-vector product.
+        """
+        x = value * np.asarray(weights, dtype=float)
+        z = -NormalDist().inv_cdf(1 - confidence)
+        sqrt_h = np.sqrt(horizon)
+        cov_x = self.cov @ x
+        variance = float(x @ cov_x)
+        sigma = np.sqrt(variance)
+        drift = self.mean * horizon
+
+        total = float(-drift @ x + z * sqrt_h * sigma)
+        marginal = -drift + z * sqrt_h * cov_x / sigma
+        component = x * marginal
+
+        variance_without = np.maximum(variance - 2 * x * cov_x + x ** 2 * np.diag(self.cov), 0.0)
+        var_without = -(float(drift @ x) - drift * x) + z * sqrt_h * np.sqrt(variance_without)
+        incremental = total - var_without
+
+        return {
+            "symbols": self.symbols,
+            "confidence": confidence,
+            "horizon_days": horizon,
+            "total_var": total,
+            "exposure": x,
+            "marginal_var": marginal,
+            "component_var": component,
+            "component_pct": component / total if total else np.zeros_like(component),
+            "incremental_var": incremental,
+        }
+
+    def calculate(self, weights: np.ndarray, value: float, confidence: float = 0.95,
+                  horizon: int = 1, methods: Sequence[str] = METHODS, **kwargs) -> List[Dict]:
+        """Run several methods on the same portfolio"""
+        results = []
+        for method in methods:
+            if method not in METHODS:
+                raise ValueError(f"Unknown VaR method '{method}' (expected one of {', '.join(METHODS)})")
+            extra = kwargs if method == "monte_carlo" else {}
+            results.append(getattr(self, method)(weights, value, confidence, horizon, **extra))
+        return results
+
+
+def batch_portfolio_metrics(weights: np.ndarray, mean: np.ndarray, cov: np.ndarray,
+                            values: np.ndarray, benchmark_index: Optional[int] = None,
+                            confidence: float = 0.95, horizon: int = 1,
+                            returns: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Risk metrics for P portfolios at once from a stacked (P x N) weight matrix
+    and one shared covariance matrix: every quantity is a row-wise reduction
+    of W @ Σ, so the cost is a single matrix product. Passing the (T x N)
+    daily ``returns`` adds historical VaR/CVaR from R @ W.T.
+    """
+    weights = np.atleast_2d(weights)
+    values = np.asarray(values, dtype=float)
+    w_cov = weights @ cov
+    variance = np.einsum("ij,ij->i", w_cov, weights)
+    sigma = np.sqrt(np.maximum(variance, 0.0) * horizon)
+    mu = (weights @ mean) * horizon
+    z = NormalDist().inv_cdf(1 - confidence)
+    tail_density = NormalDist().pdf(z) / (1 - confidence)
+
+    metrics = {
+        "volatility": np.sqrt(np.maximum(variance, 0.0) * TRADING_DAYS),
+        "var": values * -(mu + z * sigma),
+        "cvar": values * (sigma * tail_density - mu),
+    }
+    if benchmark_index is not None:
+        benchmark_var = cov[benchmark_index, benchmark_index]
+        metrics["beta"] = (w_cov[:, benchmark_index] / benchmark_var if benchmark_var > 0
+                           else np.full(len(weights), np.nan))
+
+    if returns is not None:
+        if horizon > 1:
+            growth = np.cumprod(1.0 + returns, axis=0)
+            growth = np.vstack([np.ones((1, returns.shape[1])), growth])
+            returns = growth[horizon:] / growth[:-horizon] - 1.0
+        losses = -(returns @ weights.T)
+        var_pct = np.quantile(losses, confidence, axis=0)
+        tail = losses >= var_pct
+        cvar_pct = np.where(tail, losses, 0.0).sum(axis=0) / np.maximum(tail.sum(axis=0), 1)
+        metrics["historical_var"] = values * var_pct
+        metrics["historical_cvar"] = values * cvar_pct
+    return metrics
+
+
+def format_attribution(attribution: Dict, top_n: int = 10) -> str:
+    """Render the largest VaR contributors as text"""
+    order = np.argsort(-attribution["component_var"], kind="stable")[:top_n]
+    result = f"\n🔎 VaR ATTRIBUTION (parametric, ${attribution['total_var']:,.2f} total)\n"
+    result += "Holding | Component VaR | Share | Marginal VaR per $ | Incremental VaR\n"
+    for i in order:
+        result += (f"{attribution['symbols'][i]} | ${attribution['component_var'][i]:,.2f} | "
+                   f"{attribution['component_pct'][i] * 100:.1f}% | {attribution['marginal_var'][i]:.4f} | "
+                   f"${attribution['incremental_var'][i]:,.2f}\n")
+    remaining = len(attribution["symbols"]) - len(order)
+    if remaining > 0:
+        result += f"... {remaining} smaller contributors omitted\n"
+    top = order[0]
+    result += (f"\n💡 {attribution['symbols'][top]} drives {attribution['component_pct'][top] * 100:.1f}% "
+               f"of portfolio VaR.\n")
+    return result
+
+
+def format_var_report(results: List[Dict], holdings: Dict[str, float]) -> str:
+    """Render VaR results in the risk agent's report style"""
+    first = results[0]
+    horizon = first["horizon_days"]
+    result = f"\n📊 VALUE AT RISK ANALYSIS\n"
+    result += f"Portfolio Value: ${first['portfolio_value']:,.2f}\n"
+    result += "Holdings: " + ", ".join(f"{w * 100:.1f}% {s}" for s, w in holdings.items()) + "\n"
+    result += f"Horizon: {horizon} trading day{'s' if horizon != 1 else ''}\n"
+    result += f"Confidence Level: {first['confidence'] * 100:.1f}%\n"
+    result += f"Annualized Volatility: {first['annual_volatility'] * 100:.2f}%\n"
+    result += f"History: {first['observations']} daily returns\n\n"
+
+    for r in results:
+        label = r["method"].replace("_", " ").title()
+        result += f"{label}: VaR ${r['var']:,.2f} ({r['var_pct'] * 100:.2f}%) | CVaR ${r['cvar']:,.2f} ({r['cvar_pct'] * 100:.2f}%)\n"
+        if "paths" in r:
+            result += f"  - {r['paths']:,} paths, VaR ±${r['var_ci']:,.2f} ({'converged' if r['converged'] else 'path limit reached'})\n"
+
+    worst = max(results, key=lambda r: r["var"])
+    result += (f"\n💡 There is a {(1 - first['confidence']) * 100:.1f}% chance of losing more than "
+               f"${worst['var']:,.2f} over {horizon} trading day{'s' if horizon != 1 else ''} "
+               f"({worst['method'].replace('_', ' ')}); average loss in that tail is ${worst['cvar']:,.2f}.\n")
+    return result
@@ -0,0 +1,407 @@
+# ============================================
+# sanctions_screening.py - Fuzzy OFAC Sanctions Screening Index
+# ============================================
+"""
+Fuzzy name-matching index over a local sanctions list (OFAC SDN).
+
+Every list name and alias is normalized (accents folded, punctuation and
+legal-form suffixes such as LLC or LTD dropped, tokens sorted so "ALI,
+Mohammed" and "Mohammed Ali" coincide) and indexed two ways:
+
+  * character trigrams of each padded token, as one sparse binary
+    names x trigrams matrix;
+  * a phonetic key - the sorted Soundex-style codes of the tokens - so
+    transliteration variants such as Muhammad/Mohammed or Qaddafi/Gadhafi
+    are found even when they share few trigrams.
+
+A batch of counterparties is screened with a single sparse product of the
+query and list trigram matrices, which yields the trigram overlap (Dice
+coefficient) for every query/name pair that shares anything at all.
+Names above a candidate floor, plus phonetic-key matches, are rescored with
+token-level Jaro-Winkler similarity (phonetic matches are not penalized
+for low trigram overlap), and candidates at or above ``min_score`` are
+returned per counterparty, best first.
+
+The list file is reloaded when its mtime changes. Supported formats are
+the OFAC ``sdn.csv`` (with the sibling ``alt.csv`` for aliases), a CSV
+with a ``name`` column (plus optional ``uid``, ``type``, ``program`` and
+``aliases`` separated by ``;``) or a plain text file with one name per
+line. No list ships with the code: ``download_sanctions_list`` (``make
+sanctions-list``) fetches the current SDN and alias files from OFAC next
+to ``SANCTIONS_LIST_PATH``, and the agent's container picks them up on
+its next deploy.
+"""
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence
+import csv
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+import urllib.request
+
+import numpy as np
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+SANCTIONS_LIST_PATH = os.environ.get(
+    "SANCTIONS_LIST_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "sanctions", "sdn.csv")
+)
+SANCTIONS_LIST_URL = os.environ.get(
+    "SANCTIONS_LIST_URL", "https://sanctionslistservice.ofac.treas.gov/api/PublicationPreview/exports/SDN.CSV"
+)
+SANCTIONS_ALIASES_URL = os.environ.get(
+    "SANCTIONS_ALIASES_URL", "https://sanctionslistservice.ofac.treas.gov/api/PublicationPreview/exports/ALT.CSV"
+)
+MIN_MATCH_SCORE = 0.85
+# Trigram Dice coefficient a list name needs before it is rescored
+CANDIDATE_FLOOR = 0.45
+MAX_RESCORED = 12
+QUERY_BATCH = 1024
+# Weight of token-level Jaro-Winkler vs. trigram Dice in the final score
+TOKEN_WEIGHT = 0.7
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_LEGAL_FORMS = frozenset("ltd llc inc co corp corporation company limited plc sa sarl srl gmbh ag bv nv "
+                         "jsc ojsc pjsc cjsc llp lp fze fzco the of and".split())
+_OFAC_NULL = "-0-"
+
+_SOUNDEX = {}
+for _letters, _digit in (("bfpv", "1"), ("cgjkqsxz", "2"), ("dt", "3"), ("l", "4"), ("mn", "5"), ("r", "6")):
+    for _letter in _letters:
+        _SOUNDEX[_letter] = _digit
+
+
+def normalize_tokens(name: str) -> List[str]:
+    """Sorted, accent-folded tokens with punctuation and legal forms removed"""
+    folded = unicodedata.normalize("NFKD", name)
+    folded = "".join(c for c in folded if not unicodedata.combining(c)).lower()
+    tokens = [t for t in _NON_ALNUM.split(folded) if t and t not in _LEGAL_FORMS]
+    return sorted(tokens)
+
+
+@lru_cache(maxsize=65536)
+def phonetic_code(token: str) -> str:
+    """
+    Soundex variant that codes the first letter too (vowels as "0"), so
+    Qaddafi and Gadhafi, or Celik and Kelik, share a code
+    """
+    if token.isdigit():
+        return token
+    code, last = [], None
+    for i, letter in enumerate(token):
+        digit = _SOUNDEX.get(letter)
+        if digit is None:
+            if i == 0:
+                code.append("0")
+            if letter not in "hw":
+                last = None
+            continue
+        if digit != last:
+            code.append(digit)
+        last = digit
+    return "".join(code[:4]) or token
+
+
+def phonetic_key(tokens: Sequence[str]) -> str:
+    return " ".join(sorted(phonetic_code(t) for t in tokens))
+
+
+def trigrams(tokens: Sequence[str]) -> set:
+    grams = set()
+    for token in tokens:
+        padded = f"${token}$"
+        if len(padded) < 3:
+            grams.add(padded)
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+@lru_cache(maxsize=262144)
+def jaro_winkler(a: str, b: str) -> float:
+    if a == b:
+        return 1.0
+    la, lb = len(a), len(b)
+    if not la or not lb:
+        return 0.0
+    window = max(max(la, lb) // 2 - 1, 0)
+    a_flags, b_flags = [False] * la, [False] * lb
+    matches = 0
+    for i, ch in enumerate(a):
+        for j in range(max(0, i - window), min(lb, i + window + 1)):
+            if not b_flags[j] and b[j] == ch:
+                a_flags[i] = b_flags[j] = True
+                matches += 1
+                break
+    if not matches:
+        return 0.0
+    b_matched = [b[j] for j in range(lb) if b_flags[j]]
+    transpositions = sum(ch != b_matched[k] for k, ch in enumerate(c for i, c in enumerate(a) if a_flags[i])) / 2
+    jaro = (matches / la + matches / lb + (matches - transpositions) / matches) / 3
+    prefix = 0
+    for x, y in zip(a[:4], b[:4]):
+        if x != y:
+            break
+        prefix += 1
+    return jaro + prefix * 0.1 * (1 - jaro)
+
+
+def token_similarity(query: Sequence[str], name: Sequence[str]) -> float:
+    """Length-weighted best-match Jaro-Winkler, averaged over both directions"""
+    if not query or not name:
+        return 0.0
+
+    def directed(source, target):
+        total = sum(len(t) for t in source)
+        return sum(len(s) * max(jaro_winkler(s, t) for t in target) for s in source) / total
+
+    total_q, total_n = sum(len(t) for t in query), sum(len(t) for t in name)
+    return (directed(query, name) * total_q + directed(name, query) * total_n) / (total_q + total_n)
+
+
+# ---- list loading --------------------------------------------------------
+
+def _ofac_value(value: str) -> str:
+    value = (value or "").strip()
+    return "" if value == _OFAC_NULL else value
+
+
+def load_sanctions_list(path: str) -> List[Dict]:
+    """Entries ``{"uid", "name", "type", "program", "aliases"}`` from a list file"""
+    entries: Dict[str, Dict] = {}
+    if path.lower().endswith(".txt"):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for n, line in enumerate(f, 1):
+                if line.strip():
+                    entries[str(n)] = {"uid": str(n), "name": line.strip(), "type": "", "program": "", "aliases": []}
+        return list(entries.values())
+
+    with open(path, newline="", encoding="utf-8", errors="replace") as f:
+        rows = list(csv.reader(f))
+    if not rows:
+        return []
+
+    header = [h.strip().lower() for h in rows[0]]
+    if "name" in header:
+        col = {h: i for i, h in enumerate(header)}
+        for n, row in enumerate(rows[1:], 1):
+            field = lambda h: row[col[h]].strip() if h in col and col[h] < len(row) else ""
+            if not field("name"):
+                continue
+            uid = field("uid") or str(n)
+            entries[uid] = {"uid": uid, "name": field("name"), "type": field("type"), "program": field("program"),
+                            "aliases": [a.strip() for a in field("aliases").split(";") if a.strip()]}
+        return list(entries.values())
+
+    # OFAC SDN layout: ent_num, SDN_Name, SDN_Type, Program, ...
+    for row in rows:
+        if len(row) < 2 or not row[0].strip().isdigit():
+            continue
+        uid = row[0].strip()
+        entries[uid] = {"uid": uid, "name": _ofac_value(row[1]), "type": _ofac_value(row[2]) if len(row) > 2 else "",
+                        "program": _ofac_value(row[3]) if len(row) > 3 else "", "aliases": []}
+    alt_path = os.path.join(os.path.dirname(path), "alt.csv")
+    if os.path.exists(alt_path):
+        with open(alt_path, newline="", encoding="utf-8", errors="replace") as f:
+            # ent_num, alt_num, alt_type, alt_name, alt_remarks
+            for row in csv.reader(f):
+                if len(row) >= 4 and row[0].strip() in entries and _ofac_value(row[3]):
+                    entries[row[0].strip()]["aliases"].append(_ofac_value(row[3]))
+    return list(entries.values())
+
+
+def download_sanctions_list(path: str = None, timeout: float = 60.0) -> str:
+    """
+    Fetch the OFAC SDN list to ``path`` (default ``SANCTIONS_LIST_PATH``)
+    and its aliases to the sibling alt.csv. Both files are downloaded to
+    temporary names and only swapped in once the list parses, so a failed
+    download leaves the previous list in place. Returns the list path.
+    """
+    path = path or SANCTIONS_LIST_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    targets = {path: SANCTIONS_LIST_URL, os.path.join(os.path.dirname(path), "alt.csv"): SANCTIONS_ALIASES_URL}
+    try:
+        for target, url in targets.items():
+            logger.info(f"🛡️ Downloading {url} -> {target}")
+            with urllib.request.urlopen(url, timeout=timeout) as response, open(f"{target}.tmp", "wb") as f:
+                while chunk := response.read(1 << 20):
+                    f.write(chunk)
+        entries = load_sanctions_list(f"{path}.tmp")
+        if not entries:
+            raise ValueError(f"Downloaded sanctions list from {SANCTIONS_LIST_URL} has no entries")
+        for target in targets:
+            os.replace(f"{target}.tmp", target)
+    finally:
+        for target in targets:
+            if os.path.exists(f"{target}.tmp"):
+                os.remove(f"{target}.tmp")
+    logger.info(f"✅ Sanctions list saved to {path}: {len(entries):,} entries")
+    return path
+
+
+# ---- index ---------------------------------------------------------------
+
+class SanctionsIndex:
+    """Trigram and phonetic index over every list name and alias"""
+
+    def __init__(self, entries: Iterable[Dict]):
+        started = time.perf_counter()
+        self.entries: List[Dict] = list(entries)
+        self.name_entry: List[int] = []          # name row -> entry position
+        self.names: List[str] = []
+        self.tokens: List[List[str]] = []
+        self.vocabulary: Dict[str, int] = {}
+        self.phonetic: Dict[str, List[int]] = defaultdict(list)
+
+        rows, cols = [], []
+        for position, entry in enumerate(self.entries):
+            for name in dict.fromkeys([entry["name"], *entry.get("aliases", [])]):
+                tokens = normalize_tokens(name)
+                if not tokens:
+                    continue
+                row = len(self.names)
+                self.names.append(name)
+                self.tokens.append(tokens)
+                self.name_entry.append(position)
+                self.phonetic[phonetic_key(tokens)].append(row)
+                for gram in trigrams(tokens):
+                    rows.append(row)
+                    cols.append(self.vocabulary.setdefault(gram, len(self.vocabulary)))
+
+        shape = (len(self.names), max(len(self.vocabulary), 1))
+        self.matrix = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=shape)
+        self.gram_counts = np.asarray(self.matrix.sum(axis=1)).ravel()
+        self.matrix_t = self.matrix.T.tocsr()
+        self.build_seconds = time.perf_counter() - started
+        logger.info(f"🛡️ Sanctions index: {len(self.entries):,} entries, {len(self.names):,} names, "
+                    f"{len(self.vocabulary):,} trigrams in {self.build_seconds:.2f}s")
+
+    @classmethod
+    def from_file(cls, path: str) -> "SanctionsIndex":
+        return cls(load_sanctions_list(path))
+
+    def _query_matrix(self, queries: List[List[str]]):
+        rows, cols, sizes = [], [], []
+        for i, tokens in enumerate(queries):
+            grams = trigrams(tokens)
+            sizes.append(len(grams))
+            for gram in grams:
+                col = self.vocabulary.get(gram)
+                if col is not None:
+                    rows.append(i)
+                    cols.append(col)
+        matrix = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)),
+                                   shape=(len(queries), self.matrix.shape[1]))
+        return matrix, np.asarray(sizes, dtype=np.float32)
+
+    def screen(self, names: Sequence[str], min_score: float = MIN_MATCH_SCORE,
+               max_candidates: int = 3) -> List[Dict]:
+        """Scored list matches for each counterparty name, in input order"""
+        queries = [normalize_tokens(n) for n in names]
+        results = [{"name": name, "matches": []} for name in names]
+        if not self.names:
+            return results
+
+        for start in range(0, len(queries), QUERY_BATCH):
+            batch = queries[start:start + QUERY_BATCH]
+            query_matrix, sizes = self._query_matrix(batch)
+            overlap = (query_matrix @ self.matrix_t).tocsr()
+            for i, tokens in enumerate(batch):
+                if not tokens:
+                    continue
+                lo, hi = overlap.indptr[i], overlap.indptr[i + 1]
+                rows = overlap.indices[lo:hi]
+                dice = 2 * overlap.data[lo:hi] / (sizes[i] + self.gram_counts[rows])
+                keep = dice >= CANDIDATE_FLOOR
+                rows, dice = rows[keep], dice[keep]
+                if rows.size > MAX_RESCORED:
+                    top = np.argpartition(-dice, MAX_RESCORED - 1)[:MAX_RESCORED]
+                    rows, dice = rows[top], dice[top]
+                candidates = dict(zip(rows.tolist(), dice.tolist()))
+                for row in self.phonetic.get(phonetic_key(tokens), ()):
+                    candidates.setdefault(row, 0.0)
+                results[start + i]["matches"] = self._rescore(tokens, candidates, min_score, max_candidates)
+        return results
+
+    def _rescore(self, tokens: List[str], candidates: Dict[int, float], min_score: float,
+                 max_candidates: int) -> List[Dict]:
+        best: Dict[int, Dict] = {}
+        phonetic = phonetic_key(tokens)
+        for row, dice in candidates.items():
+            if not dice:
+                # Phonetic-only candidate: trigram overlap was below anything kept by the sparse product
+                dice = 2 * len(trigrams(tokens) & trigrams(self.tokens[row])) / (
+                    len(trigrams(tokens)) + self.gram_counts[row])
+            similarity = token_similarity(tokens, self.tokens[row])
+            score = TOKEN_WEIGHT * similarity + (1 - TOKEN_WEIGHT) * dice
+            sounds_alike = phonetic_key(self.tokens[row]) == phonetic
+            if sounds_alike:
+                # Transliteration variants share few trigrams; don't let that drag the score down
+                score = max(score, similarity)
+            if score < min_score:
+                continue
+            position = self.name_entry[row]
+            if position in best and best[position]["score"] >= score:
+                continue
+            entry = self.entries[position]
+            best[position] = {
+                "uid": entry["uid"],
+                "entry": entry["name"],
+                "matched_name": self.names[row],
+                "type": entry.get("type", ""),
+                "program": entry.get("program", ""),
+                "score": round(float(score), 4),
+                "phonetic_match": sounds_alike,
+            }
+        return sorted(best.values(), key=lambda m: -m["score"])[:max_candidates]
+
+    def stats(self) -> Dict:
+        return {"entries": len(self.entries), "names": len(self.names), "trigrams": len(self.vocabulary),
+                "build_seconds": round(self.build_seconds, 3)}
+
+
+_index: Optional[SanctionsIndex] = None
+_index_source: Optional[tuple] = None    # (path, mtime) the index was built from
+_index_lock = threading.Lock()
+
+
+def get_sanctions_index(path: str = None) -> Optional[SanctionsIndex]:
+    """The process-wide index for ``path``, rebuilt when the list file changes; None if it is missing"""
+    global _index, _index_source
+    path = path or SANCTIONS_LIST_PATH
+    if not os.path.exists(path):
+        return None
+    source = (path, os.path.getmtime(path))
+    with _index_lock:
+        if _index is None or _index_source != source:
+            _index = SanctionsIndex.from_file(path)
+            _index_source = source
+        return _index
+
+
+def format_screening_report(results: List[Dict], stats: Dict, elapsed_ms: float, min_score: float) -> str:
+    """Render screening results with the potential matches first"""
+    hits = [r for r in results if r["matches"]]
+    result = f"\n🛡️ SANCTIONS SCREENING\n"
+    result += (f"Screened: {len(results):,} counterparties against {stats['entries']:,} list entries "
+               f"({stats['names']:,} names incl. aliases) in {elapsed_ms:.0f} ms\n")
+    result += f"Match threshold: {min_score:.2f} | Potential matches: {len(hits)}\n"
+
+    if not hits:
+        result += "\n✅ No potential sanctions matches\n"
+        return result
+
+    result += "\n🚨 Potential Matches (review before releasing the transactions):\n"
+    for r in hits:
+        result += f"\n• {r['name']}\n"
+        for m in r["matches"]:
+            alias = f" (as '{m['matched_name']}')" if m["matched_name"] != m["entry"] else ""
+            details = " | ".join(x for x in (m["type"], m["program"]) if x)
+            result += f"  - {m['score']:.2f}  {m['entry']}{alias} [#{m['uid']}]"
+            result += f" - {details}\n" if details else "\n"
+    return result
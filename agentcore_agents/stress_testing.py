@@ -0,0 +1,189 @@
+# ============================================
+# stress_testing.py - Batch Stress-Testing Engine
+# ============================================
+"""
+Applies a library of historical and hypothetical shocks to many portfolios
+in one matrix product.
+
+Scenarios are defined as returns per risk factor (equity, tech, bonds, ...)
+and mapped onto symbols with SYMBOL_FACTORS, giving a scenarios x symbols
+shock matrix S. Portfolios become a portfolios x symbols dollar-exposure
+matrix E, and the full P&L grid is simply E @ S.T. Rolling windows of the
+local price history can be added as thousands of extra empirical scenarios.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+
+from price_history import load_price_matrix, simple_returns
+
+logger = logging.getLogger(__name__)
+
+FACTORS = ("equity", "tech", "bonds", "treasuries", "gold", "commodities",
+           "real_estate", "high_yield", "crypto")
+
+SYMBOL_FACTORS = {
+    **{s: "equity" for s in ("SPY", "VOO", "IVV", "VTI", "DIA", "IWM", "EFA", "VEA", "EEM")},
+    **{s: "tech" for s in ("QQQ", "XLK", "AAPL", "MSFT", "GOOGL", "GOOG", "AMZN", "META",
+                           "NVDA", "AVGO", "CSCO", "TSLA", "ORCL", "AMD", "INTC")},
+    **{s: "bonds" for s in ("AGG", "BND", "LQD", "MUB")},
+    **{s: "treasuries" for s in ("TLT", "IEF", "SHY", "GOVT", "BIL")},
+    **{s: "gold" for s in ("GLD", "IAU", "SLV")},
+    **{s: "commodities" for s in ("DBC", "GSG", "USO", "PDBC")},
+    **{s: "real_estate" for s in ("VNQ", "IYR", "XLRE")},
+    **{s: "high_yield" for s in ("HYG", "JNK")},
+    **{s: "crypto" for s in ("BTC-USD", "ETH-USD", "IBIT", "GBTC")},
+}
+DEFAULT_FACTOR = "equity"
+
+# Approximate factor moves over each episode (fractional returns)
+SCENARIO_LIBRARY: Dict[str, Dict[str, float]] = {
+    # Historical episodes
+    "1987 Black Monday": {"equity": -0.20, "tech": -0.22, "bonds": 0.02, "treasuries": 0.03, "gold": 0.02,
+                          "commodities": -0.05, "real_estate": -0.15, "high_yield": -0.08, "crypto": 0.0},
+    "2000-02 Dot-com Bust": {"equity": -0.49, "tech": -0.78, "bonds": 0.25, "treasuries": 0.30, "gold": 0.15,
+                             "commodities": 0.05, "real_estate": 0.20, "high_yield": -0.10, "crypto": 0.0},
+    "2008 Global Financial Crisis": {"equity": -0.40, "tech": -0.45, "bonds": 0.03, "treasuries": 0.12,
+                                     "gold": 0.05, "commodities": -0.45, "real_estate": -0.55,
+                                     "high_yield": -0.25, "crypto": 0.0},
+    "2011 US Downgrade": {"equity": -0.17, "tech": -0.15, "bonds": 0.02, "treasuries": 0.10, "gold": 0.10,
+                          "commodities": -0.12, "real_estate": -0.20, "high_yield": -0.08, "crypto": 0.0},
+    "2020 COVID Crash": {"equity": -0.34, "tech": -0.28, "bonds": -0.01, "treasuries": 0.06, "gold": -0.03,
+                         "commodities": -0.30, "real_estate": -0.40, "high_yield": -0.20, "crypto": -0.50},
+    "2022 Rate Shock": {"equity": -0.25, "tech": -0.35, "bonds": -0.16, "treasuries": -0.30, "gold": -0.10,
+                        "commodities": 0.15, "real_estate": -0.30, "high_yield": -0.18, "crypto": -0.65},
+    # Hypothetical shocks
+    "Equity -10%": {"equity": -0.10, "tech": -0.12, "real_estate": -0.08, "high_yield": -0.04, "crypto": -0.15},
+    "Equity -20%": {"equity": -0.20, "tech": -0.25, "real_estate": -0.16, "high_yield": -0.08, "crypto": -0.30,
+                    "treasuries": 0.04},
+    "Rates +100bp": {"bonds": -0.06, "treasuries": -0.15, "equity": -0.05, "tech": -0.08,
+                     "real_estate": -0.10, "high_yield": -0.05, "gold": -0.03},
+    "Rates -100bp": {"bonds": 0.06, "treasuries": 0.15, "equity": 0.03, "tech": 0.05,
+                     "real_estate": 0.08, "high_yield": 0.03, "gold": 0.03},
+    "Stagflation": {"equity": -0.15, "tech": -0.20, "bonds": -0.08, "treasuries": -0.12, "gold": 0.15,
+                    "commodities": 0.25, "real_estate": -0.12, "high_yield": -0.10, "crypto": -0.25},
+    "Tech Selloff -30%": {"tech": -0.30, "equity": -0.12, "crypto": -0.35, "treasuries": 0.03},
+    "Credit Crunch": {"high_yield": -0.20, "bonds": -0.05, "equity": -0.15, "tech": -0.15,
+                      "real_estate": -0.20, "treasuries": 0.05},
+    "Crypto Crash -60%": {"crypto": -0.60, "tech": -0.05},
+}
+
+
+def factor_for(symbol: str) -> str:
+    return SYMBOL_FACTORS.get(symbol.upper(), DEFAULT_FACTOR)
+
+
+def build_exposures(portfolios: List[Dict]) -> Tuple[List[str], np.ndarray]:
+    """
+    Dollar exposures (portfolios x symbols) from [{"value": ..., "holdings": {sym: weight}}].
+    Weights are normalized per portfolio.
+    """
+    symbols = sorted({s.upper() for p in portfolios for s in p.get("holdings", {})})
+    index = {s: j for j, s in enumerate(symbols)}
+    rows, cols, vals = [], [], []
+    for i, p in enumerate(portfolios):
+        holdings = p.get("holdings", {})
+        total = sum(holdings.values())
+        if total <= 0:
+            continue
+        for symbol, weight in holdings.items():
+            rows.append(i)
+            cols.append(index[symbol.upper()])
+            vals.append(float(p.get("value", 0.0)) * weight / total)
+    exposures = np.zeros((len(portfolios), len(symbols)))
+    np.add.at(exposures, (np.array(rows, dtype=int), np.array(cols, dtype=int)), vals)
+    return symbols, exposures
+
+
+class StressTestEngine:
+    """Scenario x position stress testing for many portfolios at once"""
+
+    def __init__(self, library: Dict[str, Dict[str, float]] = None):
+        self.library = library or SCENARIO_LIBRARY
+
+    def library_shocks(self, symbols: Sequence[str],
+                       scenario_names: Optional[Sequence[str]] = None) -> Tuple[List[str], np.ndarray]:
+        """Scenario x symbol shock matrix from the factor library"""
+        names = list(scenario_names) if scenario_names else list(self.library)
+        unknown = [n for n in names if n not in self.library]
+        if unknown:
+            raise ValueError(f"Unknown scenario(s): {', '.join(unknown)}")
+        factor_shocks = np.array([[self.library[n].get(f, 0.0) for f in FACTORS] for n in names])
+        factor_idx = np.array([FACTORS.index(factor_for(s)) for s in symbols], dtype=int)
+        return names, factor_shocks[:, factor_idx]
+
+    @staticmethod
+    def history_shocks(symbols: Sequence[str], horizon: int = 21,
+                       step: int = 1) -> Tuple[List[str], np.ndarray]:
+        """Every rolling ``horizon``-day window of local history as a scenario"""
+        dates, prices = load_price_matrix(list(symbols))
+        shocks = simple_returns(prices, horizon)[::step]
+        starts, ends = dates[:-horizon][::step], dates[horizon:][::step]
+        names = [f"Hist {s} → {e}" for s, e in zip(starts, ends)]
+        return names, shocks
+
+    def run(self, portfolios: List[Dict], scenario_names: Optional[Sequence[str]] = None,
+            history_horizon: Optional[int] = None, top_n: int = 5) -> Dict:
+        """
+        Stress every portfolio under every scenario.
+
+        Returns per-portfolio worst losses with their top scenarios, and the
+        scenarios ranked by total loss across all portfolios.
+        """
+        symbols, exposures = build_exposures(portfolios)
+        names, shocks = self.library_shocks(symbols, scenario_names)
+
+        if history_horizon:
+            hist_names, hist_shocks = self.history_shocks(symbols, history_horizon)
+            names = names + hist_names
+            shocks = np.vstack([shocks, hist_shocks])
+
+        losses = -(exposures @ shocks.T)                     # portfolios x scenarios
+        k = min(top_n, len(names))
+        top = np.argpartition(-losses, k - 1, axis=1)[:, :k]
+        top = np.take_along_axis(top, np.argsort(-np.take_along_axis(losses, top, axis=1), axis=1), axis=1)
+        values = exposures.sum(axis=1)
+
+        results = []
+        for i, p in enumerate(portfolios):
+            worst = top[i, 0]
+            results.append({
+                "name": p.get("name", f"portfolio_{i + 1}"),
+                "value": float(values[i]),
+                "worst_scenario": names[worst],
+                "worst_loss": float(losses[i, worst]),
+                "worst_loss_pct": float(losses[i, worst] / values[i]) if values[i] else 0.0,
+                "top_scenarios": [{"scenario": names[j], "loss": float(losses[i, j])} for j in top[i]],
+            })
+
+        total = losses.sum(axis=0)
+        order = np.argsort(-total, kind="stable")[:max(top_n, 10)]
+        hit = (losses > 0).sum(axis=0)
+        ranking = [{"scenario": names[j], "total_loss": float(total[j]), "portfolios_losing": int(hit[j])}
+                   for j in order]
+
+        logger.info(f"🌪️ Stressed {len(portfolios)} portfolios x {len(names)} scenarios")
+        return {
+            "scenario_count": len(names),
+            "portfolio_count": len(portfolios),
+            "portfolios": results,
+            "scenario_ranking": ranking,
+        }
+
+
+def _loss_text(loss: float) -> str:
+    return f"-${loss:,.2f}" if loss >= 0 else f"+${-loss:,.2f}"
+
+
+def format_stress_report(result: Dict) -> str:
+    """Render a single- or multi-portfolio stress result as text"""
+    report = f"\n🌪️ STRESS TEST RESULTS\n"
+    report += f"Scenarios: {result['scenario_count']:,} | Portfolios: {result['portfolio_count']:,}\n"
+    for p in result["portfolios"]:
+        report += f"\n{p['name']} (${p['value']:,.2f})\n"
+        report += (f"  Worst case: {p['worst_scenario']} → {_loss_text(p['worst_loss'])} "
+                   f"({-p['worst_loss_pct'] * 100:+.1f}%)\n")
+        for s in p["top_scenarios"][1:]:
+            report += f"  • {s['scenario']}: {_loss_text(s['loss'])}\n"
+    return report
@@ -0,0 +1,155 @@
+# ============================================
+# tool_cache.py - Tool Result Memoization for Agent Runtimes
+# ============================================
+"""
+Bounded LRU memoization for agent tools.
+
+Apply ``@memoize`` underneath ``@tool`` so the model still sees the original
+signature and docstring:
+
+    @tool
+    @memoize(ttl=900, version=lambda args: report_versions())
+    def analyze_compliance_reports() -> str: ...
+
+The cache key is the tool name, its bound arguments (defaults applied, so
+``f(1)`` and ``f(x=1)`` share an entry) and, when given, the value of a
+``version`` callable over those arguments - e.g. S3 ETags or price file
+mtimes - so entries are invalidated as soon as the underlying data changes.
+Arguments and version are stored as a BLAKE2b digest of their canonical
+JSON, so a tool called with a whole transaction batch does not keep the
+batch alive in its key. One process-wide cache serves every session the
+container handles. Error strings are never cached.
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+TOOL_CACHE_SIZE = int(os.environ.get("TOOL_CACHE_SIZE", 512))
+TOOL_CACHE_ENABLED = os.environ.get("TOOL_CACHE_ENABLED", "true").lower() != "false"
+
+_ERROR_PREFIXES = ("Error", "❌", "⚠️")
+
+
+def cacheable(result: Any) -> bool:
+    """Don't keep error or validation messages"""
+    return not (isinstance(result, str) and result.lstrip().startswith(_ERROR_PREFIXES))
+
+
+class ToolCache:
+    """LRU of tool results with per-entry expiry and per-tool counters"""
+
+    def __init__(self, max_entries: int = TOOL_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _counter(self, tool_name: str) -> Dict[str, int]:
+        return self._stats.setdefault(tool_name, {"hits": 0, "misses": 0, "expired": 0, "evicted": 0})
+
+    def get(self, key: tuple):
+        """(found, value) for a live entry"""
+        now = time.monotonic()
+        with self._lock:
+            counter = self._counter(key[0])
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    counter["hits"] += 1
+                    return True, value
+                del self._entries[key]
+                counter["expired"] += 1
+            counter["misses"] += 1
+            return False, None
+
+    def put(self, key: tuple, value: Any, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._counter(evicted[0])["evicted"] += 1
+
+    def invalidate(self, tool_name: Optional[str] = None) -> int:
+        """Drop every entry, or only those of one tool"""
+        with self._lock:
+            keys = [k for k in self._entries if tool_name is None or k[0] == tool_name]
+            for k in keys:
+                del self._entries[k]
+            return len(keys)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            tools = {name: dict(c) for name, c in self._stats.items()}
+            hits = sum(c["hits"] for c in tools.values())
+            lookups = hits + sum(c["misses"] for c in tools.values())
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "tools": tools,
+            }
+
+
+_tool_cache = ToolCache()
+
+
+def get_tool_cache() -> ToolCache:
+    return _tool_cache
+
+
+def _digest(value: Any) -> str:
+    """Fixed-size key for any JSON-serializable value: BLAKE2b of its canonical JSON"""
+    canonical = json.dumps(value, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def memoize(ttl: float = 300, version: Optional[Callable[..., Any]] = None,
+            name: Optional[str] = None, cache: Optional[ToolCache] = None):
+    """
+    Memoize a tool function for ``ttl`` seconds.
+
+    ``version`` is called with the bound arguments (a name -> value dict) and
+    its result becomes part of the key; return anything JSON-serializable
+    that changes when the tool's source data changes.
+    """
+    def decorate(fn: Callable) -> Callable:
+        tool_name = name or fn.__name__
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            store = cache or _tool_cache
+            if not TOOL_CACHE_ENABLED:
+                return fn(*args, **kwargs)
+            try:
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                key = (tool_name, _digest([bound.arguments, version(bound.arguments) if version else None]))
+            except Exception as e:
+                logger.warning(f"⚠️ Not caching {tool_name}: {e}")
+                return fn(*args, **kwargs)
+
+            found, value = store.get(key)
+            if found:
+                logger.info(f"♻️ Tool cache hit: {tool_name}")
+                return value
+            value = fn(*args, **kwargs)
+            if cacheable(value):
+                store.put(key, value, ttl)
+            return value
+
+        wrapper.cache_ttl = ttl
+        return wrapper
+    return decorate
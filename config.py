@@ -46,6 +46,12 @@ class Config:
         }
     }
     
+    # Runtime session affinity (services/session_manager.py)
+    SESSION_AFFINITY = os.environ.get('SESSION_AFFINITY', 'true').lower() != 'false'
+    WARM_SESSIONS_PER_AGENT = int(os.environ.get('WARM_SESSIONS_PER_AGENT', 2))
+    SESSION_PIN_TTL = int(os.environ.get('SESSION_PIN_TTL', 600))  # seconds a web session keeps its runtime session
+    RUNTIME_SESSION_IDLE_TIMEOUT = int(os.environ.get('RUNTIME_SESSION_IDLE_TIMEOUT', 900))  # runtime's own idle timeout
+    
     # Execution Role
     BEDROCK_EXECUTION_ROLE = "arn:aws:iam::513826297540:role/service-role/AmazonBedrockAgentCoreRuntimeServiceRole-shahzad"
     
@@ -58,6 +64,19 @@ class Config:
     # Data refresh intervals
     DASHBOARD_REFRESH_INTERVAL = 30  # seconds
     
+    # Portfolio book
+    PORTFOLIO_BOOK_PATH = os.environ.get('PORTFOLIO_BOOK_PATH', 'data/portfolio_book.json')
+    DEFAULT_PORTFOLIO_ID = os.environ.get('DEFAULT_PORTFOLIO_ID', 'default')
+    # Price ticks are written to the book file at most this often (seconds)
+    PORTFOLIO_SAVE_INTERVAL = float(os.environ.get('PORTFOLIO_SAVE_INTERVAL', 30))
+    
+    # Local price history for the risk engine (agentcore_agents/price_history/), refreshed on startup
+    PRICE_HISTORY_REFRESH = os.environ.get('PRICE_HISTORY_REFRESH', 'true').lower() != 'false'
+    PRICE_HISTORY_SYMBOLS = os.environ.get(
+        'PRICE_HISTORY_SYMBOLS',
+        'SPY,QQQ,IWM,EFA,EEM,AGG,TLT,IEF,LQD,HYG,GLD,VNQ,AAPL,MSFT,GOOGL,AMZN,NVDA,META,JPM'
+    ).split(',')
+    
     # Transaction settings
     DEFAULT_TRANSACTION_COUNT = 10
     FRAUD_THRESHOLD = 0.7
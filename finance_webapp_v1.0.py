@@ -15,9 +15,15 @@ import boto3
 from datetime import datetime, timedelta
 import subprocess
 import json
+import os
 import requests
+import sys
 from typing import Dict, List
 
+# Keyword routing is shared with the AgentCore supervisor
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'agentcore_agents'))
+from query_router import OUT_OF_SCOPE_RESPONSE, get_query_router
+
 app = Flask(__name__)
 CORS(app)
 
@@ -338,24 +344,17 @@ class BritiveAgentCoreClient:
         """
         Supervisor logic - route to appropriate agents
         """
-        query_lower = query.lower()
         results = {}
         
-        # Determine which agents to invoke based on query
-        agents_to_call = []
-        
-        if any(word in query_lower for word in ['fraud', 'transaction', 'suspicious', 'anomaly']):
-            agents_to_call.append('fraud_detection')
-        
-        if any(word in query_lower for word in ['compliance', 'sox', 'pci', 'regulation', 'regulatory']):
-            agents_to_call.append('compliance')
-        
-        if any(word in query_lower for word in ['risk', 'var', 'portfolio', 'stress', 'volatility', 'stock']):
-            agents_to_call.append('risk_analysis')
-        
-        # Default to fraud detection if no specific keywords
+        # Determine which agents to invoke based on query (keywords, then the intent classifier)
+        agents_to_call = get_query_router().agents_for(query, default=['fraud_detection'])
         if not agents_to_call:
-            agents_to_call = ['fraud_detection']
+            return {
+                "success": True,
+                "response": OUT_OF_SCOPE_RESPONSE,
+                "agents_invoked": [],
+                "session_id": session_id
+            }
         
         # Invoke agents sequentially
         for agent_type in agents_to_call:
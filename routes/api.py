@@ -5,10 +5,13 @@
 API routes for the application
 """
 import asyncio
+import json
 from datetime import datetime
-from flask import request, jsonify
+from flask import request, jsonify, Response, stream_with_context
 from . import api_bp
-from services import FinancialDataService, BritiveClient, AgentCoreClient
+from services import FinancialDataService, BritiveClient, AgentCoreClient, RiskService
+from services.portfolio_book import get_portfolio_book
+from services.session_manager import get_session_manager
 from config import Config
 
 @api_bp.route('/analyze', methods=['POST'])
@@ -59,6 +62,53 @@ def analyze():
     
     return jsonify(result)
 
+@api_bp.route('/analyze/stream', methods=['POST'])
+def analyze_stream():
+    """Streaming analysis endpoint - server-sent events with agent tokens and tool progress as they arrive"""
+    data = request.json or {}
+    query = data.get('query', '')
+    session_id = data.get('session_id', f"session-{int(datetime.now().timestamp())}")
+    
+    if not query:
+        return jsonify({"success": False, "error": "Query is required"}), 400
+    
+    config = Config()
+    
+    def events():
+        britive_client = BritiveClient(
+            profile=config.BRITIVE_PROFILE,
+            tenant=config.BRITIVE_TENANT
+        )
+        
+        try:
+            britive_client.checkout()
+            agentcore_client = AgentCoreClient(britive_client.get_boto_session())
+            for event in agentcore_client.stream_orchestration(query, session_id):
+                yield f"data: {json.dumps(event, default=str)}\n\n"
+        except Exception as e:
+            print(f"ERROR in analyze_stream(): {e}")
+            yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+        finally:
+            britive_client.checkin()
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@api_bp.route('/session/reset', methods=['POST'])
+def reset_session():
+    """Clear a web session's conversation context with every agent (runtime sessions stay warm)"""
+    session_id = (request.json or {}).get('session_id')
+    if not session_id:
+        return jsonify({"success": False, "error": "session_id is required"}), 400
+    
+    agents = get_session_manager().reset(session_id)
+    return jsonify({"success": True, "session_id": session_id, "agents_reset": agents})
+
+@api_bp.route('/session/stats', methods=['GET'])
+def session_stats():
+    """Warm pool sizes, pins, and cold-start rate and latency per agent and session mode"""
+    return jsonify(get_session_manager().stats())
+
 @api_bp.route('/financial-data', methods=['GET'])
 def get_financial_data():
     """Get real-time financial data without invoking agents"""
@@ -78,5 +128,119 @@ def get_financial_data():
         return jsonify(service.generate_sample_transactions(20))
     elif data_type == 'compliance':
         return jsonify(service.get_compliance_data())
+    elif data_type == 'portfolio':
+        return jsonify(get_portfolio_book().summary())
+    elif data_type == 'correlation':
+        symbols = request.args.get('symbols', 'SPY,QQQ,AGG,GLD').split(',')
+        try:
+            return jsonify(service.get_correlation(
+                symbols,
+                window=int(request.args.get('window', 252)),
+                vol_window=int(request.args.get('vol_window', 21)),
+                as_of=request.args.get('as_of')
+            ))
+        except (ValueError, FileNotFoundError) as e:
+            return jsonify({"success": False, "error": str(e)}), 400
     
-    return jsonify({"error": "Invalid data type"}), 400
\ No newline at end of file
+    return jsonify({"error": "Invalid data type"}), 400
+
+@api_bp.route('/risk/batch', methods=['POST'])
+def batch_risk():
+    """VaR, CVaR, volatility and beta for many structured portfolios (no LLM)"""
+    data = request.json or {}
+    try:
+        result = RiskService().batch_risk(
+            portfolios=data.get('portfolios', []),
+            confidence=data.get('confidence', 0.95),
+            horizon_days=data.get('horizon_days', 1),
+            benchmark=data.get('benchmark', 'SPY'),
+            include_historical=bool(data.get('include_historical', False)),
+            estimator=data.get('estimator', 'sample')
+        )
+    except (TypeError, ValueError, KeyError, FileNotFoundError) as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    
+    return jsonify({"success": True, **result})
+
+@api_bp.route('/risk/stress', methods=['GET', 'POST'])
+def stress_test():
+    """Stress many portfolios against historical and hypothetical scenarios"""
+    service = RiskService()
+    
+    if request.method == 'GET':
+        return jsonify({"scenarios": service.list_scenarios()})
+    
+    data = request.json or {}
+    try:
+        result = service.stress_test(
+            portfolios=data.get('portfolios', []),
+            scenarios=data.get('scenarios'),
+            history_horizon=data.get('history_horizon_days'),
+            top_n=data.get('top_n', 5)
+        )
+    except (ValueError, FileNotFoundError) as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    
+    return jsonify({"success": True, **result})
+
+@api_bp.route('/portfolios', methods=['GET', 'POST'])
+def portfolios():
+    """List the portfolio book or create/replace a portfolio"""
+    book = get_portfolio_book()
+    
+    if request.method == 'GET':
+        return jsonify({
+            **book.summary(),
+            "portfolios": [p.to_dict() for p in book.portfolios.values()]
+        })
+    
+    data = request.json or {}
+    if not data.get('portfolio_id') or not data.get('positions'):
+        return jsonify({"success": False, "error": "portfolio_id and positions are required"}), 400
+    
+    if not isinstance(data['positions'], dict) or not isinstance(data.get('cost_basis') or {}, dict) \
+            or not isinstance(data.get('limits') or {}, dict):
+        return jsonify({"success": False, "error": "positions, cost_basis and limits must be objects"}), 400
+    
+    try:
+        portfolio = book.upsert_portfolio(
+            data['portfolio_id'],
+            name=data.get('name'),
+            positions=data['positions'],
+            cost_basis=data.get('cost_basis'),
+            cash=float(data.get('cash') or 0.0),
+            limits=data.get('limits')
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({"success": False, "error": f"Invalid portfolio: {e}"}), 400
+    return jsonify({"success": True, "portfolio": portfolio.to_dict()})
+
+@api_bp.route('/portfolios/<portfolio_id>', methods=['DELETE'])
+def delete_portfolio(portfolio_id):
+    """Remove a portfolio from the book"""
+    if not get_portfolio_book().remove_portfolio(portfolio_id):
+        return jsonify({"success": False, "error": f"Unknown portfolio {portfolio_id}"}), 404
+    return jsonify({"success": True})
+
+@api_bp.route('/portfolios/prices', methods=['POST'])
+def update_portfolio_prices():
+    """Apply price ticks (or refresh every held symbol) and re-check limits"""
+    book = get_portfolio_book()
+    prices = (request.json or {}).get('prices') if request.is_json else None
+    
+    if not prices:
+        service = FinancialDataService()
+        prices = {
+            quote['symbol']: quote['price']
+            for quote in service.get_multiple_stocks(book.symbols())
+        }
+    
+    if not isinstance(prices, dict):
+        return jsonify({"success": False, "error": "prices must map symbols to prices"}), 400
+    
+    try:
+        breaches = book.update_prices(prices)
+    except (TypeError, ValueError) as e:
+        return jsonify({"success": False, "error": f"Invalid price: {e}"}), 400
+    book.request_save()
+    return jsonify({"success": True, "updated": len(prices), "breaches": breaches, **book.summary()})
\ No newline at end of file
@@ -1,6 +1,16 @@
+import os
+import sys
+
+# Shared analytics modules (risk engine, stress tests, ...) live next to the
+# agents so they ship in the AgentCore containers; make them importable here too
+AGENT_MODULES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'agentcore_agents')
+if AGENT_MODULES_DIR not in sys.path:
+    sys.path.append(AGENT_MODULES_DIR)
+
 from .financial_data import FinancialDataService
 from .britive_client import BritiveClient
 from .agentcore_client import AgentCoreClient
 from .startup import StartupManager
+from .risk_service import RiskService
 
-__all__ = ['FinancialDataService', 'BritiveClient', 'AgentCoreClient', 'StartupManager']
\ No newline at end of file
+__all__ = ['FinancialDataService', 'BritiveClient', 'AgentCoreClient', 'StartupManager', 'RiskService']
\ No newline at end of file
@@ -1,16 +1,21 @@
 # ============================================
-# services/agentcore_client.py (FIXED WITH FRESH SESSIONS)
+# services/agentcore_client.py
 # ============================================
 """
 AgentCore client for invoking agents using Bedrock AgentCore API
 """
 import uuid
 import json
-from typing import Dict, List
+import time
+from typing import Dict, Iterator, List, Tuple
 import boto3
 import logging
 from config import Config
 from .financial_data import FinancialDataService
+from .portfolio_book import get_portfolio_book
+from .session_manager import get_session_manager
+from agent_pool import parse_event_stream
+from query_router import OUT_OF_SCOPE_RESPONSE, get_query_router
 
 # Set up logging
 logging.basicConfig(
@@ -25,6 +30,8 @@ class AgentCoreClient:
     
     def __init__(self, boto_session: boto3.Session):
         self.client = boto_session.client('bedrock-agentcore')
+        # Session warming and context resets need a client even when startup warming did not run
+        get_session_manager().configure(self.client, replace=False)
         self.data_service = FinancialDataService()
         self.config = Config()
         logger.info("🤖 AgentCore Client initialized")
@@ -44,7 +51,20 @@ class AgentCoreClient:
                 logger.info("✅ Query already contains portfolio data - passing through directly")
                 return query
             else:
-                # Only add data if query is vague
+                # Only add data if query is vague - prefer the live portfolio book
+                portfolio = get_portfolio_book().get(self.config.DEFAULT_PORTFOLIO_ID)
+                if portfolio and portfolio.position_values:
+                    enriched_query = f"{query}\n\n=== PORTFOLIO DATA ===\n"
+                    enriched_query += f"Portfolio: {portfolio.name}\n"
+                    enriched_query += f"Portfolio Value: ${portfolio.market_value:,.2f}\n"
+                    enriched_query += f"Unrealized P&L: ${portfolio.pnl:,.2f}\n\n"
+                    enriched_query += "Holdings: " + ", ".join(
+                        f"{weight * 100:.1f}% {symbol}" for symbol, weight in portfolio.weights().items()
+                    ) + "\n"
+                    enriched_query += f"\nPlease calculate VaR and analyze portfolio risk.\n"
+                    logger.info(f"✅ Added portfolio book data for {portfolio.portfolio_id}")
+                    return enriched_query
+                
                 portfolio_stocks = self.data_service.get_multiple_stocks(["AAPL", "MSFT", "GOOGL"])
                 ratios = self.data_service.get_financial_ratios("AAPL")
                 
@@ -68,6 +88,8 @@ class AgentCoreClient:
             
             for i, txn in enumerate(transactions, 1):
                 enriched_query += f"\nTransaction #{i}:\n"
+                enriched_query += f"  - Account: {txn.get('account_id', 'N/A')}\n"
+                enriched_query += f"  - Merchant: {txn.get('merchant', 'N/A')}\n"
                 enriched_query += f"  - Amount: ${txn.get('amount', 0):.2f}\n"
                 enriched_query += f"  - Risk Score: {txn.get('risk_score', 0):.2f}\n"
                 enriched_query += f"  - Status: {txn.get('flag', 'N/A')}\n"
@@ -98,47 +120,147 @@ class AgentCoreClient:
     
     def _determine_agents(self, query: str) -> List[str]:
         """Determine which agents to invoke based on query"""
-        query_lower = query.lower()
-        agents = []
+        # Shared keyword table (also used by the supervisor), then the local intent classifier;
+        # an empty list means the query is out of scope
+        routing = get_query_router().route(query, default=['fraud_detection'])
+        agents = routing["agents"]
         
-        if any(word in query_lower for word in ['fraud', 'transaction', 'suspicious', 'anomaly']):
-            agents.append('fraud_detection')
+        if routing["source"] == "classifier":
+            logger.info(f"🧠 Intent classifier: {routing['decision']} (confidence {routing['confidence']:.2f})")
+        logger.info(f"🎯 Determined agents to invoke: {', '.join(agents) or 'none (out of scope)'}")
+        return agents
+
+    def _parse_response(self, agent_type: str, response: Dict) -> Tuple[str, str]:
+        """(answer text, route path) of a non-streaming AgentCore response"""
+        # Parse response
+        full_response = ""
+        route_path = None
         
-        if any(word in query_lower for word in ['compliance', 'sox', 'pci', 'regulation', 'regulatory']):
-            agents.append('compliance')
+        if 'response' in response:
+            streaming_body = response['response']
+            logger.info(f"📡 Reading StreamingBody response...")
+            
+            try:
+                response_bytes = streaming_body.read()
+                response_text = response_bytes.decode('utf-8')
+                logger.info(f"📦 Raw response: {response_text[:500]}...")
+                
+                try:
+                    response_json = json.loads(response_text)
+                    
+                    route_path = response_json.get('path') if isinstance(response_json, dict) else None
+                    if route_path:
+                        logger.info(f"🛤️ Agent {agent_type} answered via {route_path}")
+                    
+                    if 'result' in response_json:
+                        result = response_json['result']
+                        if isinstance(result, str):
+                            # Fast-path answers are plain text
+                            full_response = result
+                        elif 'content' in result and isinstance(result['content'], list):
+                            for item in result['content']:
+                                if 'text' in item:
+                                    full_response += item['text'] + "\n"
+                        elif 'text' in result:
+                            full_response = result['text']
+                        else:
+                            full_response = json.dumps(result, indent=2)
+                    elif 'content' in response_json and isinstance(response_json['content'], list):
+                        for item in response_json['content']:
+                            if 'text' in item:
+                                full_response += item['text'] + "\n"
+                    elif 'output' in response_json:
+                        full_response = response_json['output']
+                    elif 'text' in response_json:
+                        full_response = response_json['text']
+                    elif 'message' in response_json:
+                        full_response = response_json['message']
+                    else:
+                        full_response = json.dumps(response_json, indent=2)
+                        
+                except json.JSONDecodeError:
+                    full_response = response_text
+                    
+            except Exception as e:
+                logger.error(f"❌ Error reading streaming body: {e}")
+                full_response = f"Error reading response: {e}"
         
-        if any(word in query_lower for word in ['risk', 'var', 'portfolio', 'stress', 'volatility', 'stock', 'calculate']):
-            agents.append('risk_analysis')
+        elif 'payload' in response:
+            payload_response = response['payload']
+            if isinstance(payload_response, bytes):
+                payload_str = payload_response.decode('utf-8')
+            else:
+                payload_str = str(payload_response)
+            
+            try:
+                payload_json = json.loads(payload_str)
+                if 'output' in payload_json:
+                    full_response = payload_json['output']
+                elif 'text' in payload_json:
+                    full_response = payload_json['text']
+                else:
+                    full_response = json.dumps(payload_json, indent=2)
+            except json.JSONDecodeError:
+                full_response = payload_str
         
-        # Default to fraud detection if no keywords match
-        if not agents:
-            agents.append('fraud_detection')
+        elif 'completion' in response:
+            logger.info("📡 Processing streaming completion...")
+            for chunk in response['completion']:
+                if 'text' in chunk:
+                    full_response += chunk['text']
+                elif 'content' in chunk:
+                    full_response += chunk['content']
+                elif 'chunk' in chunk:
+                    inner_chunk = chunk['chunk']
+                    if 'bytes' in inner_chunk:
+                        full_response += inner_chunk['bytes'].decode('utf-8')
+        else:
+            logger.warning(f"⚠️ Unexpected response structure: {list(response.keys())}")
+            full_response = json.dumps(response, indent=2, default=str)
+
+        return full_response, route_path
+
+    def _runtime_events(self, agent_type: str, query: str, runtime_session_id: str) -> Iterator[Dict]:
+        """Events of one runtime invocation as they arrive (agents that don't stream yield one result)"""
+        response = self.client.invoke_agent_runtime(
+            agentRuntimeArn=self.config.AGENTS[agent_type]["agent_arn"],
+            runtimeSessionId=runtime_session_id,
+            payload=json.dumps({"inputText": query, "stream": True}).encode('utf-8'),
+            contentType='application/json',
+            accept='text/event-stream'
+        )
+        logger.info(f"📥 Response received from AgentCore ({response.get('contentType', 'unknown content type')})")
         
-        logger.info(f"🎯 Determined agents to invoke: {', '.join(agents)}")
-        return agents
+        if 'text/event-stream' in response.get('contentType', '') and 'response' in response:
+            yield from parse_event_stream(response['response'].iter_lines())
+        else:
+            full_response, route_path = self._parse_response(agent_type, response)
+            yield {"type": "result", "result": full_response, "path": route_path}
 
-    async def invoke_agent(self, agent_type: str, query: str, session_id: str) -> Dict:
-        """Invoke a single AgentCore agent"""
+    def stream_agent(self, agent_type: str, query: str, session_id: str) -> Iterator[Dict]:
+        """
+        Invoke a single AgentCore agent, yielding its events as they arrive: "token" (model
+        text), "tool" (tool started/finished), then "result" or "error"; all tagged with the agent
+        """
         logger.info(f"🚀 Invoking {agent_type} agent...")
         agent_config = self.config.AGENTS[agent_type]
 
         # Check if agent is configured
         if agent_config["agent_id"].startswith("YOUR_"):
             logger.error(f"❌ Agent {agent_type} not configured")
-            return {
-                "success": False,
+            yield {
+                "type": "error",
                 "error": f"Agent {agent_type} not configured. Please deploy and update config.",
                 "agent": agent_type
             }
+            return
 
-        # CRITICAL FIX: Always generate a NEW session ID for each request
-        # This prevents the agent from using cached/old conversation context
-        session_id = str(uuid.uuid4())
-        logger.info(f"🔑 Generated FRESH session ID: {session_id}")
-
-        agent_arn = agent_config["agent_arn"]
-        logger.info(f"📝 Agent ARN: {agent_arn}")
-        logger.info(f"📝 Using session ID: {session_id}")
+        # Pinned runtime session for this web session (or a pre-warmed one), so the call
+        # lands on a running microVM instead of cold-starting a new one every time
+        sessions = get_session_manager()
+        runtime_session_id, session_mode = sessions.acquire(agent_type, session_id)
+        logger.info(f"🔑 Runtime session ({session_mode}): {runtime_session_id}")
+        logger.info(f"📝 Agent ARN: {agent_config['agent_arn']}")
 
         # Enrich query with real-time data
         enriched_query = self._enrich_query_with_data(query, agent_type)
@@ -146,131 +268,67 @@ class AgentCoreClient:
         # Log what we're actually sending
         logger.info(f"📤 Sending query to agent: {enriched_query[:200]}...")
 
+        started = time.perf_counter()
+        first_token_ms = None
         try:
-            logger.info(f"📤 Sending request to Bedrock AgentCore...")
-            
-            # Prepare payload - use only inputText, no sessionId in payload
-            payload_data = {
-                "inputText": enriched_query
-            }
-            
-            logger.info(f"📋 Payload keys: {list(payload_data.keys())}")
-            
-            # Use invoke_agent_runtime with correct parameters
-            response = self.client.invoke_agent_runtime(
-                agentRuntimeArn=agent_arn,
-                runtimeSessionId=session_id,
-                payload=json.dumps(payload_data).encode('utf-8'),
-                contentType='application/json',
-                accept='application/json'
-            )
-
-            logger.info(f"📥 Response received from AgentCore")
-            logger.info(f"📋 Response keys: {list(response.keys())}")
-
-            # Parse response
-            full_response = ""
-            
-            if 'response' in response:
-                streaming_body = response['response']
-                logger.info(f"📡 Reading StreamingBody response...")
-                
-                try:
-                    response_bytes = streaming_body.read()
-                    response_text = response_bytes.decode('utf-8')
-                    logger.info(f"📦 Raw response: {response_text[:500]}...")
-                    
-                    try:
-                        response_json = json.loads(response_text)
-                        
-                        if 'result' in response_json:
-                            result = response_json['result']
-                            if 'content' in result and isinstance(result['content'], list):
-                                for item in result['content']:
-                                    if 'text' in item:
-                                        full_response += item['text'] + "\n"
-                            elif 'text' in result:
-                                full_response = result['text']
-                            else:
-                                full_response = json.dumps(result, indent=2)
-                        elif 'content' in response_json and isinstance(response_json['content'], list):
-                            for item in response_json['content']:
-                                if 'text' in item:
-                                    full_response += item['text'] + "\n"
-                        elif 'output' in response_json:
-                            full_response = response_json['output']
-                        elif 'text' in response_json:
-                            full_response = response_json['text']
-                        elif 'message' in response_json:
-                            full_response = response_json['message']
-                        else:
-                            full_response = json.dumps(response_json, indent=2)
-                            
-                    except json.JSONDecodeError:
-                        full_response = response_text
-                        
-                except Exception as e:
-                    logger.error(f"❌ Error reading streaming body: {e}")
-                    full_response = f"Error reading response: {e}"
-            
-            elif 'payload' in response:
-                payload_response = response['payload']
-                if isinstance(payload_response, bytes):
-                    payload_str = payload_response.decode('utf-8')
-                else:
-                    payload_str = str(payload_response)
-                
-                try:
-                    payload_json = json.loads(payload_str)
-                    if 'output' in payload_json:
-                        full_response = payload_json['output']
-                    elif 'text' in payload_json:
-                        full_response = payload_json['text']
-                    else:
-                        full_response = json.dumps(payload_json, indent=2)
-                except json.JSONDecodeError:
-                    full_response = payload_str
-            
-            elif 'completion' in response:
-                logger.info("📡 Processing streaming completion...")
-                for chunk in response['completion']:
-                    if 'text' in chunk:
-                        full_response += chunk['text']
-                    elif 'content' in chunk:
-                        full_response += chunk['content']
-                    elif 'chunk' in chunk:
-                        inner_chunk = chunk['chunk']
-                        if 'bytes' in inner_chunk:
-                            full_response += inner_chunk['bytes'].decode('utf-8')
-            else:
-                logger.warning(f"⚠️ Unexpected response structure: {list(response.keys())}")
-                full_response = json.dumps(response, indent=2, default=str)
-
-            if not full_response.strip():
-                full_response = f"Agent {agent_type} completed but returned empty response."
-
-            logger.info(f"✅ Agent {agent_type} responded successfully ({len(full_response)} chars)")
-            return {
-                "success": True,
-                "response": full_response,
-                "agent": agent_type
-            }
+            for event in self._runtime_events(agent_type, enriched_query, runtime_session_id):
+                if event["type"] == "error":
+                    raise RuntimeError(event.get("error") or "agent reported an error")
+                if event["type"] == "token" and first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - started) * 1000
+                    logger.info(f"⏱️ First token from {agent_type} after {first_token_ms:.0f} ms")
+                elif event["type"] == "tool":
+                    logger.info(f"🔧 {agent_type} tool {event.get('name')}: {event.get('status')}")
+                elif event["type"] == "result":
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    sessions.record(agent_type, session_mode, elapsed_ms)
+                    event = {**event, "session_mode": session_mode, "elapsed_ms": round(elapsed_ms, 1),
+                             "first_token_ms": None if first_token_ms is None else round(first_token_ms, 1)}
+                yield {**event, "agent": agent_type}
 
         except Exception as e:
             logger.error(f"❌ Error invoking {agent_type}: {str(e)}")
             logger.error(f"📋 Error type: {type(e).__name__}")
             import traceback
             logger.error(f"📋 Traceback:\n{traceback.format_exc()}")
-            return {
-                "success": False,
-                "error": str(e),
-                "agent": agent_type
-            }
+            # The runtime session may be broken - don't pin the next request to it
+            sessions.record(agent_type, session_mode, (time.perf_counter() - started) * 1000, success=False)
+            sessions.release(agent_type, session_id, discard=True)
+            yield {"type": "error", "error": str(e), "agent": agent_type}
+
+    async def invoke_agent(self, agent_type: str, query: str, session_id: str) -> Dict:
+        """Invoke a single AgentCore agent, consuming its response stream incrementally"""
+        tokens = []
+        result = None
+        for event in self.stream_agent(agent_type, query, session_id):
+            if event["type"] == "token":
+                tokens.append(event.get("text", ""))
+            elif event["type"] == "result":
+                result = event
+            elif event["type"] == "error":
+                return {"success": False, "error": event["error"], "agent": agent_type}
+
+        result = result or {}
+        answer = result.get("result", "")
+        full_response = "".join(tokens) or (answer if isinstance(answer, str) else json.dumps(answer, indent=2))
+        if not full_response.strip():
+            full_response = f"Agent {agent_type} completed but returned empty response."
+
+        logger.info(f"✅ Agent {agent_type} responded successfully ({len(full_response)} chars, "
+                    f"{result.get('elapsed_ms', 0):.0f} ms on a {result.get('session_mode')} session)")
+        return {
+            "success": True,
+            "response": full_response,
+            "agent": agent_type,
+            "path": result.get("path") or "unknown",
+            "session_mode": result.get("session_mode"),
+            "elapsed_ms": result.get("elapsed_ms")
+        }
 
     async def orchestrate(self, query: str, session_id: str = None) -> Dict:
         """Orchestrate multiple agents"""
-        # Note: We generate a session_id here but each agent will generate its own fresh one
-        if not session_id or len(session_id) < 33:
+        # The web session id only keys runtime session pins, so any caller id works
+        if not session_id:
             session_id = str(uuid.uuid4())
             logger.info(f"🔑 Generated new session ID for orchestration: {session_id}")
 
@@ -278,11 +336,17 @@ class AgentCoreClient:
         logger.info(f"🔑 Session ID: {session_id}")
 
         agents_to_call = self._determine_agents(query)
+        if not agents_to_call:
+            return {
+                "success": True,
+                "response": OUT_OF_SCOPE_RESPONSE,
+                "agents_invoked": [],
+                "session_id": session_id
+            }
         results = {}
 
         for agent_type in agents_to_call:
             logger.info(f"⏳ Processing agent: {agent_type}")
-            # Pass session_id but invoke_agent will generate a fresh one anyway
             result = await self.invoke_agent(agent_type, query, session_id)
             results[agent_type] = result
 
@@ -309,4 +373,25 @@ class AgentCoreClient:
             "response": combined_response,
             "agents_invoked": agents_to_call,
             "session_id": session_id
-        }
\ No newline at end of file
+        }
+
+    def stream_orchestration(self, query: str, session_id: str = None) -> Iterator[Dict]:
+        """
+        Orchestrate agents as an event stream: the plan, then each agent's
+        token/tool/result events as they arrive, then "done"
+        """
+        if not session_id:
+            session_id = str(uuid.uuid4())
+            logger.info(f"🔑 Generated new session ID for orchestration: {session_id}")
+
+        logger.info(f"🎭 Starting streamed orchestration for query: '{query[:50]}...'")
+        agents_to_call = self._determine_agents(query)
+        yield {"type": "plan", "agents": agents_to_call, "session_id": session_id}
+        if not agents_to_call:
+            yield {"type": "result", "result": OUT_OF_SCOPE_RESPONSE, "path": "out_of_scope"}
+
+        for agent_type in agents_to_call:
+            yield {"type": "agent_start", "agent": agent_type}
+            yield from self.stream_agent(agent_type, query, session_id)
+
+        yield {"type": "done", "agents_invoked": agents_to_call, "session_id": session_id}
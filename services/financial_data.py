@@ -6,6 +6,7 @@ Financial data service - fetches real-time financial data
 """
 from datetime import datetime, timedelta
 from typing import Dict, List
+import os
 import random
 
 try:
@@ -99,6 +100,55 @@ class FinancialDataService:
         
         return stocks_data
     
+    def save_price_history(self, symbols: List[str], directory: str, period: str = "10y",
+                           recent_period: str = "1mo") -> List[str]:
+        """
+        Download daily history and save one CSV per symbol for the risk engine.
+        Symbols that already have a file only get the bars after their last
+        one appended (``recent_period`` is downloaded), date by date, so the
+        risk engine's covariance estimators roll forward incrementally.
+        """
+        if not self.yfinance_available:
+            return []
+        from price_history import append_closes, available_symbols
+        
+        os.makedirs(directory, exist_ok=True)
+        existing = set(available_symbols(directory))
+        saved = []
+        recent_bars: Dict[str, Dict[str, float]] = {}
+        for symbol in symbols:
+            try:
+                if symbol.upper() in existing:
+                    hist = yf.Ticker(symbol).history(period=recent_period, auto_adjust=False)
+                    for date, close in zip(hist.index.strftime("%Y-%m-%d"), hist['Adj Close']):
+                        if close == close:  # skip NaN closes
+                            recent_bars.setdefault(date, {})[symbol.upper()] = float(close)
+                    continue
+                hist = yf.Ticker(symbol).history(period=period, auto_adjust=False)
+                if hist.empty:
+                    continue
+                hist.index = hist.index.strftime("%Y-%m-%d")
+                hist.index.name = "Date"
+                hist[['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']].to_csv(
+                    os.path.join(directory, f"{symbol.upper()}.csv")
+                )
+                saved.append(symbol.upper())
+            except Exception as e:
+                print(f"Error saving price history for {symbol}: {e}")
+        
+        updated = set()
+        for date in sorted(recent_bars):
+            updated.update(append_closes(recent_bars[date], date, directory))
+        
+        return saved + sorted(updated)
+    
+    def get_correlation(self, symbols: List[str], window: int = 252, vol_window: int = 21,
+                        as_of: str = None) -> Dict:
+        """Correlation matrix and rolling volatility from local price history"""
+        from market_statistics import correlation_payload, correlation_statistics
+        
+        return correlation_payload(correlation_statistics(symbols, window, vol_window, as_of))
+    
     def generate_sample_transactions(self, count: int = 10) -> List[Dict]:
         """Generate realistic sample transactions for fraud detection"""
         transactions = []
@@ -117,6 +167,7 @@ class FinancialDataService:
                 pattern = random.choice(suspicious_patterns)
                 transaction = {
                     "transaction_id": f"TXN{1000 + i}",
+                    "account_id": f"ACCT{random.randint(500, 505)}",
                     "amount": round(pattern["amount"], 2),
                     "timestamp": (base_time - timedelta(hours=random.randint(0, 48))).isoformat(),
                     "merchant": random.choice(["Online Retailer", "International Wire", "Crypto Exchange", "Unknown Merchant"]),
@@ -126,6 +177,7 @@ class FinancialDataService:
             else:
                 transaction = {
                     "transaction_id": f"TXN{1000 + i}",
+                    "account_id": f"ACCT{random.randint(100, 199)}",
                     "amount": round(random.uniform(10, 500), 2),
                     "timestamp": (base_time - timedelta(hours=random.randint(0, 48))).isoformat(),
                     "merchant": random.choice(["Grocery Store", "Gas Station", "Restaurant", "Pharmacy"]),
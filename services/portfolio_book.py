@@ -0,0 +1,312 @@
+# ============================================
+# services/portfolio_book.py
+# ============================================
+"""
+Live portfolio book - positions for many portfolios with incremental
+mark-to-market, P&L and risk-limit monitoring
+"""
+from collections import defaultdict, deque
+from datetime import datetime
+from typing import Dict, List, Optional
+import atexit
+import json
+import logging
+import math
+import os
+import threading
+import time
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def _number(value, what: str) -> float:
+    """A finite float; "nan" and "inf" strings parse with float() but would poison every mark"""
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"{what} must be a finite number, got {value!r}")
+    return number
+
+
+def _price(value, symbol: str) -> float:
+    price = _number(value, f"Price for {symbol}")
+    if price <= 0:
+        raise ValueError(f"Price for {symbol} must be positive, got {value!r}")
+    return price
+
+
+class Portfolio:
+    """Positions, marks and limits for one portfolio"""
+
+    def __init__(self, portfolio_id: str, name: str = None, positions: Dict[str, float] = None,
+                 cost_basis: Dict[str, float] = None, cash: float = 0.0, limits: Dict = None):
+        self.portfolio_id = portfolio_id
+        self.name = name or portfolio_id
+        self.positions = {s.upper(): _number(q, f"Quantity of {s}") for s, q in (positions or {}).items()}
+        self.cost_basis = {s.upper(): _number(c, f"Cost basis of {s}") for s, c in (cost_basis or {}).items()}
+        self.cash = _number(cash, "Cash")
+        self.limits = {k: _number(v, f"Limit {k}") for k, v in (limits or {}).items()}
+        self.position_values: Dict[str, float] = {}
+        self.active_breaches = set()
+        self.market_value = self.cash
+        self.cost = self.cash + sum(self.positions[s] * self.cost_basis.get(s, 0.0) for s in self.positions)
+
+    @property
+    def pnl(self) -> float:
+        return self.market_value - self.cost
+
+    def weights(self) -> Dict[str, float]:
+        invested = sum(self.position_values.values())
+        if invested <= 0:
+            return {}
+        return {s: v / invested for s, v in self.position_values.items()}
+
+    def to_dict(self) -> Dict:
+        return {
+            "portfolio_id": self.portfolio_id,
+            "name": self.name,
+            "positions": self.positions,
+            "cost_basis": self.cost_basis,
+            "cash": self.cash,
+            "limits": self.limits,
+            "market_value": self.market_value,
+            "pnl": self.pnl,
+            "position_values": self.position_values,
+        }
+
+
+class PortfolioBook:
+    """
+    Book of portfolios indexed by symbol.
+
+    A price update only touches the portfolios that hold the symbol: each
+    affected portfolio's market value moves by quantity x price change and
+    its limits are re-checked, so the cost scales with the size of the
+    affected portfolios rather than the size of the book. Price state is
+    written to disk at most every ``save_interval`` seconds
+    (``request_save``); portfolio changes are saved immediately.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_alerts: int = 200,
+                 save_interval: float = Config.PORTFOLIO_SAVE_INTERVAL):
+        self.path = path
+        self.save_interval = save_interval
+        self._dirty = False
+        self._last_save = 0.0
+        self._save_timer: Optional[threading.Timer] = None
+        self.portfolios: Dict[str, Portfolio] = {}
+        self.holders: Dict[str, set] = defaultdict(set)
+        self.prices: Dict[str, float] = {}
+        self.alerts = deque(maxlen=max_alerts)
+        self._lock = threading.RLock()
+        if path and os.path.exists(path):
+            self.load()
+
+    # ---- positions -------------------------------------------------------
+
+    def upsert_portfolio(self, portfolio_id: str, name: str = None, positions: Dict[str, float] = None,
+                         cost_basis: Dict[str, float] = None, cash: float = 0.0,
+                         limits: Dict = None, persist: bool = True) -> Portfolio:
+        """Create or replace a portfolio and mark it at the latest known prices"""
+        # Built first, so invalid input leaves the existing portfolio in place
+        portfolio = Portfolio(portfolio_id, name, positions, cost_basis, cash, limits)
+        with self._lock:
+            self.remove_portfolio(portfolio_id, persist=False)
+            self.portfolios[portfolio_id] = portfolio
+            for symbol in portfolio.positions:
+                self.holders[symbol].add(portfolio_id)
+                price = self.prices.get(symbol, portfolio.cost_basis.get(symbol, 0.0))
+                portfolio.position_values[symbol] = portfolio.positions[symbol] * price
+            portfolio.market_value = portfolio.cash + sum(portfolio.position_values.values())
+            self._check_limits(portfolio)
+            if persist:
+                self.save()
+            return portfolio
+
+    def remove_portfolio(self, portfolio_id: str, persist: bool = True) -> bool:
+        with self._lock:
+            portfolio = self.portfolios.pop(portfolio_id, None)
+            if not portfolio:
+                return False
+            for symbol in portfolio.positions:
+                self.holders[symbol].discard(portfolio_id)
+                if not self.holders[symbol]:
+                    del self.holders[symbol]
+            if persist:
+                self.save()
+            return True
+
+    # ---- market data -----------------------------------------------------
+
+    def update_price(self, symbol: str, price: float) -> List[Dict]:
+        """Apply one price tick; returns any limit breaches it caused"""
+        return self.update_prices({symbol: price})
+
+    def update_prices(self, prices: Dict[str, float]) -> List[Dict]:
+        """
+        Apply a batch of ticks, then re-check the limits of every portfolio
+        they touched once. Prices must be finite and positive, and are all
+        validated before any is applied.
+        """
+        ticks = {symbol.upper(): _price(price, symbol) for symbol, price in prices.items()}
+        with self._lock:
+            affected = set()
+            for symbol, price in ticks.items():
+                self.prices[symbol] = price
+                for portfolio_id in self.holders.get(symbol, ()):
+                    portfolio = self.portfolios[portfolio_id]
+                    value = portfolio.positions[symbol] * price
+                    portfolio.market_value += value - portfolio.position_values.get(symbol, 0.0)
+                    portfolio.position_values[symbol] = value
+                    affected.add(portfolio_id)
+            breaches = []
+            for portfolio_id in sorted(affected):
+                breaches.extend(self._check_limits(self.portfolios[portfolio_id]))
+            return breaches
+
+    def symbols(self) -> List[str]:
+        return sorted(self.holders)
+
+    # ---- limits ----------------------------------------------------------
+
+    def _check_limits(self, portfolio: Portfolio) -> List[Dict]:
+        """
+        Limits: max_loss (P&L floor, $), min_value ($), and max_position_pct
+        (concentration of any single position - every position, since a tick
+        moves all weights through the total value). Alerts fire when a limit
+        is first breached, not on every tick while it stays breached.
+        """
+        limits = portfolio.limits
+        checks = []
+
+        if "max_loss" in limits:
+            floor = -abs(float(limits["max_loss"]))
+            checks.append((("max_loss", None), portfolio.pnl < floor, portfolio.pnl, floor))
+        if "min_value" in limits:
+            floor = float(limits["min_value"])
+            checks.append((("min_value", None), portfolio.market_value < floor, portfolio.market_value, floor))
+        if "max_position_pct" in limits and portfolio.market_value > 0:
+            cap = float(limits["max_position_pct"])
+            for s in portfolio.position_values:
+                share = portfolio.position_values.get(s, 0.0) / portfolio.market_value
+                checks.append((("max_position_pct", s), share > cap, share, cap))
+
+        breaches = []
+        for key, breached, value, threshold in checks:
+            if not breached:
+                portfolio.active_breaches.discard(key)
+            elif key not in portfolio.active_breaches:
+                portfolio.active_breaches.add(key)
+                breaches.append(self._breach(portfolio, key[0], value, threshold, key[1]))
+
+        self.alerts.extend(breaches)
+        return breaches
+
+    @staticmethod
+    def _breach(portfolio: Portfolio, limit: str, value: float, threshold: float, symbol: str = None) -> Dict:
+        breach = {
+            "portfolio_id": portfolio.portfolio_id,
+            "limit": limit,
+            "value": value,
+            "threshold": threshold,
+            "timestamp": datetime.now().isoformat()
+        }
+        if symbol:
+            breach["symbol"] = symbol
+        logger.warning(f"🚨 Limit breach {portfolio.portfolio_id}: {limit} {value:,.4f} vs {threshold:,.4f}")
+        return breach
+
+    # ---- views -----------------------------------------------------------
+
+    def get(self, portfolio_id: str) -> Optional[Portfolio]:
+        return self.portfolios.get(portfolio_id)
+
+    def summary(self) -> Dict:
+        """Book-level totals for the dashboard"""
+        with self._lock:
+            return {
+                "portfolio_count": len(self.portfolios),
+                "market_value": sum(p.market_value for p in self.portfolios.values()),
+                "pnl": sum(p.pnl for p in self.portfolios.values()),
+                "symbols": len(self.holders),
+                "active_alerts": sum(len(p.active_breaches) for p in self.portfolios.values()),
+                "recent_alerts": list(self.alerts)[-10:],
+            }
+
+    # ---- persistence -----------------------------------------------------
+
+    def request_save(self):
+        """
+        Save price state, at most every ``save_interval`` seconds: a request
+        inside the interval is written by one trailing save when it ends
+        """
+        if not self.path:
+            return
+        with self._lock:
+            self._dirty = True
+            wait = self._last_save + self.save_interval - time.monotonic()
+            if wait > 0:
+                if self._save_timer is None:
+                    self._save_timer = threading.Timer(wait, self.flush)
+                    self._save_timer.daemon = True
+                    self._save_timer.start()
+                return
+        self.save()
+
+    def flush(self):
+        """Write pending price state now"""
+        with self._lock:
+            self._save_timer = None
+            dirty = self._dirty
+        if dirty:
+            self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            self._dirty = False
+            self._last_save = time.monotonic()
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({
+                    "prices": self.prices,
+                    "portfolios": [
+                        {k: v for k, v in p.to_dict().items() if k in
+                         ("portfolio_id", "name", "positions", "cost_basis", "cash", "limits")}
+                        for p in self.portfolios.values()
+                    ]
+                }, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def load(self):
+        with open(self.path) as f:
+            data = json.load(f)
+        with self._lock:
+            self.prices = {}
+            for symbol, price in data.get("prices", {}).items():
+                try:
+                    self.prices[symbol.upper()] = _price(price, symbol)
+                except (TypeError, ValueError) as e:
+                    logger.warning(f"⚠️ Dropping saved price: {e}")
+            for p in data.get("portfolios", []):
+                self.upsert_portfolio(persist=False, **p)
+            self.alerts.clear()
+        logger.info(f"📒 Loaded {len(self.portfolios)} portfolios from {self.path}")
+
+
+_book: Optional[PortfolioBook] = None
+_book_lock = threading.Lock()
+
+
+def get_portfolio_book() -> PortfolioBook:
+    """Process-wide book shared by the API routes and the agent client"""
+    global _book
+    with _book_lock:
+        if _book is None:
+            _book = PortfolioBook(Config.PORTFOLIO_BOOK_PATH)
+            atexit.register(_book.flush)
+        return _book
@@ -0,0 +1,151 @@
+# ============================================
+# services/risk_service.py
+# ============================================
+"""
+Risk analytics service - deterministic portfolio risk calculations that
+run directly in the webapp (no agent or LLM round-trip)
+"""
+from typing import Dict, List
+import logging
+import time
+
+import numpy as np
+
+from covariance_cache import get_covariance_cache
+from price_history import load_price_matrix, simple_returns
+from risk_engine import batch_portfolio_metrics
+from stress_testing import SCENARIO_LIBRARY, StressTestEngine, build_exposures
+
+logger = logging.getLogger(__name__)
+
+
+def _is_number(value) -> bool:
+    """Real, finite numbers only (bools and numeric strings are rejected)"""
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and np.isfinite(value)
+
+
+def _finite_or_none(value):
+    """JSON has no NaN/Infinity: undefined metrics are reported as null"""
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+
+def _positive_int(value, field: str) -> int:
+    """Whole number >= 1 from JSON input (accepts 5, 5.0 and "5")"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be a positive integer")
+    if not np.isfinite(number) or number < 1 or number != int(number):
+        raise ValueError(f"{field} must be a positive integer")
+    return int(number)
+
+
+def _probability(value, field: str) -> float:
+    """A number strictly between 0 and 1 from JSON input"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be a number between 0 and 1")
+    if not 0 < number < 1:
+        raise ValueError(f"{field} must be between 0 and 1 (exclusive)")
+    return number
+
+
+class RiskService:
+    """Service for batch portfolio risk calculations"""
+    
+    def __init__(self):
+        self.stress_engine = StressTestEngine()
+    
+    def list_scenarios(self) -> List[str]:
+        """Names of the built-in stress scenarios"""
+        return list(SCENARIO_LIBRARY)
+    
+    def _validate(self, portfolios: List[Dict]):
+        if not portfolios:
+            raise ValueError("At least one portfolio is required")
+        
+        if not isinstance(portfolios, list):
+            raise ValueError("portfolios must be a list")
+        
+        for i, portfolio in enumerate(portfolios):
+            if not isinstance(portfolio, dict):
+                raise ValueError(f"Portfolio {i + 1} must be an object")
+            name = portfolio.get('name', i + 1)
+            holdings = portfolio.get("holdings")
+            if not holdings or not isinstance(holdings, dict):
+                raise ValueError(f"Portfolio {name} has no holdings")
+            for symbol, weight in holdings.items():
+                if not _is_number(weight):
+                    raise ValueError(f"Portfolio {name} has a non-numeric weight for {symbol}")
+            if sum(holdings.values()) <= 0:
+                raise ValueError(f"Portfolio {name} weights must sum to a positive number")
+            if not _is_number(portfolio.get("value", 0)) or float(portfolio.get("value", 0)) <= 0:
+                raise ValueError(f"Portfolio {name} needs a positive value")
+    
+    def batch_risk(self, portfolios: List[Dict], confidence: float = 0.95, horizon_days: int = 1,
+                   benchmark: str = "SPY", include_historical: bool = False,
+                   estimator: str = "sample") -> Dict:
+        """
+        VaR, CVaR, volatility and beta for many portfolios in one pass: all
+        weights are stacked into one matrix against a shared covariance matrix
+        """
+        self._validate(portfolios)
+        horizon_days = _positive_int(horizon_days, "horizon_days")
+        confidence = _probability(confidence, "confidence")
+        if benchmark is not None and not isinstance(benchmark, str):
+            raise ValueError("benchmark must be a ticker symbol")
+        started = time.perf_counter()
+        
+        symbols, exposures = build_exposures(portfolios)
+        benchmark = benchmark.strip().upper() if benchmark else None
+        universe = symbols + ([benchmark] if benchmark and benchmark not in symbols else [])
+        if estimator not in ("sample", "ewma"):
+            raise ValueError(f"Unknown estimator '{estimator}'")
+        mean, cov = get_covariance_cache().moments(universe, kind=estimator)
+        
+        values = exposures.sum(axis=1)
+        weights = np.zeros((len(portfolios), len(universe)))
+        np.divide(exposures, values[:, None], out=weights[:, :len(symbols)], where=values[:, None] > 0)
+        
+        returns = None
+        if include_historical:
+            _, prices = load_price_matrix(universe)
+            returns = simple_returns(prices)
+        
+        metrics = batch_portfolio_metrics(
+            weights, mean, cov, values,
+            benchmark_index=universe.index(benchmark) if benchmark else None,
+            confidence=confidence, horizon=horizon_days, returns=returns
+        )
+        
+        results = []
+        for i, portfolio in enumerate(portfolios):
+            row = {"name": portfolio.get("name", f"portfolio_{i + 1}"), "value": float(values[i])}
+            row.update({key: _finite_or_none(metric[i]) for key, metric in metrics.items()})
+            results.append(row)
+        
+        elapsed = time.perf_counter() - started
+        logger.info(f"📐 Batch risk for {len(portfolios)} portfolios in {elapsed * 1000:.1f} ms")
+        return {
+            "confidence": confidence,
+            "horizon_days": horizon_days,
+            "benchmark": benchmark,
+            "estimator": estimator,
+            "portfolios": results,
+            "elapsed_ms": elapsed * 1000,
+            "portfolios_per_second": len(portfolios) / elapsed if elapsed > 0 else None
+        }
+    
+    def stress_test(self, portfolios: List[Dict], scenarios: List[str] = None,
+                    history_horizon: int = None, top_n: int = 5) -> Dict:
+        """Stress many portfolios against the scenario library in one pass"""
+        self._validate(portfolios)
+        top_n = _positive_int(top_n, "top_n")
+        if history_horizon is not None:
+            history_horizon = _positive_int(history_horizon, "history_horizon_days")
+        if scenarios is not None and (not isinstance(scenarios, list)
+                                      or not all(isinstance(n, str) for n in scenarios)):
+            raise ValueError("scenarios must be a list of scenario names")
+        return self.stress_engine.run(portfolios, scenarios, history_horizon, top_n)
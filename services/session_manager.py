@@ -0,0 +1,277 @@
+# ============================================
+# services/session_manager.py - Runtime Session Affinity and Warm Pool
+# ============================================
+"""
+Keeps AgentCore runtime sessions warm and pins web sessions to them.
+
+Every new ``runtimeSessionId`` starts a new runtime microVM, so generating
+a fresh id per invocation made every call a cold start. Instead:
+
+  * a small pool of pre-warmed runtime sessions is kept per agent - each
+    warmed with a cheap fast-path request that never reaches the model;
+  * the first request of a web session takes a warm session (or starts a
+    cold one when the pool is empty) and stays pinned to it while it is
+    used within ``SESSION_PIN_TTL`` seconds;
+  * when a pin expires or the user resets, the runtime session's
+    conversation is cleared explicitly (``{"action": "reset_session"}``)
+    and the still-warm session goes back to the pool instead of being
+    abandoned. Sessions idle past the runtime's own idle timeout are
+    dropped, since the runtime will have stopped them.
+
+The warm pools are topped up whenever a request finds one below
+``WARM_SESSIONS_PER_AGENT`` - also after idle sessions were dropped, so
+a webapp that sat idle does not stay cold. The manager uses the
+bedrock-agentcore client configured at startup, or else the first
+``AgentCoreClient``'s.
+
+Every invocation is recorded with how its session was obtained ("pinned",
+"warm", "cold", or "fresh" when affinity is disabled), so cold-start rates
+and latency can be compared between affinity and fresh sessions
+(``GET /api/session/stats``).
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import json
+import logging
+import threading
+import time
+import uuid
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+WARM_ACTION = "agent_pool_stats"
+RESET_ACTION = "reset_session"
+LATENCY_SAMPLES = 500
+MODES = ("pinned", "warm", "cold", "fresh")
+
+
+class _RuntimeSession:
+    __slots__ = ("session_id", "last_used")
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.last_used = time.monotonic()
+
+
+class RuntimeSessionManager:
+    """Warm runtime sessions per agent, web session pins and per-mode latency metrics"""
+
+    def __init__(self, agents: Dict[str, Dict] = None, warm_per_agent: int = Config.WARM_SESSIONS_PER_AGENT,
+                 pin_ttl: float = Config.SESSION_PIN_TTL, idle_timeout: float = Config.RUNTIME_SESSION_IDLE_TIMEOUT,
+                 affinity: bool = Config.SESSION_AFFINITY):
+        self.agents = agents or Config.AGENTS
+        self.warm_per_agent = warm_per_agent
+        self.pin_ttl = pin_ttl
+        self.idle_timeout = idle_timeout
+        self.affinity = affinity
+        self.client = None
+        self._warm: Dict[str, deque] = {agent: deque() for agent in self.agents}
+        self._pins: Dict[Tuple[str, str], _RuntimeSession] = {}
+        self._latency: Dict[str, Dict[str, deque]] = {}
+        self._failures: Dict[str, Dict[str, int]] = {}
+        self._warming: Dict[str, int] = {agent: 0 for agent in self.agents}
+        self._lock = threading.Lock()
+        self._background = ThreadPoolExecutor(max_workers=4, thread_name_prefix="session-warmer")
+
+    def configure(self, client, replace: bool = True):
+        """bedrock-agentcore client used for warming, refills and context resets (kept if set and not replace)"""
+        with self._lock:
+            if replace or self.client is None:
+                self.client = client
+
+    # ---- runtime calls ---------------------------------------------------
+
+    def _call(self, agent_type: str, session_id: str, payload: Dict, client=None) -> Dict:
+        client = client or self.client
+        if client is None:
+            raise RuntimeError("No AgentCore client configured for session management")
+        response = client.invoke_agent_runtime(
+            agentRuntimeArn=self.agents[agent_type]["agent_arn"],
+            runtimeSessionId=session_id,
+            payload=json.dumps(payload).encode('utf-8'),
+            contentType='application/json',
+            accept='application/json'
+        )
+        body = response['response'].read().decode('utf-8') if 'response' in response else "{}"
+        return json.loads(body or "{}")
+
+    def _warm_one(self, agent_type: str, client=None) -> Optional[str]:
+        session_id = str(uuid.uuid4())
+        started = time.perf_counter()
+        try:
+            self._call(agent_type, session_id, {"action": WARM_ACTION}, client)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not warm a {agent_type} session: {e}")
+            return None
+        finally:
+            with self._lock:
+                self._warming[agent_type] -= 1
+        with self._lock:
+            if len(self._warm[agent_type]) >= self.warm_per_agent:
+                return None
+            self._warm[agent_type].append(_RuntimeSession(session_id))
+        logger.info(f"🔥 Warmed {agent_type} session {session_id[:8]} in {(time.perf_counter() - started) * 1000:.0f} ms")
+        return session_id
+
+    def warm(self, agent_types: List[str] = None, per_agent: int = None, client=None) -> Dict[str, List[str]]:
+        """Top up the warm pools (concurrently); returns the new session ids per agent"""
+        per_agent = self.warm_per_agent if per_agent is None else per_agent
+        jobs = {}
+        for agent_type in agent_types or list(self.agents):
+            with self._lock:
+                self._drop_idle(agent_type)
+                missing = max(per_agent - len(self._warm[agent_type]), 0)
+                self._warming[agent_type] += missing
+            jobs[agent_type] = [self._background.submit(self._warm_one, agent_type, client) for _ in range(missing)]
+        return {agent_type: [sid for sid in (f.result() for f in futures) if sid]
+                for agent_type, futures in jobs.items()}
+
+    def _reset_and_return(self, agent_type: str, session: _RuntimeSession, client=None):
+        """Clear the conversation of a released session and put it back in the warm pool"""
+        try:
+            self._call(agent_type, session.session_id, {"action": RESET_ACTION}, client)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not reset {agent_type} session {session.session_id[:8]} - discarding it: {e}")
+            return
+        session.last_used = time.monotonic()
+        with self._lock:
+            if len(self._warm[agent_type]) < self.warm_per_agent:
+                self._warm[agent_type].append(session)
+                return
+        logger.info(f"♻️ Warm pool for {agent_type} is full - released session {session.session_id[:8]}")
+
+    # ---- pinning ---------------------------------------------------------
+
+    def _drop_idle(self, agent_type: str):
+        """Forget warm sessions the runtime has stopped for inactivity (caller holds the lock)"""
+        pool = self._warm[agent_type]
+        now = time.monotonic()
+        while pool and now - pool[0].last_used > self.idle_timeout:
+            pool.popleft()
+
+    def _missing(self, agent_type: str) -> int:
+        """Warm sessions to start so the pool is full once in-flight warmups land (caller holds the lock)"""
+        missing = max(self.warm_per_agent - len(self._warm[agent_type]) - self._warming[agent_type], 0)
+        self._warming[agent_type] += missing
+        return missing
+
+    def _expire_pins(self) -> List[Tuple[str, _RuntimeSession]]:
+        """Remove pins unused for pin_ttl (caller holds the lock); returns sessions to reset"""
+        now = time.monotonic()
+        expired = [key for key, s in self._pins.items() if now - s.last_used > self.pin_ttl]
+        released = []
+        for key in expired:
+            session = self._pins.pop(key)
+            if now - session.last_used <= self.idle_timeout:
+                released.append((key[0], session))
+        return released
+
+    def acquire(self, agent_type: str, web_session_id: str) -> Tuple[str, str]:
+        """(runtime session id, mode) for a call; mode is pinned, warm, cold or fresh"""
+        if not self.affinity or not web_session_id:
+            return str(uuid.uuid4()), "fresh"
+        key = (agent_type, web_session_id)
+        now = time.monotonic()
+        refill = 0
+        with self._lock:
+            released = self._expire_pins()
+            session = self._pins.get(key)
+            if session is not None:
+                mode = "pinned"
+            else:
+                self._drop_idle(agent_type)
+                if self._warm[agent_type]:
+                    session, mode = self._warm[agent_type].popleft(), "warm"
+                else:
+                    session, mode = _RuntimeSession(str(uuid.uuid4())), "cold"
+                self._pins[key] = session
+            session.last_used = now
+            if self.client is not None:
+                refill = self._missing(agent_type)
+        if released and self.client is None:
+            logger.warning(f"⚠️ No AgentCore client configured - {len(released)} expired pin(s) released without reset")
+        if self.client is not None:
+            for released_agent, released_session in released:
+                self._background.submit(self._reset_and_return, released_agent, released_session)
+            for _ in range(refill):
+                self._background.submit(self._warm_one, agent_type)
+        return session.session_id, mode
+
+    def release(self, agent_type: str, web_session_id: str, discard: bool = False, client=None):
+        """Unpin a web session from an agent; reset and recycle its runtime session unless discarded"""
+        with self._lock:
+            session = self._pins.pop((agent_type, web_session_id), None)
+        if session is not None and not discard and (client or self.client) is not None:
+            self._reset_and_return(agent_type, session, client)
+
+    def reset(self, web_session_id: str, client=None) -> List[str]:
+        """Explicitly clear a web session's conversation context with every agent"""
+        with self._lock:
+            agents = [agent for agent, web in self._pins if web == web_session_id]
+        for agent_type in agents:
+            self.release(agent_type, web_session_id, client=client)
+        return agents
+
+    # ---- metrics ---------------------------------------------------------
+
+    def record(self, agent_type: str, mode: str, elapsed_ms: float, success: bool = True):
+        with self._lock:
+            samples = self._latency.setdefault(agent_type, {m: deque(maxlen=LATENCY_SAMPLES) for m in MODES})
+            failures = self._failures.setdefault(agent_type, {m: 0 for m in MODES})
+            samples[mode].append(elapsed_ms)
+            if not success:
+                failures[mode] += 1
+
+    @staticmethod
+    def _latency_summary(samples: List[float]) -> Dict:
+        if not samples:
+            return {"calls": 0}
+        ordered = sorted(samples)
+        return {
+            "calls": len(ordered),
+            "avg_ms": round(sum(ordered) / len(ordered), 1),
+            "p50_ms": round(ordered[len(ordered) // 2], 1),
+            "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1),
+        }
+
+    def stats(self) -> Dict:
+        """Pool sizes, pins, and per agent the cold-start rate and latency for affinity vs fresh sessions"""
+        with self._lock:
+            agents = {}
+            for agent_type, samples in self._latency.items():
+                affinity_calls = sum(len(samples[m]) for m in ("pinned", "warm", "cold"))
+                agents[agent_type] = {
+                    "modes": {m: {**self._latency_summary(list(samples[m])), "failures": self._failures[agent_type][m]}
+                              for m in MODES if samples[m]},
+                    "affinity": {
+                        **self._latency_summary([ms for m in ("pinned", "warm", "cold") for ms in samples[m]]),
+                        "cold_start_rate": round(len(samples["cold"]) / affinity_calls, 3) if affinity_calls else None,
+                    },
+                    "fresh": {
+                        **self._latency_summary(list(samples["fresh"])),
+                        "cold_start_rate": 1.0 if samples["fresh"] else None,
+                    },
+                }
+            return {
+                "affinity_enabled": self.affinity,
+                "warm_sessions": {agent: len(pool) for agent, pool in self._warm.items()},
+                "pinned_sessions": len(self._pins),
+                "pin_ttl_s": self.pin_ttl,
+                "agents": agents,
+            }
+
+
+_manager: Optional[RuntimeSessionManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_session_manager() -> RuntimeSessionManager:
+    """Process-wide session manager shared by every request's AgentCore client"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = RuntimeSessionManager()
+        return _manager
@@ -8,10 +8,49 @@ import subprocess
 import json
 import logging
 import os
+import boto3
+from config import Config
+from .financial_data import FinancialDataService
+from .portfolio_book import get_portfolio_book
+from .session_manager import get_session_manager
+from covariance_cache import get_covariance_cache
+import price_history
 
 logger = logging.getLogger(__name__)
 
 
+def refresh_price_history(symbols=None, directory: str = None) -> list:
+    """
+    Download (or top up) the local price history the risk engine reads, for
+    the configured symbols plus everything held in the portfolio book. Run by
+    the webapp on startup and by ``make price-history``; redeploy the risk
+    agent afterwards so its container ships the refreshed files.
+    """
+    directory = directory or price_history.PRICE_HISTORY_DIR
+    book = get_portfolio_book()
+    symbols = symbols or sorted({s.strip().upper() for s in Config.PRICE_HISTORY_SYMBOLS if s.strip()}
+                                | set(book.symbols()))
+    service = FinancialDataService()
+    if not service.yfinance_available:
+        logger.warning("⚠️ yfinance not installed - price history not refreshed")
+        return []
+    
+    logger.info(f"📈 Refreshing price history for {len(symbols)} symbols in {directory}...")
+    # Created first so the bars appended to existing files roll its estimators forward
+    cache = get_covariance_cache()
+    updated = service.save_price_history(symbols, directory)
+    missing = price_history.missing_symbols(symbols, directory)
+    if missing:
+        logger.warning(f"⚠️ No price history could be fetched for {', '.join(missing)}")
+    logger.info(f"✅ Price history refreshed ({len(updated)} symbols updated)")
+    
+    # Warm the covariance cache for the book's portfolios so their first risk request is not a rebuild
+    if directory == price_history.PRICE_HISTORY_DIR:
+        warmed = cache.refresh([list(p.positions) for p in book.portfolios.values()])
+        logger.info(f"🧮 Covariance cache refreshed ({warmed} estimators built or rolled forward)")
+    return updated
+
+
 class StartupManager:
     """Handles application startup tasks"""
     
@@ -106,47 +145,19 @@ class StartupManager:
             logger.warning(f"⚠️ Could not verify AWS identity: {e}")
     
     def initialize_agent_sessions(self) -> dict:
-        """Initialize agent sessions using agentcore CLI (optional)"""
-        sessions = {}
-        agents = [
-            'finops_supervisor_ai_agent',
-            'finops_risk_ai_agent',
-            'finops_compliance_ai_agent',
-            'finops_fraud_ai_agent'
-        ]
-        
+        """Pre-warm AgentCore runtime sessions for every agent (see services/session_manager.py)"""
         logger.info("🤖 Initializing agent sessions...")
         
-        for agent in agents:
-            try:
-                # Invoke agent with a simple hello to initialize session
-                cmd = [
-                    "agentcore", "invoke",
-                    "--agent", agent,
-                    '{"prompt": "Initialize session"}'
-                ]
-                
-                result = subprocess.run(
-                    cmd, 
-                    capture_output=True, 
-                    text=True,
-                    env=os.environ.copy()
-                )
-                
-                if result.returncode == 0:
-                    # Extract session ID from output
-                    for line in result.stdout.split('\n'):
-                        if 'Session ID:' in line:
-                            session_id = line.split('Session ID:')[1].strip()
-                            sessions[agent] = session_id
-                            logger.info(f"✅ {agent}: {session_id}")
-                            break
-                else:
-                    logger.warning(f"⚠️ Could not initialize {agent}: {result.stderr}")
-                    
-            except Exception as e:
-                logger.warning(f"⚠️ Error initializing {agent}: {e}")
+        try:
+            manager = get_session_manager()
+            manager.configure(boto3.client('bedrock-agentcore', region_name=Config.AWS_REGION))
+            sessions = manager.warm()
+        except Exception as e:
+            logger.warning(f"⚠️ Could not warm agent sessions - requests will start cold: {e}")
+            return {}
         
+        for agent, session_ids in sessions.items():
+            logger.info(f"✅ {agent}: {len(session_ids)} warm session(s)")
         return sessions
     
     def run_startup_tasks(self) -> bool:
@@ -157,8 +168,16 @@ class StartupManager:
         if not self.checkout_britive_credentials():
             return False
         
-        # 2. Initialize agent sessions (optional - uncomment if needed)
-        # sessions = self.initialize_agent_sessions()
+        # 2. Pre-warm runtime sessions that web sessions get pinned to
+        if Config.SESSION_AFFINITY and Config.WARM_SESSIONS_PER_AGENT:
+            self.initialize_agent_sessions()
+        
+        # 3. Local price history for VaR, stress tests and the covariance cache
+        if Config.PRICE_HISTORY_REFRESH:
+            try:
+                refresh_price_history()
+            except Exception as e:
+                logger.warning(f"⚠️ Could not refresh price history: {e}")
         
         logger.info("✅ Startup tasks completed successfully")
         return True
\ No newline at end of file
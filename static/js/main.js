@@ -54,9 +54,19 @@ async function loadDashboard() {
         document.getElementById('complianceScore').textContent = 
             (compData.sox_compliance?.compliance_score || 0).toFixed(1) + '%';
         
-        // Active alerts (from AML monitoring)
+        // Load portfolio book
+        const bookResp = await fetch('/api/financial-data?type=portfolio');
+        const bookData = await bookResp.json();
+        document.getElementById('bookValue').textContent = 
+            '$' + (bookData.market_value || 0).toLocaleString(undefined, {maximumFractionDigits: 0});
+        const pnl = bookData.pnl || 0;
+        document.getElementById('bookPnl').textContent = 
+            'P&L ' + (pnl >= 0 ? '+' : '-') + '$' + Math.abs(pnl).toLocaleString(undefined, {maximumFractionDigits: 0});
+        document.getElementById('bookPnl').className = 'change ' + (pnl >= 0 ? 'positive' : 'negative');
+        
+        // Active alerts (AML monitoring + portfolio limit breaches)
         document.getElementById('alertCount').textContent = 
-            compData.aml_monitoring?.suspicious_activities || 0;
+            (compData.aml_monitoring?.suspicious_activities || 0) + (bookData.active_alerts || 0);
             
     } catch (error) {
         console.error('Error loading dashboard:', error);
@@ -111,6 +121,76 @@ function formatResponse(responseText) {
     return text;
 }
 
+function agentTitle(agentType) {
+    return agentType.replace(/_/g, ' ').replace(/\b\w/g, c => c.toUpperCase());
+}
+
+function renderStream(plan, sections) {
+    /**
+     * Render the streamed answer in the same shape /api/analyze returns:
+     * one "### Agent" section per agent, then any errors
+     */
+    const parts = [];
+    const errors = [];
+    plan.forEach(agent => {
+        const section = sections[agent];
+        if (!section) return;
+        if (section.error) {
+            errors.push('❌ ' + agent + ': ' + section.error);
+        } else if (section.text) {
+            parts.push('### ' + agentTitle(agent) + '\n\n' + section.text);
+        }
+    });
+    if (sections._answer) parts.push(sections._answer);
+    
+    let text = parts.join('\n\n---\n\n');
+    if (errors.length) text += '\n\n**Errors:**\n' + errors.join('\n');
+    document.getElementById('responseContent').innerHTML = formatResponse(text);
+}
+
+function applyStreamEvent(event, state) {
+    const agent = event.agent;
+    const section = agent ? (state.sections[agent] = state.sections[agent] || {text: ''}) : null;
+    
+    switch (event.type) {
+        case 'plan':
+            state.plan = event.agents;
+            return;
+        case 'agent_start':
+            state.status = '⏳ ' + agentTitle(agent) + '...';
+            break;
+        case 'token':
+            section.text += event.text || '';
+            section.streamed = true;
+            break;
+        case 'tool':
+            state.status = '🔧 ' + agentTitle(agent) + ': ' + event.name + ' (' + event.status + ')';
+            break;
+        case 'result':
+            if (!section) {
+                state.sections._answer = event.result;
+            } else if (!section.streamed) {
+                section.text = typeof event.result === 'string'
+                    ? event.result : JSON.stringify(event.result, null, 2);
+            }
+            break;
+        case 'error':
+            if (!section) throw new Error(event.error);
+            section.error = event.error;
+            break;
+        case 'done':
+            state.done = true;
+            state.status = state.plan.length + ' agents invoked';
+            break;
+    }
+    
+    // Swap the spinner for the answer as soon as anything arrives
+    document.getElementById('loadingSection').style.display = 'none';
+    document.getElementById('responseSection').style.display = 'block';
+    document.getElementById('agentsBadge').textContent = state.status;
+    renderStream(state.plan, state.sections);
+}
+
 async function analyzeQuery() {
     const query = document.getElementById('queryInput').value.trim();
     
@@ -122,10 +202,14 @@ async function analyzeQuery() {
     // Show loading
     document.getElementById('loadingSection').style.display = 'block';
     document.getElementById('responseSection').style.display = 'none';
+    document.getElementById('responseContent').innerHTML = '';
     document.getElementById('analyzeBtn').disabled = true;
     
+    const state = {plan: [], sections: {}, status: '', done: false};
+    
     try {
-        const response = await fetch('/api/analyze', {
+        // Server-sent events: agent tokens and tool progress render as they arrive
+        const response = await fetch('/api/analyze/stream', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -136,20 +220,34 @@ async function analyzeQuery() {
             })
         });
         
-        const data = await response.json();
+        if (!response.ok) {
+            const data = await response.json().catch(() => ({}));
+            throw new Error(data.error || ('HTTP ' + response.status));
+        }
         
-        // Hide loading
-        document.getElementById('loadingSection').style.display = 'none';
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        
+        while (true) {
+            const {value, done} = await reader.read();
+            buffer += decoder.decode(value || new Uint8Array(), {stream: !done});
+            
+            // Events are "data: {...}" blocks separated by a blank line
+            const blocks = buffer.split('\n\n');
+            buffer = blocks.pop();
+            for (const block of blocks) {
+                const data = block.split('\n')
+                    .filter(line => line.startsWith('data:'))
+                    .map(line => line.slice(5).trim())
+                    .join('\n');
+                if (data) applyStreamEvent(JSON.parse(data), state);
+            }
+            if (done) break;
+        }
         
-        if (data.success) {
-            // Show results with proper formatting
-            const formattedResponse = formatResponse(data.response);
-            document.getElementById('responseContent').innerHTML = formattedResponse;
-            document.getElementById('agentsBadge').textContent = 
-                data.agents_invoked.length + ' agents invoked';
-            document.getElementById('responseSection').style.display = 'block';
-        } else {
-            alert('Error: ' + (data.error || 'Unknown error occurred'));
+        if (!state.done) {
+            throw new Error('The response stream ended early');
         }
         
     } catch (error) {
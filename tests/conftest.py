@@ -0,0 +1,51 @@
+# ============================================
+# tests/conftest.py - Shared Test Fixtures
+# ============================================
+"""
+Shared fixtures. The analytics modules live next to the agents in
+``agentcore_agents/`` and import each other by bare name, so that directory
+is put on ``sys.path`` the same way ``services/__init__.py`` does for the
+webapp.
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "agentcore_agents")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import price_history  # noqa: E402
+
+SYMBOLS = ("SPY", "AGG", "GLD", "QQQ")
+
+
+def write_price_history(directory, symbols=SYMBOLS, bars: int = 300, seed: int = 7, start: str = "2022-01-03"):
+    """Seeded correlated random-walk closes, one yfinance-style CSV per symbol"""
+    rng = np.random.default_rng(seed)
+    n = len(symbols)
+    mix = rng.normal(0, 0.004, (n, n)) + np.eye(n) * 0.008
+    returns = rng.standard_normal((bars, n)) @ mix.T + 0.0003
+    prices = 100 * np.cumprod(1 + returns, axis=0)
+    dates = np.datetime64(start, "D") + np.arange(bars)
+    os.makedirs(directory, exist_ok=True)
+    for j, symbol in enumerate(symbols):
+        with open(os.path.join(directory, f"{symbol}.csv"), "w") as f:
+            f.write("Date,Open,High,Low,Close,Adj Close,Volume\n")
+            for date, close in zip(dates, prices[:, j]):
+                f.write(f"{date},{close},{close},{close},{close},{close},1000\n")
+    return dates, prices
+
+
+@pytest.fixture
+def price_dir(tmp_path, monkeypatch):
+    """Synthetic price history installed as the default PRICE_HISTORY_DIR"""
+    directory = str(tmp_path / "price_history")
+    write_price_history(directory)
+    monkeypatch.setattr(price_history, "PRICE_HISTORY_DIR", directory)
+    monkeypatch.setattr(price_history, "_bar_listeners", [])
+    price_history._series_cache.clear()
+    return directory
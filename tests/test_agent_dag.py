@@ -0,0 +1,120 @@
+import io
+import json
+import threading
+
+import pytest
+
+from agent_dag import AgentRuntimeInvoker, DagExecutor, DagNode, DagRun, with_upstream
+
+
+@pytest.fixture(scope="module")
+def executor():
+    return DagExecutor(max_workers=4)
+
+
+def test_independent_branches_run_concurrently_and_receive_upstream(executor):
+    both_running = threading.Barrier(2, timeout=5)
+    seen = {}
+
+    def branch(label):
+        def run(upstream):
+            both_running.wait()         # deadlocks unless b and c run at the same time
+            return f"{label}({upstream['a']})"
+        return run
+
+    def join(upstream):
+        seen.update(upstream)
+        return "done"
+
+    run = executor.execute(DagRun([
+        DagNode("a", lambda up: "A"),
+        DagNode("b", branch("B"), ["a"]),
+        DagNode("c", branch("C"), ["a"]),
+        DagNode("d", join, ["b", "c"]),
+    ]))
+    assert run.status == "completed"
+    assert seen == {"b": "B(A)", "c": "C(A)"}
+    assert [n["status"] for n in run.summary()["nodes"]] == ["completed"] * 4
+    assert executor.get_run() is run and executor.get_run(run.run_id) is run
+
+
+def test_failure_skips_dependents_transitively(executor):
+    def boom(upstream):
+        raise RuntimeError("runtime timed out")
+
+    run = executor.execute(DagRun([
+        DagNode("fraud", lambda up: "ok"),
+        DagNode("risk", boom),
+        DagNode("hedge", lambda up: "never", ["risk"]),
+        DagNode("report", lambda up: "never", ["fraud", "hedge"]),
+    ]))
+    status = {name: node.status for name, node in run.nodes.items()}
+    assert status == {"fraud": "completed", "risk": "failed", "hedge": "skipped", "report": "skipped"}
+    assert run.nodes["risk"].error == "runtime timed out"
+    assert run.status == "partial"
+
+
+def test_invalid_plans_are_rejected():
+    with pytest.raises(ValueError, match="unknown node"):
+        DagRun([DagNode("a", str, ["missing"])])
+    with pytest.raises(ValueError, match="cycle"):
+        DagRun([DagNode("a", str, ["b"]), DagNode("b", str, ["a"])])
+
+
+def test_critical_path_follows_measured_durations():
+    run = DagRun([DagNode("a", str), DagNode("b", str, ["a"]), DagNode("c", str, ["a"]),
+                  DagNode("d", str, ["b", "c"])])
+    for name, (start, end) in {"a": (0, 10), "b": (10, 15), "c": (10, 40), "d": (40, 45)}.items():
+        run.nodes[name].started_ms, run.nodes[name].finished_ms = start, end
+    assert run.critical_path() == {"nodes": ["a", "c", "d"], "duration_ms": 45.0}
+    assert run.summary()["sum_of_steps_ms"] == 50.0
+
+
+def test_with_upstream_truncates_findings(monkeypatch):
+    monkeypatch.setattr("agent_dag.UPSTREAM_CONTEXT_CHARS", 5)
+    prompt = with_upstream("Hedge the exposure", "assess my risk", {"risk_analysis": "VaR is high", "x": None})
+    assert prompt.startswith("Hedge the exposure\n\nOriginal request: assess my risk")
+    assert "Findings from risk analysis:\nVaR i …" in prompt
+
+
+class FakeClient:
+    def __init__(self, response):
+        self.response = response
+        self.payloads = []
+
+    def invoke_agent_runtime(self, **kwargs):
+        self.payloads.append(json.loads(kwargs["payload"]))
+        return self.response
+
+
+class Lines:
+    def __init__(self, *events):
+        self.events = events
+
+    def iter_lines(self):
+        return (f"data: {json.dumps(e)}".encode() for e in self.events)
+
+
+def test_invoker_streams_tokens_and_passes_fast_path_flag():
+    client = FakeClient({"contentType": "text/event-stream",
+                         "response": Lines({"type": "token", "text": "No "}, {"type": "tool", "name": "x"},
+                                           {"type": "token", "text": "fraud"}, {"type": "result", "result": "x"})})
+    pieces = []
+    invoker = AgentRuntimeInvoker({"fraud_detection": "arn:fraud"}, client=client)
+    assert invoker.invoke("fraud_detection", "check", on_text=pieces.append, fast_path=False) == "No fraud"
+    assert pieces == ["No ", "fraud"]
+    assert client.payloads == [{"inputText": "check", "stream": True, "fast_path": False}]
+
+
+def test_invoker_reads_json_results_and_surfaces_errors():
+    body = json.dumps({"result": {"content": [{"text": "All controls pass"}]}}).encode()
+    invoker = AgentRuntimeInvoker({"compliance": "arn:c"},
+                                  client=FakeClient({"contentType": "application/json", "response": io.BytesIO(body)}))
+    assert invoker.invoke("compliance", "status") == "All controls pass"
+
+    failing = AgentRuntimeInvoker({"risk_analysis": "arn:r"}, client=FakeClient(
+        {"contentType": "text/event-stream", "response": Lines({"type": "error", "error": "throttled"})}))
+    with pytest.raises(RuntimeError, match="throttled"):
+        failing.invoke("risk_analysis", "var")
+    with pytest.raises(ValueError, match="No runtime ARN"):
+        failing.invoke("fraud_detection", "check")
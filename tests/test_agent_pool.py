@@ -0,0 +1,155 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import agent_pool
+from agent_pool import AgentPool, parse_event_stream
+from fast_path import FastPathRouter, compile_keywords
+
+
+class FakeAgent:
+    """Stands in for a Strands agent: remembers its conversation and streams canned events"""
+
+    def __init__(self, number):
+        self.number = number
+        self.history = []
+
+    def __call__(self, text):
+        self.history.append(text)
+        return SimpleNamespace(message=f"agent {self.number} turn {len(self.history)}")
+
+    async def stream_async(self, text):
+        self.history.append(text)
+        yield {"init_event_loop": True}
+        yield {"data": "Checking "}
+        yield {"current_tool_use": {"toolUseId": "t1", "name": "calculate_var"}}
+        yield {"current_tool_use": {"toolUseId": "t1", "name": "calculate_var", "input": "{\"a\""}}
+        yield {"message": {"role": "user", "content": [{"toolResult": {"toolUseId": "t1", "status": "success"}}]}}
+        yield {"data": "done"}
+        yield {"result": f"agent {self.number} turn {len(self.history)}"}
+
+
+@pytest.fixture
+def pool():
+    built = []
+
+    def factory():
+        built.append(FakeAgent(len(built) + 1))
+        return built[-1]
+
+    pool = AgentPool("test_agent", factory, max_sessions=2, idle_ttl=60)
+    pool.built = built
+    return pool
+
+
+@pytest.fixture
+def router():
+    router = FastPathRouter("test_agent")
+
+    @router.rule("status", patterns=[compile_keywords(["status"])])
+    def _status(text, data):
+        return "all systems nominal"
+
+    return router
+
+
+def collect(pool, router, payload, context=None):
+    async def run():
+        response = await pool.serve(router, payload, context)
+        if isinstance(response, dict):
+            return response
+        return [event async for event in response]
+    return asyncio.run(run())
+
+
+def test_each_session_keeps_its_own_agent(pool):
+    assert pool.invoke("session-a", "hi") == "agent 1 turn 1"
+    assert pool.invoke("session-b", "hi") == "agent 2 turn 1"
+    assert pool.invoke("session-a", "again") == "agent 1 turn 2"
+    assert pool.invoke(None, "local") == "agent 3 turn 1"     # the shared "default" session
+    assert pool.built[0].history == ["hi", "again"]
+    assert pool.stats()["agents_built"] == 3
+
+
+def test_least_recently_used_session_is_evicted(pool):
+    pool.invoke("a", "1")
+    pool.invoke("b", "1")
+    pool.invoke("a", "2")            # "b" is now least recently used
+    pool.invoke("c", "1")
+    assert list(pool._sessions) == ["a", "c"]
+    assert pool.invoke("a", "3") == "agent 1 turn 3"
+    # "b" comes back with a fresh agent and no memory of its first turn
+    assert pool.invoke("b", "2") == "agent 4 turn 1"
+    assert pool.stats() == {"agent": "test_agent", "sessions": 2, "max_sessions": 2, "agents_built": 4,
+                            "evicted": 2, "expired": 0, "busy": 0}
+
+
+def test_idle_sessions_expire_and_reset_clears_context(pool, monkeypatch):
+    pool.invoke("a", "1")
+    clock = agent_pool.time.monotonic()
+    monkeypatch.setattr(agent_pool.time, "monotonic", lambda: clock + 61)
+    assert pool.invoke("a", "2") == "agent 2 turn 1"
+    assert pool.stats()["expired"] == 1
+
+    assert pool.reset("a") and not pool.reset("a")
+    assert pool.invoke("a", "3") == "agent 3 turn 1"
+
+
+def test_serve_json_uses_fast_path_then_session_agent(pool, router):
+    context = SimpleNamespace(session_id="runtime-session-1")
+    assert collect(pool, router, {"inputText": "system status?"}, context)["path"] == "fast:status"
+    assert not pool.built
+
+    first = collect(pool, router, {"inputText": "explain my risk"}, context)
+    second = collect(pool, router, {"inputText": "and now?"}, context)
+    assert (first["result"], first["path"]) == ("agent 1 turn 1", "llm")
+    assert second["result"] == "agent 1 turn 2"
+    # The session id can also come from the payload
+    assert collect(pool, router, {"inputText": "hello", "session_id": "other"})["result"] == "agent 2 turn 1"
+
+    stats = json.loads(collect(pool, router, {"action": "agent_pool_stats"}, context)["result"])
+    assert stats["sessions"] == 2
+    assert collect(pool, router, {"action": "reset_session"}, context)["result"] == "Session context cleared"
+
+
+def test_stream_event_sequence(pool, router):
+    context = SimpleNamespace(session_id="s1")
+    events = collect(pool, router, {"inputText": "what is my VaR?", "stream": True}, context)
+    assert [e["type"] for e in events] == ["token", "tool", "tool", "token", "result"]
+    assert events[0]["text"] == "Checking "
+    assert events[1] == {"type": "tool", "name": "calculate_var", "tool_use_id": "t1", "status": "started"}
+    assert events[2] == {"type": "tool", "name": "calculate_var", "tool_use_id": "t1", "status": "success"}
+    assert events[-1]["result"] == "agent 1 turn 1" and events[-1]["path"] == "llm"
+    assert events[-1]["elapsed_ms"] >= 0
+    assert router.stats()["llm"] == 1
+    # The session lock is released when the stream ends
+    assert pool.stats()["busy"] == 0 and pool.invoke("s1", "next") == "agent 1 turn 2"
+
+    # Fast-path answers arrive as a single result event
+    [event] = collect(pool, router, {"inputText": "status", "stream": True}, context)
+    assert event["type"] == "result" and event["path"] == "fast:status"
+
+
+def test_stream_reports_agent_failure_as_error_event(router):
+    class BrokenAgent:
+        async def stream_async(self, text):
+            yield {"data": "partial"}
+            raise RuntimeError("model throttled")
+
+    pool = AgentPool("broken", BrokenAgent)
+    events = collect(pool, router, {"inputText": "explain", "stream": True})
+    assert events == [{"type": "token", "text": "partial"}, {"type": "error", "error": "model throttled"}]
+    assert pool.stats()["busy"] == 0
+
+
+def test_parse_event_stream():
+    lines = [b'data: {"type": "token", "text": "Hi"}', b"", b": keep-alive", b'data: "plain text"',
+             'data: {"result": "ok"}', "data: not json"]
+    assert list(parse_event_stream(lines)) == [
+        {"type": "token", "text": "Hi"},
+        {"type": "token", "text": "plain text"},
+        {"type": "result", "result": {"result": "ok"}},
+        {"type": "token", "text": "not json"},
+    ]
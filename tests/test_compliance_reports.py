@@ -0,0 +1,149 @@
+import json
+
+import pytest
+
+from compliance_reports import compact_summary, missing_report, parse_report, render_dashboard
+
+# Sample SOX, PCI-DSS and AML reports carrying every marker the dashboard reads
+SOX_REPORT = """\
+SOX COMPLIANCE REPORT - Q3 2025
+================================
+Company: Acme Financial Services
+Reporting Period: July 1, 2025 - September 30, 2025
+
+EXECUTIVE SUMMARY
+Overall Compliance Score: 94.5%
+Status: COMPLIANT WITH MINOR EXCEPTIONS
+Risk Level: LOW-MEDIUM
+
+Section 302 - Disclosure Controls
+Status: EFFECTIVE
+
+Section 404 - Internal Controls over Financial Reporting
+Status: EFFECTIVE WITH EXCEPTIONS
+
+DEFICIENCIES
+1. MEDIUM PRIORITY - Segregation of Duties
+   Database administrators can modify production financial data
+2. LOW PRIORITY - Password Policy
+   Finance users not forced to rotate passwords
+3. LOW PRIORITY - Audit Logs
+   AP system audit logging disabled
+
+REMEDIATION PLAN
+1. Implement role-based access control - Due: Nov 30, 2025
+2. Force password reset for finance users - Due: Oct 31, 2025
+3. Enable audit logging in AP system (Due: Dec 15, 2025)
+"""
+
+PCI_REPORT = """\
+PCI-DSS COMPLIANCE ASSESSMENT 2025
+Report of Compliance (ROC) Status: COMPLIANT
+Validation Level: Level 2 Merchant
+Assessor: SecureAudit QSA
+
+Requirement 3: Protect stored cardholder data
+Status: REQUIRES ATTENTION
+3 legacy reports contain full PAN data
+
+Requirement 7: Restrict access to cardholder data
+8 terminated employees had active accounts (now disabled)
+
+Action Items:
+- Remove full PAN from legacy reports - Due: Nov 15, 2025
+- Enhance offboarding process - Due: Oct 31, 2025
+"""
+
+AML_REPORT = """\
+AML MONITORING REPORT - Q3 2025
+Overall AML Program Status: EFFECTIVE
+Alerts Generated: 487
+Alerts Escalated: 12
+SARs Filed: 2
+Customer Due Diligence: 100% completion
+Training Compliance: 98%
+
+KEY ALERTS
+- SAR #2025-0891: Structuring activity detected ($450K)
+- SAR #2025-0903: Suspected trade-based money laundering ($2.3M)
+
+ACTION ITEMS
+- Complete AML training for 3 overdue employees - Due: Oct 31
+- Implement enhanced crypto monitoring - Due: Nov 15, 2025
+"""
+
+
+@pytest.fixture
+def records():
+    return {"sox": parse_report("sox", SOX_REPORT), "pci": parse_report("pci", PCI_REPORT),
+            "aml": parse_report("aml", AML_REPORT)}
+
+
+def test_sox_record(records):
+    sox = records["sox"]
+    assert (sox["score"], sox["score_pct"], sox["status"], sox["risk_level"]) == (
+        "94.5%", 94.5, "COMPLIANT WITH MINOR EXCEPTIONS", "LOW-MEDIUM")
+    assert sox["deficiencies"] == {"high": 0, "medium": 1, "low": 2}
+    assert sox["markers"] == ["LOW PRIORITY", "MEDIUM PRIORITY", "Overall Compliance Score:", "Risk Level:",
+                              "Section 404"]
+    # The first "Status:" line is the report's, not the one under Section 302
+    assert sox["lines"]["Status:"] == "Status: COMPLIANT WITH MINOR EXCEPTIONS"
+    assert sox["action_items"] == [
+        {"item": "Implement role-based access control", "due": "Nov 30, 2025"},
+        {"item": "Force password reset for finance users", "due": "Oct 31, 2025"},
+        {"item": "Enable audit logging in AP system", "due": "Dec 15, 2025"},
+    ]
+    assert sox["sars"] == []
+
+
+def test_pci_and_aml_records(records):
+    pci, aml = records["pci"], records["aml"]
+    assert (pci["roc_status"], pci["validation_level"]) == ("COMPLIANT", "Level 2 Merchant")
+    assert [a["due"] for a in pci["action_items"]] == ["Nov 15, 2025", "Oct 31, 2025"]
+    assert (aml["program_status"], aml["alerts_generated"], aml["sars_filed"]) == ("EFFECTIVE", "487", "2")
+    assert (aml["customer_due_diligence"], aml["training_compliance"]) == ("100% completion", "98%")
+    assert [s["id"] for s in aml["sars"]] == ["2025-0891", "2025-0903"]
+    assert aml["action_items"][0] == {"item": "Complete AML training for 3 overdue employees", "due": "Oct 31"}
+
+
+def test_compact_summary(records):
+    records["aml"] = missing_report("aml", "Could not retrieve AML report - NoSuchKey")
+    assert json.loads(compact_summary(records, max_items=2)) == {
+        "sox": {"score": "94.5%", "score_pct": 94.5, "status": "COMPLIANT WITH MINOR EXCEPTIONS",
+                "risk_level": "LOW-MEDIUM", "deficiencies": {"medium": 1, "low": 2},
+                "action_items": [{"item": "Implement role-based access control", "due": "Nov 30, 2025"},
+                                 {"item": "Force password reset for finance users", "due": "Oct 31, 2025"}]},
+        "pci": {"status": "REQUIRES ATTENTION", "roc_status": "COMPLIANT", "validation_level": "Level 2 Merchant",
+                "action_items": [{"item": "Remove full PAN from legacy reports", "due": "Nov 15, 2025"},
+                                 {"item": "Enhance offboarding process", "due": "Oct 31, 2025"}]},
+        "aml": {"available": False, "error": "Could not retrieve AML report - NoSuchKey"},
+    }
+
+
+def test_dashboard_from_sample_reports(records):
+    dashboard = render_dashboard(records, "compliance-bucket")
+    sox = dashboard[dashboard.index("SOX COMPLIANCE (Sarbanes-Oxley Act)"):dashboard.index("PCI-DSS COMPLIANCE")]
+    assert ("   Overall Compliance Score: 94.5%\n   Status: COMPLIANT WITH MINOR EXCEPTIONS\n"
+            "   Risk Level: LOW-MEDIUM\n") in sox
+    assert "Section 404 (Internal Controls)" in sox
+    assert "1 Medium Priority deficiency" in sox and "2 Low Priority deficiencies" in sox
+
+    pci = dashboard[dashboard.index("PCI-DSS COMPLIANCE (Payment"):dashboard.index("AML MONITORING")]
+    assert "   Report of Compliance (ROC) Status: ✅ COMPLIANT\n   Validation Level: Level 2 Merchant\n" in pci
+
+    aml = dashboard[dashboard.index("AML MONITORING (Anti"):dashboard.index("OVERALL COMPLIANCE STATUS")]
+    for line in ("Overall AML Program Status: ✅ EFFECTIVE", "Total Alerts: 487", "Suspicious Activity Reports",
+                 "Customer Due Diligence: 100%", "Training Compliance: 98%"):
+        assert line in aml
+    assert "Report not available" not in dashboard
+    assert dashboard.rstrip().endswith("s3://compliance-bucket/")
+
+
+def test_dashboard_sections_follow_markers():
+    records = {"sox": parse_report("sox", "SOX REPORT\nOverall Compliance Score: 80%\n"),
+               "pci": missing_report("pci", "Access Denied")}
+    dashboard = render_dashboard(records, "bucket")
+    assert "   Overall Compliance Score: 80%\n\n   Key Findings:\n\n   ✅ Action Items:" in dashboard
+    assert "Risk Level" not in dashboard and "Section 404 (Internal Controls)" not in dashboard
+    assert "💳 PCI-DSS COMPLIANCE: ❌ Report not available" in dashboard
+    assert "🔍 AML MONITORING: ❌ Report not available" in dashboard
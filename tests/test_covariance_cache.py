@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+import price_history
+from covariance_cache import CovarianceCache, CovarianceEstimator
+from price_history import append_closes, load_price_matrix
+
+
+@pytest.fixture
+def cache(price_dir, tmp_path):
+    return CovarianceCache(cache_dir=str(tmp_path / "cov"))
+
+
+def test_bootstrap_matches_sample_covariance(price_dir):
+    dates, prices = load_price_matrix(["SPY", "AGG"])
+    est = CovarianceEstimator.from_prices(["SPY", "AGG"], dates, prices)
+    returns = prices[1:] / prices[:-1] - 1
+    np.testing.assert_allclose(est.sample_cov(), np.cov(returns, rowvar=False))
+    np.testing.assert_allclose(est.mean_returns(), returns.mean(axis=0))
+
+
+def test_incremental_updates_match_full_rebuild(price_dir):
+    dates, prices = load_price_matrix(["SPY", "AGG", "GLD"])
+    est = CovarianceEstimator.from_prices(["SPY", "AGG", "GLD"], dates[:200], prices[:200])
+    for date, row in zip(dates[200:], prices[200:]):
+        est.update(row, date)
+    full = CovarianceEstimator.from_prices(["SPY", "AGG", "GLD"], dates, prices)
+    np.testing.assert_allclose(est.sample_cov(), full.sample_cov())
+    np.testing.assert_allclose(est.covariance(kind="ewma"), full.covariance(kind="ewma"))
+
+
+def test_sub_matrix_in_requested_order(cache):
+    cov = cache.covariance(["SPY", "AGG", "GLD"])
+    sub = cache.covariance(["gld", "spy"])
+    np.testing.assert_allclose(sub, cov[np.ix_([2, 0], [2, 0])])
+
+
+def test_partial_bar_updates_nothing(cache):
+    est = cache.estimator(["SPY", "AGG"])
+    before = est.sample_cov().copy()
+    assert cache.on_new_bar({"SPY": 500.0}, "2030-01-01") == 0
+    np.testing.assert_array_equal(est.sample_cov(), before)
+
+
+def test_superset_bar_updates_covered_universes(cache):
+    est = cache.estimator(["SPY", "AGG"])
+    count = est.count
+    assert cache.on_new_bar({"spy": 120.0, "agg": 99.0, "TLT": 90.0}, "2030-01-01") == 1
+    assert est.count == count + 1
+    assert est.last_date == np.datetime64("2030-01-01")
+    # Stale bars are ignored
+    assert cache.on_new_bar({"SPY": 121.0, "AGG": 98.0}, "2029-12-31") == 0
+
+
+def test_appended_closes_roll_estimators_forward(cache, price_dir):
+    price_history.add_bar_listener(cache.on_new_bar)
+    est = cache.estimator(["SPY", "AGG"])
+    last = est.last_date
+    appended = append_closes({"SPY": 130.0, "AGG": 95.0}, last + 1)
+    assert appended == {"SPY": 130.0, "AGG": 95.0}
+    assert est.last_date == last + 1
+
+    # Same state as rebuilding from the extended files
+    dates, prices = load_price_matrix(["AGG", "SPY"])
+    assert dates[-1] == last + 1
+    np.testing.assert_allclose(est.sample_cov(), CovarianceEstimator.from_prices(["AGG", "SPY"], dates, prices).sample_cov())
+
+    # Appending a date the files already have is a no-op
+    assert append_closes({"SPY": 1.0}, last) == {}
+
+
+def test_persisted_estimators_load_warm(cache, tmp_path):
+    cov = cache.covariance(["SPY", "GLD"])
+    warm = CovarianceCache(cache_dir=str(tmp_path / "cov"))
+    assert warm._estimators
+    np.testing.assert_allclose(warm.covariance(["SPY", "GLD"]), cov)
+
+
+def test_cold_start_without_history_then_refresh(tmp_path, monkeypatch):
+    from conftest import write_price_history
+
+    directory = str(tmp_path / "price_history")
+    monkeypatch.setattr(price_history, "PRICE_HISTORY_DIR", directory)
+    monkeypatch.setattr(price_history, "_bar_listeners", [])
+    price_history._series_cache.clear()
+    cache = CovarianceCache(cache_dir=str(tmp_path / "cov"))
+
+    # Fresh container, nothing fetched yet: a clear error, nothing cached, and refresh has nothing to do
+    with pytest.raises(FileNotFoundError, match="No price history for AGG, SPY"):
+        cache.moments(["SPY", "AGG"])
+    assert cache.refresh([["SPY", "AGG"]]) == 0 and not cache._estimators
+
+    # The history arrives: refresh builds the requested universe up front
+    write_price_history(directory, symbols=("SPY", "AGG"))
+    assert cache.refresh([["SPY", "AGG"], ["spy"], ["SPY", "TSLA"]]) == 1
+    est = cache.estimator(["SPY"])
+    assert est.symbols == ["AGG", "SPY"]
+    assert est.count == 299
+
+
+def test_refresh_rolls_persisted_estimators_forward(cache, tmp_path, price_dir):
+    last = cache.estimator(["SPY", "AGG"]).last_date
+    # A restarted process loads the persisted estimator, then the files gain a bar it never saw
+    restarted = CovarianceCache(cache_dir=str(tmp_path / "cov"))
+    append_closes({"SPY": 130.0, "AGG": 95.0}, last + 1)
+    assert restarted.refresh() == 1
+    assert restarted.estimator(["SPY", "AGG"]).last_date == last + 1
+    assert CovarianceCache(cache_dir=str(tmp_path / "cov")).estimator(["AGG"]).last_date == last + 1
@@ -0,0 +1,122 @@
+from math import log
+
+import pytest
+
+from evidence_index import BM25_B, BM25_K1, PHRASE_BONUS, EvidenceIndex, split_passages
+
+
+class CachedObject:
+    """The parts of a report_store cached object the index reads"""
+
+    def __init__(self, key, etag, text):
+        self.key, self.etag, self.text = key, etag, text
+
+    def lines(self):
+        return self.text.splitlines()
+
+
+def bm25(tf, length, avg_length, df, n):
+    idf = log(1 + (n - df + 0.5) / (df + 0.5))
+    return idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length))
+
+
+@pytest.fixture
+def index():
+    index = EvidenceIndex(path=None)
+    index.add_document("evidence/a.txt", "1", ["encryption keys rotated quarterly"])
+    index.add_document("evidence/b.txt", "1", ["encryption policy reviewed, encryption audit"])
+    index.add_document("evidence/c.txt", "1", ["access reviews completed"])
+    return index
+
+
+def test_split_passages_at_headings_and_line_windows():
+    lines = ["SOX COMPLIANCE REPORT", "Prepared for Q3", "Requirement 7: Restrict access", "Least privilege.",
+             "=" * 20, "", "Section 404", *[f"sample {i} tested" for i in range(5)]]
+    passages = split_passages(lines, max_lines=3)
+    assert [(p["section"], p["start"], p["end"]) for p in passages] == [
+        ("SOX COMPLIANCE REPORT", 1, 2),
+        ("Requirement 7: Restrict access", 3, 6),
+        ("Section 404", 7, 9),
+        ("Section 404", 10, 12),
+    ]
+
+
+def test_bm25_scores_match_hand_computation(index):
+    # Passage lengths 4, 5 and 3 tokens ("," is dropped), so the average is 4; "encryption" is in 2 of 3
+    hits = index.search("encryption")
+    assert [h["doc"] for h in hits] == ["evidence/b.txt", "evidence/a.txt"]
+    assert hits[0]["score"] == round(bm25(tf=2, length=5, avg_length=4, df=2, n=3), 3)
+    assert hits[1]["score"] == round(bm25(tf=1, length=4, avg_length=4, df=2, n=3), 3)
+
+
+def test_rarer_term_outranks_common_one(index):
+    index.add_document("evidence/d.txt", "1", ["encryption keys escrowed"])
+    # "escrowed" is in one passage, "encryption" in three: d wins on the rare term
+    assert index.search("encryption escrowed")[0]["doc"] == "evidence/d.txt"
+    assert index.search("") == [] and index.search("the of") == [] and index.search("unknownterm") == []
+
+
+def test_phrase_bonus_for_adjacent_query_terms():
+    index = EvidenceIndex(path=None)
+    index.add_document("evidence/adjacent.txt", "1", ["quarterly access review completed"])
+    index.add_document("evidence/apart.txt", "1", ["quarterly review completed access"])
+    index.add_document("evidence/other.txt", "1", ["vendor contracts renewed"])
+    adjacent, apart = index.search("access review")
+    assert adjacent["doc"] == "evidence/adjacent.txt"
+    # Same terms and lengths, so the whole difference is the bonus for the adjacent pair
+    idf = log(1 + (3 - 2 + 0.5) / (2 + 0.5))
+    assert adjacent["score"] - apart["score"] == pytest.approx(PHRASE_BONUS * 2 * idf, abs=2e-3)
+    # Query order matters: "review access" is adjacent in neither passage
+    reversed_hits = index.search("review access")
+    assert reversed_hits[0]["score"] == reversed_hits[1]["score"]
+
+
+def test_update_reindexes_changed_and_removes_missing_under_prefix(tmp_path):
+    index = EvidenceIndex(path=str(tmp_path / "index.pkl"))
+    index.add_document("manual/notes.txt", None, ["encryption exception approved"])
+    objects = [CachedObject("reports/sox.txt", "e1", "segregation of duties tested"),
+               CachedObject("reports/pci.txt", "e1", "cardholder data encrypted")]
+    assert index.update(objects, prefix="reports/") == {"indexed": ["reports/sox.txt", "reports/pci.txt"],
+                                                        "removed": []}
+
+    # Unchanged ETag is skipped, a new ETag is re-indexed, a vanished report is dropped
+    objects = [CachedObject("reports/sox.txt", "e2", "segregation of duties remediated")]
+    assert index.update(objects, prefix="reports/") == {"indexed": ["reports/sox.txt"],
+                                                        "removed": ["reports/pci.txt"]}
+    assert index.update(objects, prefix="reports/") == {"indexed": [], "removed": []}
+
+    assert sorted(index.documents) == ["manual/notes.txt", "reports/sox.txt"]
+    assert index.search("cardholder") == [] and "cardholder" not in index.postings
+    assert index.search("tested") == []
+    assert index.search("remediated")[0]["doc"] == "reports/sox.txt"
+    # Documents outside the prefix are left alone
+    assert index.search("encryption exception")[0]["doc"] == "manual/notes.txt"
+    assert index.total_length == sum(p["length"] for p in index.passages.values())
+
+    # Without a prefix nothing is removed
+    assert index.update([], prefix=None) == {"indexed": [], "removed": []}
+    assert len(index.documents) == 2
+
+
+def test_pickle_round_trip_starts_warm(tmp_path):
+    path = str(tmp_path / "cache" / "index.pkl")
+    index = EvidenceIndex(path=path)
+    objects = [CachedObject("reports/sox.txt", "e1", "SECTION 404\nsegregation of duties tested\n"),
+               CachedObject("reports/pci.txt", "e1", "Requirement 3\ncardholder data encrypted at rest\n")]
+    index.update(objects, prefix="reports/")
+
+    warm = EvidenceIndex(path=path)
+    assert warm.stats() == index.stats() == {"documents": 2, "passages": 2, "terms": 11}
+    for query in ("segregation duties", "cardholder data", "requirement 3 encrypted"):
+        assert warm.search(query) == index.search(query)
+    # Loaded documents keep their ETags, so the next sync has nothing to do
+    assert warm.update(objects, prefix="reports/") == {"indexed": [], "removed": []}
+    # New ids continue after the loaded ones
+    warm.add_document("reports/new.txt", "e1", ["vendor review"])
+    assert len(set(warm.passages)) == 3
+
+
+def test_unreadable_pickle_starts_empty(tmp_path):
+    path = tmp_path / "index.pkl"
+    path.write_bytes(b"not a pickle")
+    assert EvidenceIndex(path=str(path)).stats() == {"documents": 0, "passages": 0, "terms": 0}
@@ -0,0 +1,121 @@
+import json
+
+import pytest
+
+from fast_path import STATS_ACTION, FastPathRouter, compile_keywords
+
+ENRICHED = ("Is this account OK?\n\n=== REAL-TIME FINANCIAL DATA ===\n"
+            "• TXN-1: $9,900 at Casino Royale - flagged as possible fraud\n")
+
+
+@pytest.fixture
+def router():
+    router = FastPathRouter("test")
+    calls = []
+    router.calls = calls
+
+    @router.rule("text_first", patterns=[compile_keywords(["fraud"])])
+    def _text_first(text, data):
+        calls.append("text_first")
+        return "text_first"
+
+    @router.rule("structured", payload_keys=("holdings", "portfolio_value"))
+    def _structured(text, data):
+        calls.append("structured")
+        return f"structured {data['portfolio_value']}"
+
+    @router.rule("enriched", patterns=[compile_keywords(["casino"])], match_enrichment=True)
+    def _enriched(text, data):
+        calls.append("enriched")
+        return "enriched"
+
+    return router
+
+
+def test_structured_rules_win_over_text_rules(router):
+    answered = router.answer({"inputText": "any fraud?", "holdings": {"SPY": 1}, "portfolio_value": 10})
+    assert answered["path"] == "fast:structured" and answered["result"] == "structured 10"
+    # Missing one key: the structured rule does not fire
+    assert router.answer({"inputText": "any fraud?", "holdings": {"SPY": 1}})["path"] == "fast:text_first"
+
+
+def test_json_prompt_counts_as_a_structured_payload(router):
+    prompt = json.dumps({"holdings": {"SPY": 1}, "portfolio_value": 5})
+    assert router.answer({"inputText": prompt})["result"] == "structured 5"
+
+
+def test_appended_data_only_triggers_enrichment_rules(router):
+    assert router.question(ENRICHED) == "Is this account OK?\n"
+    answered = router.answer({"inputText": ENRICHED})
+    assert answered["path"] == "fast:enriched"
+    assert router.calls == ["enriched"]
+
+
+def test_declining_or_failing_rules_fall_through(router):
+    @router.rule("flaky", patterns=[compile_keywords(["wire"])])
+    def _flaky(text, data):
+        raise RuntimeError("price feed down")
+
+    @router.rule("decline", patterns=[compile_keywords(["wire"])])
+    def _decline(text, data):
+        return None
+
+    assert router.answer({"inputText": "wire transfer question"}) is None
+    rules = router.stats()["rules"]
+    assert rules["flaky"] == {"hits": 0, "declined": 1} and rules["decline"] == {"hits": 0, "declined": 1}
+
+    answered = router.handle({"inputText": "wire transfer question"}, fallback=lambda text: f"LLM: {text}")
+    assert answered == {"result": "LLM: wire transfer question", "path": "llm",
+                        "elapsed_ms": answered["elapsed_ms"]}
+
+
+def test_fast_path_false_bypasses_rules_but_not_tools(router):
+    def echo(value: str) -> str:
+        return f"echo {value}"
+
+    router.register_tools(echo)
+    assert router.answer({"inputText": "any fraud?", "fast_path": False}) is None
+    answered = router.answer({"tool": "echo", "arguments": {"value": "x"}, "fast_path": False})
+    assert answered["result"] == "echo x" and answered["path"] == "fast:tool:echo"
+
+
+def test_tool_exceptions_become_error_text(router):
+    def broken():
+        raise ValueError("bad input")
+
+    router.register_tools(broken)
+    answered = router.answer({"tool": "broken"})
+    assert answered["result"] == "❌ Error calling tool 'broken': bad input"
+    assert router.stats()["rules"]["tool:broken"]["hits"] == 1
+
+
+def test_hit_stats(router):
+    router.answer({"inputText": "any fraud?"})
+    router.answer({"inputText": "any fraud today?"})
+    router.handle({"inputText": "hello"}, fallback=lambda text: "hi")
+    stats = router.stats()
+    assert (stats["requests"], stats["fast_path"], stats["llm"]) == (3, 2, 1)
+    assert stats["hit_rate"] == pytest.approx(2 / 3)
+    assert stats["rules"]["text_first"] == {"hits": 2, "declined": 0}
+
+    reported = router.answer({"action": STATS_ACTION})
+    assert reported["path"] == f"fast:{STATS_ACTION}"
+    assert json.loads(reported["result"])["rules"]["text_first"]["hits"] == 2
+
+
+def test_supervisor_answers_only_explicit_plan_requests():
+    pytest.importorskip("strands")
+    pytest.importorskip("bedrock_agentcore")
+    import finops_supervisor_ai_agent as supervisor
+
+    for payload in ({"inputText": "How does routing work, and which agent handles chargebacks?"},
+                    {"inputText": "Break down our fraud losses by region"},
+                    {"query": "Check these transactions for fraud"}):
+        assert supervisor.router.answer(payload) is None
+
+    plan = json.loads(supervisor.router.answer({"plan_for": "Check these transactions for fraud"})["result"])
+    assert plan["agent_sequence"] == ["fraud_detection"]
+    answered = supervisor.router.answer({"inputText": "Decompose: SOX audit and portfolio VaR"})
+    assert answered["path"] == "fast:decompose"
+    assert json.loads(answered["result"])["agent_sequence"] == ["compliance", "risk_analysis"]
+    assert supervisor.router.answer({"inputText": "Break this request down into subtasks: fraud check"})
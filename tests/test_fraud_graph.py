@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from fraud_graph import AccountMerchantGraph, format_ring_report
+
+RING = [f"RING{i}" for i in range(4)]
+
+
+def _transactions(seed: int = 3):
+    """A dense 4-account ring over two shell merchants, a 200-account hub, and sparse organic traffic"""
+    rng = np.random.default_rng(seed)
+    txns = []
+    for account in RING:
+        for merchant in ("SHELL-A", "SHELL-B"):
+            txns += [{"account_id": account, "merchant": merchant, "amount": 900.0, "risk_score": 0.8}] * 3
+    for i in range(200):
+        account = f"ACC{i:03d}"
+        txns.append({"account_id": account, "merchant": "MEGAMART", "amount": 40.0, "risk_score": 0.05})
+        txns.append({"account_id": account, "merchant": f"SHOP{rng.integers(60):02d}", "amount": 25.0,
+                     "risk_score": 0.05})
+    # The ring also shops at the hub, which must not merge it with everyone else
+    txns += [{"account_id": a, "merchant": "MEGAMART", "amount": 40.0, "risk_score": 0.05} for a in RING]
+    return txns
+
+
+def test_duplicate_pairs_are_summed_into_one_link():
+    graph = AccountMerchantGraph(["a", "a", "b"], ["m", "m", "m"], amounts=[1, 2, 4])
+    assert graph.n_transactions == 3
+    assert graph.counts.toarray().tolist() == [[2], [1]]
+    assert graph.amounts.toarray().ravel().tolist() == [3, 4]
+    assert graph.merchant_degree.tolist() == [2]
+
+
+def test_mismatched_lengths_raise():
+    with pytest.raises(ValueError):
+        AccountMerchantGraph(["a", "b"], ["m"])
+
+
+def test_hub_is_set_aside_and_ring_ranks_first():
+    graph = AccountMerchantGraph.from_transactions(_transactions())
+    threshold = graph.hub_threshold()
+    hubs = graph.hubs(threshold)
+    assert [h["merchant"] for h in hubs] == ["MEGAMART"]
+    assert hubs[0]["accounts"] == 204
+
+    rings = graph.find_rings(hub_degree=threshold)
+    top = rings[0]
+    assert sorted(top["accounts"]) == RING
+    assert sorted(top["merchants"]) == ["SHELL-A", "SHELL-B"]
+    assert top["density"] == 1.0
+    assert top["transactions"] == 24 and top["total_amount"] == 24 * 900.0
+    assert all(r["score"] < top["score"] for r in rings[1:])
+
+
+def test_without_hub_pruning_everything_collapses():
+    graph = AccountMerchantGraph.from_transactions(_transactions())
+    rings = graph.find_rings(hub_degree=10_000)
+    assert len(rings[0]["accounts"]) == 204
+
+
+def test_report_lists_hubs_and_rings():
+    graph = AccountMerchantGraph.from_transactions(_transactions())
+    threshold = graph.hub_threshold()
+    report = format_ring_report(graph.find_rings(hub_degree=threshold, top_n=1), graph.hubs(threshold),
+                                graph.n_transactions, len(graph.account_labels), len(graph.merchant_labels))
+    assert "MEGAMART" in report and "#1 score" in report and "RING0" in report
+    assert "No coordinated" in format_ring_report([], [], 0, 0, 0)
@@ -0,0 +1,45 @@
+import os
+
+import numpy as np
+import pytest
+
+from intent_classifier import INTENT_MODEL_PATH, IntentClassifier, evaluate, load_examples
+
+HOLDOUT_PATH = os.path.join(os.path.dirname(INTENT_MODEL_PATH), "intent_holdout.jsonl")
+TRAINING_PATH = os.path.join(os.path.dirname(INTENT_MODEL_PATH), "intent_training.jsonl")
+
+
+@pytest.fixture(scope="module")
+def model():
+    return IntentClassifier.load()
+
+
+def test_holdout_is_not_training_data():
+    training = {e["text"].lower() for e in load_examples(TRAINING_PATH)}
+    assert not [e for e in load_examples(HOLDOUT_PATH) if e["text"].lower() in training]
+
+
+def test_holdout_routing_quality(model):
+    report = evaluate(model, load_examples(HOLDOUT_PATH))
+    assert report["in_scope_accuracy"] >= 0.9, report["errors"]
+    assert report["off_topic_rejected"] >= 0.9, report["errors"]
+
+
+@pytest.mark.parametrize("query", ["", "xyzzy", "translate this to French", "book a flight to Paris"])
+def test_unknown_words_are_rejected_not_sent_to_a_default_agent(model, query):
+    decision = model.classify(query)
+    assert decision["decision"] == "reject"
+    assert decision["agents"] == []
+
+
+def test_bias_only_scores_are_the_priors(model):
+    scores = model.scores("xyzzy")
+    for label, prior in model.priors.items():
+        assert scores[label] == pytest.approx(prior)
+
+
+def test_single_and_batch_scoring_agree(model):
+    queries = ["did anyone wire money to a newly created payee", "what is the beta of our equity book", ""]
+    batch = model.predict_proba(queries)
+    for row, query in zip(batch, queries):
+        np.testing.assert_allclose(row, [model.scores(query)[l] for l in model.labels], rtol=1e-3)
@@ -0,0 +1,109 @@
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+
+import market_statistics
+from market_statistics import TRADING_DAYS, correlation_payload, correlation_statistics, rolling_volatility
+from price_history import append_closes, load_price_matrix
+
+
+@pytest.fixture
+def loads(price_dir, monkeypatch):
+    """Empty statistics cache, recording every price-matrix load it has to make"""
+    monkeypatch.setattr(market_statistics, "_cache", OrderedDict())
+    calls = []
+
+    def counting_load(symbols, *args, **kwargs):
+        calls.append(tuple(symbols))
+        return load_price_matrix(symbols, *args, **kwargs)
+
+    monkeypatch.setattr(market_statistics, "load_price_matrix", counting_load)
+    return calls
+
+
+def test_rolling_volatility_matches_window_std():
+    returns = np.random.default_rng(3).normal(0, 0.01, (40, 3))
+    rolling = rolling_volatility(returns, 10)
+    expected = np.array([returns[t:t + 10].std(axis=0, ddof=1) for t in range(31)]) * np.sqrt(TRADING_DAYS)
+    assert rolling.shape == (31, 3)
+    np.testing.assert_allclose(rolling, expected)
+    # Flat prices give zero volatility, not NaN from rounding below zero
+    assert not rolling_volatility(np.full((5, 1), 0.001), 3).any()
+
+
+def test_correlation_and_volatility_match_the_return_matrix(loads):
+    result = correlation_statistics(["spy", "AGG", "GLD", "SPY"], window=120, vol_window=21)
+    dates, prices = load_price_matrix(["SPY", "AGG", "GLD"], lookback=120)
+    returns = prices[1:] / prices[:-1] - 1
+
+    assert result["symbols"] == ["SPY", "AGG", "GLD"]
+    assert (result["start"], result["as_of"], result["observations"]) == (str(dates[0]), str(dates[-1]), 120)
+    np.testing.assert_allclose(result["correlation"], np.corrcoef(returns, rowvar=False))
+    np.testing.assert_allclose(result["volatility"], returns.std(axis=0, ddof=1) * np.sqrt(TRADING_DAYS))
+    # The last rolling value covers the last 21 returns and is dated on the last bar
+    assert result["rolling_dates"][-1] == str(dates[-1]) and len(result["rolling_dates"]) == 100
+    np.testing.assert_allclose(result["rolling_volatility"][-1],
+                               returns[-21:].std(axis=0, ddof=1) * np.sqrt(TRADING_DAYS))
+
+    payload = correlation_payload(result, top_pairs=2)
+    assert len(payload["top_pairs"]) == 2
+    assert abs(payload["top_pairs"][0]["correlation"]) >= abs(payload["top_pairs"][1]["correlation"])
+    assert list(payload["rolling_volatility"]["series"]) == ["SPY", "AGG", "GLD"]
+
+
+def test_cache_keyed_by_symbol_set_in_caller_order(loads):
+    first = correlation_statistics(["SPY", "AGG", "GLD"], window=120)
+    reordered = correlation_statistics(["gld", "SPY", "agg"], window=120)
+    assert len(loads) == 1
+    assert reordered["symbols"] == ["GLD", "SPY", "AGG"]
+    np.testing.assert_allclose(reordered["correlation"], first["correlation"][np.ix_([2, 0, 1], [2, 0, 1])])
+    np.testing.assert_allclose(reordered["volatility"], first["volatility"][[2, 0, 1]])
+    np.testing.assert_allclose(reordered["rolling_volatility"], first["rolling_volatility"][:, [2, 0, 1]])
+    # The cached entry itself keeps its original order
+    assert correlation_statistics(["SPY", "AGG", "GLD"], window=120)["symbols"] == ["SPY", "AGG", "GLD"]
+    assert len(loads) == 1
+
+
+def test_cache_key_includes_windows_and_as_of(loads):
+    dates, _ = load_price_matrix(["SPY", "AGG"])
+    correlation_statistics(["SPY", "AGG"], window=120)
+    correlation_statistics(["SPY", "AGG"], window=60)
+    correlation_statistics(["SPY", "AGG"], window=120, vol_window=10)
+    assert len(loads) == 3
+
+    # An as-of date on or past the last bar resolves to the same key; an earlier one does not
+    correlation_statistics(["SPY", "AGG"], window=120, as_of=str(dates[-1] + 30))
+    assert len(loads) == 3
+    earlier = correlation_statistics(["SPY", "AGG"], window=120, as_of=str(dates[-10]))
+    assert len(loads) == 4 and earlier["as_of"] == str(dates[-10])
+
+    # A new bar moves the as-of date, so the next request recomputes instead of serving a stale matrix
+    append_closes({"SPY": 150.0, "AGG": 90.0}, dates[-1] + 1)
+    assert correlation_statistics(["SPY", "AGG"], window=120)["as_of"] == str(dates[-1] + 1)
+    assert len(loads) == 5
+
+
+def test_lru_evicts_least_recently_used(loads, monkeypatch):
+    monkeypatch.setattr(market_statistics, "CORRELATION_CACHE_SIZE", 2)
+    correlation_statistics(["SPY", "AGG"], window=60)
+    correlation_statistics(["SPY", "GLD"], window=60)
+    correlation_statistics(["AGG", "SPY"], window=60)           # hit, now most recent
+    correlation_statistics(["GLD", "QQQ"], window=60)           # evicts SPY/GLD
+    assert len(loads) == 3 and len(market_statistics._cache) == 2
+    assert {key[0] for key in market_statistics._cache} == {frozenset({"SPY", "AGG"}), frozenset({"GLD", "QQQ"})}
+
+    correlation_statistics(["SPY", "AGG"], window=60)
+    assert len(loads) == 3
+    correlation_statistics(["SPY", "GLD"], window=60)
+    assert len(loads) == 4
+
+
+def test_rejects_bad_arguments(loads):
+    with pytest.raises(ValueError, match="at least two symbols"):
+        correlation_statistics(["SPY", "spy", " "])
+    with pytest.raises(ValueError, match="larger than vol_window"):
+        correlation_statistics(["SPY", "AGG"], window=21, vol_window=21)
+    with pytest.raises(ValueError, match="Not enough overlapping history"):
+        correlation_statistics(["SPY", "AGG"], window=10_000, vol_window=5_000)
+    assert loads == [("SPY", "AGG")] and not market_statistics._cache
@@ -0,0 +1,43 @@
+from statistics import NormalDist
+
+import numpy as np
+import pytest
+
+import monte_carlo
+from monte_carlo import MIN_CHUNK_SIZE, chunk_size_for, run_monte_carlo
+
+
+def test_chunk_size_follows_memory_budget():
+    budget = 512 * 2 ** 20
+    paths = chunk_size_for(horizon=21, n_assets=50, concurrent=8, budget=budget)
+    assert paths == budget // (8 * 3 * 21 * 50 * 8)
+    assert 8 * paths * 3 * 21 * 50 * 8 <= budget
+    assert chunk_size_for(horizon=1, n_assets=2, concurrent=1, budget=budget) == monte_carlo.DEFAULT_CHUNK_SIZE
+    assert chunk_size_for(horizon=252, n_assets=500, concurrent=8, budget=budget) == MIN_CHUNK_SIZE
+
+
+def test_rounds_are_split_to_stay_within_budget(monkeypatch):
+    mapped = []
+
+    class Pool:
+        def map(self, fn, tasks):
+            mapped.append(len(tasks))
+            return map(fn, tasks)
+
+    monkeypatch.setattr(monte_carlo, "_get_pool", lambda workers: Pool())
+    n = 20
+    budget = 3 * MIN_CHUNK_SIZE * 3 * 10 * n * 8     # three floor-sized chunks of a 10-day, 20-asset problem
+    result = run_monte_carlo(np.zeros(n), np.eye(n) * 0.01, np.full(n, 1 / n), horizon=10, max_paths=8_000,
+                             tolerance=0.0, seed=1, max_workers=8, memory_budget=budget)
+    assert result["chunk_size"] == MIN_CHUNK_SIZE
+    assert max(mapped) == 3
+
+
+def test_matches_closed_form_and_is_reproducible_across_workers():
+    sigma = 0.01
+    kwargs = dict(mean=np.zeros(1), chol=np.array([[sigma]]), weights=np.ones(1), horizon=1,
+                  confidence=0.99, max_paths=200_000, tolerance=0.005, seed=42, chunk_size=10_000)
+    serial = run_monte_carlo(max_workers=1, **kwargs)
+    assert serial["var_pct"] == pytest.approx(-NormalDist().inv_cdf(0.01) * sigma, rel=0.03)
+    assert serial["cvar_pct"] > serial["var_pct"]
+    assert run_monte_carlo(max_workers=2, **kwargs) == serial
@@ -0,0 +1,89 @@
+import json
+import time
+
+import pytest
+
+from services.portfolio_book import PortfolioBook
+
+
+@pytest.fixture
+def book():
+    book = PortfolioBook()
+    book.update_prices({"SPY": 100.0, "AGG": 100.0, "GLD": 100.0})
+    return book
+
+
+def test_marks_and_pnl_move_incrementally(book):
+    portfolio = book.upsert_portfolio("p1", positions={"spy": 10, "AGG": 5}, cost_basis={"SPY": 90, "AGG": 100},
+                                      cash=100)
+    assert portfolio.market_value == 1600
+    book.update_price("SPY", 110)
+    assert portfolio.market_value == 1700
+    assert portfolio.pnl == pytest.approx(1700 - (100 + 900 + 500))
+
+
+def test_tick_rechecks_concentration_of_every_position(book):
+    book.upsert_portfolio("p1", positions={"SPY": 4, "AGG": 6}, limits={"max_position_pct": 0.65})
+    # AGG is 60%; a fall in SPY pushes AGG past the cap without AGG ticking
+    breaches = book.update_price("SPY", 50)
+    assert [(b["limit"], b["symbol"]) for b in breaches] == [("max_position_pct", "AGG")]
+    # Alerts fire once per breach, not on every tick while it lasts
+    assert book.update_price("SPY", 49) == []
+
+
+def test_loss_and_value_floors(book):
+    book.upsert_portfolio("p1", positions={"GLD": 10}, cost_basis={"GLD": 100}, limits={"max_loss": 200,
+                                                                                         "min_value": 700})
+    breaches = book.update_price("GLD", 65)
+    assert {b["limit"] for b in breaches} == {"max_loss", "min_value"}
+
+
+def test_invalid_input_keeps_existing_state(book):
+    book.upsert_portfolio("p1", positions={"SPY": 1})
+    with pytest.raises(ValueError):
+        book.upsert_portfolio("p1", positions={"SPY": 1}, cash="lots")
+    assert book.get("p1").positions == {"SPY": 1.0}
+    with pytest.raises(ValueError):
+        book.update_prices({"SPY": 120, "AGG": "n/a"})
+    assert book.prices["SPY"] == 100.0
+
+
+def test_price_saves_are_debounced(tmp_path):
+    path = tmp_path / "book.json"
+    book = PortfolioBook(str(path), save_interval=0.2)
+    book.upsert_portfolio("p1", positions={"SPY": 1})
+    book.update_price("SPY", 101)
+    book.request_save()
+    book.update_price("SPY", 102)
+    book.request_save()
+    assert json.loads(path.read_text())["prices"] == {}
+    time.sleep(0.4)
+    assert json.loads(path.read_text())["prices"] == {"SPY": 102.0}
+    assert PortfolioBook(str(path)).get("p1").market_value == 102.0
+
+
+@pytest.mark.parametrize("price", ["nan", float("inf"), "-inf", 0, -3.5])
+def test_non_finite_or_non_positive_prices_are_rejected(book, price):
+    portfolio = book.upsert_portfolio("p1", positions={"SPY": 10, "AGG": 5}, limits={"max_loss": 100})
+    before = (portfolio.market_value, portfolio.pnl, dict(book.prices))
+    with pytest.raises(ValueError, match="SPY"):
+        book.update_prices({"AGG": 101, "SPY": price})
+    assert (portfolio.market_value, portfolio.pnl, book.prices) == before
+
+
+@pytest.mark.parametrize("field", [
+    {"positions": {"SPY": "nan"}},
+    {"positions": {"SPY": 1}, "cash": "inf"},
+    {"positions": {"SPY": 1}, "cost_basis": {"SPY": float("nan")}},
+    {"positions": {"SPY": 1}, "limits": {"max_loss": "-inf"}},
+])
+def test_non_finite_portfolio_fields_are_rejected(book, field):
+    with pytest.raises(ValueError, match="finite"):
+        book.upsert_portfolio("p1", **field)
+    assert "p1" not in book.portfolios
+
+
+def test_poisoned_saved_prices_are_dropped_on_load(tmp_path):
+    path = tmp_path / "book.json"
+    path.write_text(json.dumps({"prices": {"SPY": 101.0, "AGG": "NaN"}, "portfolios": []}))
+    assert PortfolioBook(str(path)).prices == {"SPY": 101.0}
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from portfolio_optimizer import (TRADING_DAYS, min_variance_weights, normalize_holdings, project_capped_simplex,
+                                 rebalance, target_risk_weights)
+
+COV = np.array([[0.040, 0.006, 0.002],
+                [0.006, 0.010, 0.001],
+                [0.002, 0.001, 0.020]]) / TRADING_DAYS
+
+
+def test_projection_lands_on_capped_simplex():
+    w = project_capped_simplex(np.array([0.9, 0.5, -0.2, 0.1]), np.zeros(4), np.full(4, 0.5))
+    assert w.sum() == pytest.approx(1.0)
+    assert (w >= -1e-12).all() and (w <= 0.5 + 1e-12).all()
+
+
+def test_min_variance_matches_closed_form_when_unconstrained():
+    inverse = np.linalg.inv(COV)
+    expected = inverse.sum(axis=1) / inverse.sum()
+    np.testing.assert_allclose(min_variance_weights(COV), expected, atol=1e-3)
+
+
+def test_position_caps_are_respected():
+    w = min_variance_weights(COV, upper=0.4)
+    assert w.max() <= 0.4 + 1e-9
+    assert w.sum() == pytest.approx(1.0)
+
+
+def test_infeasible_caps_are_rejected():
+    with pytest.raises(ValueError):
+        min_variance_weights(COV, upper=0.2)
+
+
+def test_target_risk_stays_within_target():
+    mean = np.array([0.0008, 0.0002, 0.0004])
+    w = target_risk_weights(COV, mean, target_vol=0.13)
+    assert np.sqrt(w @ COV @ w * TRADING_DAYS) <= 0.13 + 1e-6
+    assert w @ mean > min_variance_weights(COV) @ mean
+
+
+def test_normalize_holdings_merges_cased_keys():
+    assert normalize_holdings({"spy": 0.3, "SPY": 0.2, " agg ": 0.5}) == {"SPY": 0.5, "AGG": 0.5}
+
+
+def test_rebalance_reads_current_weights_for_lowercase_tickers(price_dir):
+    upper = rebalance(["SPY", "AGG", "GLD"], {"SPY": 0.6, "AGG": 0.3, "GLD": 0.1})
+    lower = rebalance(["spy", "agg", "gld"], {"spy": 0.6, "agg": 0.3, "gld": 0.1})
+    assert lower["current_weights"] == {"SPY": 0.6, "AGG": 0.3, "GLD": 0.1}
+    assert lower["trades"] == upper["trades"]
+    assert lower["turnover"] == pytest.approx(upper["turnover"])
@@ -0,0 +1,78 @@
+import os
+
+import numpy as np
+import pytest
+
+import price_history
+from covariance_cache import CovarianceCache
+from price_history import load_price_matrix, missing_symbols
+from services import startup
+from services.portfolio_book import PortfolioBook
+
+
+def test_missing_history_names_every_absent_symbol(price_dir):
+    assert missing_symbols(["spy", "TSLA", "nvda"]) == ["TSLA", "NVDA"]
+    with pytest.raises(FileNotFoundError, match=r"No price history for TSLA, NVDA .*make price-history"):
+        load_price_matrix(["SPY", "TSLA", "NVDA"])
+
+
+def test_empty_store_reports_instead_of_failing_obscurely(tmp_path, monkeypatch):
+    monkeypatch.setattr(price_history, "PRICE_HISTORY_DIR", str(tmp_path / "never_fetched"))
+    assert price_history.available_symbols() == []
+    with pytest.raises(FileNotFoundError, match="No price history for SPY, AGG"):
+        load_price_matrix(["SPY", "AGG"])
+
+
+class FakeDataService:
+    """Stands in for the yfinance download: writes 30 flat bars per requested symbol"""
+    requested = []
+
+    def __init__(self):
+        self.yfinance_available = True
+
+    def save_price_history(self, symbols, directory):
+        FakeDataService.requested = list(symbols)
+        os.makedirs(directory, exist_ok=True)
+        for symbol in symbols:
+            if symbol == "DELISTED":
+                continue
+            with open(os.path.join(directory, f"{symbol}.csv"), "w") as f:
+                f.write("Date,Close\n")
+                for i, day in enumerate(np.datetime64("2024-01-01") + np.arange(30)):
+                    f.write(f"{day},{100 + i}\n")
+        return [s for s in symbols if s != "DELISTED"]
+
+
+def test_refresh_fetches_configured_and_held_symbols(tmp_path, monkeypatch, caplog):
+    book = PortfolioBook()
+    book.upsert_portfolio("p1", positions={"tsla": 10, "DELISTED": 1})
+    book.upsert_portfolio("p2", positions={"SPY": 10, "AGG": 5})
+    cache = CovarianceCache(cache_dir=str(tmp_path / "cov"))
+    directory = str(tmp_path / "price_history")
+    monkeypatch.setattr(startup, "FinancialDataService", FakeDataService)
+    monkeypatch.setattr(startup, "get_portfolio_book", lambda: book)
+    monkeypatch.setattr(startup, "get_covariance_cache", lambda: cache)
+    monkeypatch.setattr(startup.Config, "PRICE_HISTORY_SYMBOLS", ["SPY", " agg", ""])
+    monkeypatch.setattr(price_history, "PRICE_HISTORY_DIR", directory)
+    price_history._series_cache.clear()
+
+    updated = startup.refresh_price_history()
+    assert FakeDataService.requested == ["AGG", "DELISTED", "SPY", "TSLA"]
+    assert updated == ["AGG", "SPY", "TSLA"]
+    assert "DELISTED" in caplog.text
+    _, prices = load_price_matrix(["SPY", "TSLA"])
+    assert prices.shape == (30, 2)
+    # The cold covariance cache is warmed for the book portfolio that has history
+    assert list(cache._estimators) == [("AGG", "SPY")]
+
+
+def test_risk_agent_reports_missing_history_instead_of_falling_back(tmp_path, monkeypatch):
+    pytest.importorskip("strands")
+    pytest.importorskip("bedrock_agentcore")
+    import finops_risk_ai_agent as agent
+
+    monkeypatch.setattr(price_history, "PRICE_HISTORY_DIR", str(tmp_path / "empty"))
+    answered = agent.router.answer({"inputText": "Calculate: VaR 95%, $100k, 60% SPY + 40% AGG, 1 day"})
+    assert answered["path"] == "fast:portfolio_var"
+    assert "No price history for SPY, AGG" in answered["result"]
+    assert "VALUE AT RISK ANALYSIS" not in answered["result"]
@@ -0,0 +1,80 @@
+import pytest
+
+from query_router import QueryRouter, get_query_router, tokenize
+
+
+class FixedClassifier:
+    def __init__(self, decision, agents):
+        self.calls = 0
+        self.result = {"decision": decision, "agents": agents, "confidence": 0.42, "scores": {}}
+
+    def classify(self, text):
+        self.calls += 1
+        return self.result
+
+
+@pytest.fixture
+def router():
+    return QueryRouter()
+
+
+def test_tokenize_folds_case_and_punctuation():
+    assert tokenize("SOX/PCI-DSS, Café!") == [b"sox", b"pci", b"dss", "café".encode()]
+
+
+@pytest.mark.parametrize("query, agents", [
+    ("Check these transactions for fraud", ["fraud_detection"]),
+    ("What is our SOX and PCI-DSS compliance status?", ["compliance"]),
+    ("Calculate the 99% VaR of my portfolio", ["risk_analysis"]),
+    ("Stress test the portfolio and review AML audit findings", ["compliance", "risk_analysis"]),
+    ("Any anomalies in the chargebacks?", ["fraud_detection"]),
+    ("Review the anti-money laundering policy", ["compliance"]),
+])
+def test_keywords_route_in_canonical_order(router, query, agents):
+    routing = router.route(query)
+    assert routing["agents"] == agents
+    assert routing["source"] == "keywords" and routing["decision"] == "route"
+
+
+def test_matching_is_word_bounded(router):
+    routing = router.route("Summarize various updates for the stockholm office")
+    assert routing["agents"] == ["fraud_detection"] and routing["default"]
+    assert router.agents_for("various stockholm updates", default=None) == []
+
+
+def test_phrases_need_every_word(router):
+    assert router.route("what is the value at risk")["matched"]["risk_analysis"] == ["risk", "value at risk"]
+    assert "value at risk" not in router.route("value the risk")["matched"]["risk_analysis"]
+
+
+def test_priority_keywords(router):
+    assert router.route("URGENT: suspicious wire")["priority"] == "high"
+    assert router.route("suspicious wire")["priority"] == "normal"
+
+
+def test_classifier_decides_when_no_keyword_matches():
+    classifier = FixedClassifier("fan_out", ["fraud_detection", "compliance"])
+    router = QueryRouter(classifier=classifier)
+    routing = router.route("Give me an overview of last quarter")
+    assert routing["source"] == "classifier" and routing["decision"] == "fan_out"
+    assert routing["agents"] == ["fraud_detection", "compliance"] and routing["confidence"] == 0.42
+    assert router.route("any fraud?")["source"] == "keywords"
+    assert classifier.calls == 1
+
+
+def test_decisions_are_cached_per_normalized_query():
+    classifier = FixedClassifier("reject", [])
+    router = QueryRouter(classifier=classifier, cache_size=2)
+    for query in ("Tell me a joke", "tell me a JOKE!", "tell  me a joke"):
+        assert router.route(query)["agents"] == []
+    assert classifier.calls == 1
+    assert router.stats()["hits"] == 2
+    router.route("fraud")
+    router.route("sox")
+    router.route("tell me a joke")
+    assert classifier.calls == 2 and router.stats()["entries"] == 2
+
+
+def test_shipped_router_rejects_off_topic_queries():
+    routing = get_query_router().route("What's a good recipe for banana bread?")
+    assert routing["source"] == "classifier" and routing["decision"] == "reject" and routing["agents"] == []
@@ -0,0 +1,114 @@
+import os
+
+import pytest
+
+moto = pytest.importorskip("moto")
+import boto3  # noqa: E402
+
+import report_store  # noqa: E402
+from report_store import ReportStore  # noqa: E402
+
+BUCKET = "finops-reports"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    for name, value in {"AWS_ACCESS_KEY_ID": "testing", "AWS_SECRET_ACCESS_KEY": "testing",
+                        "AWS_SESSION_TOKEN": "testing", "AWS_DEFAULT_REGION": "us-east-1"}.items():
+        monkeypatch.setenv(name, value)
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        calls = []
+        client.meta.events.register("after-call.s3.*", lambda model, **kw: calls.append(model.name))
+        client.calls = calls
+        yield client
+
+
+@pytest.fixture
+def store(s3, tmp_path):
+    return ReportStore(BUCKET, cache_dir=str(tmp_path), client=s3)
+
+
+def test_second_fetch_is_a_304(s3, store):
+    s3.put_object(Bucket=BUCKET, Key="sox/q1.txt", Body=b"SOX compliant")
+    first = store.fetch("sox/q1.txt")
+    assert first.status == "downloaded" and first.text() == "SOX compliant" and first.size == 13
+
+    second = store.fetch("sox/q1.txt")
+    assert second.status == "not_modified" and second.etag == first.etag
+    assert second.text() == "SOX compliant"
+
+    s3.put_object(Bucket=BUCKET, Key="sox/q1.txt", Body=b"SOX: 2 findings")
+    assert store.fetch("sox/q1.txt").status == "downloaded"
+    assert store.fetch("sox/q1.txt").text() == "SOX: 2 findings"
+
+
+def test_s3_errors_serve_the_stale_copy(s3, store):
+    s3.put_object(Bucket=BUCKET, Key="pci/audit.txt", Body=b"PCI-DSS passed")
+    store.fetch("pci/audit.txt")
+    s3.delete_object(Bucket=BUCKET, Key="pci/audit.txt")
+
+    stale = store.fetch("pci/audit.txt")
+    assert stale.status == "stale" and stale.available and "NoSuchKey" in stale.error
+    assert stale.text() == "PCI-DSS passed"
+
+    missing = store.fetch("never/cached.txt")
+    assert missing.status == "missing" and not missing.available
+
+
+def test_large_bodies_stream_to_disk_in_chunks(s3, store, monkeypatch):
+    monkeypatch.setattr(report_store, "STREAM_CHUNK_BYTES", 1024)
+    body = b"".join(b"line %05d of the AML report\n" % i for i in range(400))
+    s3.put_object(Bucket=BUCKET, Key="aml/big.txt", Body=body)
+
+    written = []
+    real_open = open
+
+    def spy_open(path, mode="r", *args, **kwargs):
+        f = real_open(path, mode, *args, **kwargs)
+        if "wb" in mode:
+            write = f.write
+            f.write = lambda chunk: written.append(len(chunk)) or write(chunk)
+        return f
+
+    monkeypatch.setattr("builtins.open", spy_open)
+    obj = store.fetch("aml/big.txt")
+    monkeypatch.undo()
+
+    assert max(written) <= 1024 and sum(written) == len(body) and len(written) > 1
+    assert obj.size == len(body)
+    assert list(obj.lines())[399] == "line 00399 of the AML report"
+    assert not os.path.exists(obj.path + ".tmp")
+
+
+def test_paginated_sync_fetches_only_what_changed(s3, store):
+    s3.meta.events.register("before-parameter-build.s3.ListObjectsV2",
+                            lambda params, **kw: params.update(MaxKeys=2))
+    for i in range(5):
+        s3.put_object(Bucket=BUCKET, Key=f"reports/r{i}.txt", Body=f"report {i}".encode())
+    s3.put_object(Bucket=BUCKET, Key="reports/", Body=b"")
+    s3.put_object(Bucket=BUCKET, Key="other/skip.txt", Body=b"not synced")
+
+    first = store.sync("reports/")
+    assert sorted(first["added"]) == [f"reports/r{i}.txt" for i in range(5)]
+    assert s3.calls.count("ListObjectsV2") == 3        # 6 keys (incl. the folder marker), 2 per page
+    assert sorted(store.load_manifest()) == [f"reports/r{i}.txt" for i in range(5)]
+
+    s3.calls.clear()
+    again = store.sync("reports/")
+    assert len(again["unchanged"]) == 5 and not (again["added"] or again["changed"] or again["removed"])
+    assert "GetObject" not in s3.calls
+
+    s3.put_object(Bucket=BUCKET, Key="reports/r1.txt", Body=b"report 1, revised")
+    s3.delete_object(Bucket=BUCKET, Key="reports/r2.txt")
+    s3.put_object(Bucket=BUCKET, Key="reports/r5.txt", Body=b"report 5")
+    s3.calls.clear()
+    delta = store.sync("reports/")
+    assert (delta["added"], delta["changed"], delta["removed"]) == (["reports/r5.txt"], ["reports/r1.txt"],
+                                                                     ["reports/r2.txt"])
+    assert s3.calls.count("GetObject") == 2
+    cached = {obj.key: obj.text() for obj in store.cached_objects("reports/")}
+    assert cached["reports/r1.txt"] == "report 1, revised" and "reports/r2.txt" not in cached
+    # A fresh store over the same cache directory picks the manifest back up
+    assert ReportStore(BUCKET, cache_dir=os.path.dirname(store.cache_dir), client=s3).sync("reports/")["added"] == []
@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+from result_aggregator import StreamingAggregator, is_heading, scan_signals
+
+CLEAN_FRAUD_REPORT = """
+🔍 FRAUD DETECTION ANALYSIS
+Total Transactions: 10
+High-Risk Transactions: 0
+Risk Threshold: 0.7
+
+✅ No high-risk transactions detected
+No suspicious activity was found in the sample.
+"""
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("High-Risk Transactions: 3", [("fraud", "issue")]),
+    ("High-Risk Transactions: 0", [("fraud", "clear")]),
+    ("Potential fraud detected in TXN-0004.", [("fraud", "issue")]),
+    ("No suspicious activity was found.", [("fraud", "clear")]),
+    ("The transfer is not fraudulent.", [("fraud", "clear")]),
+    ("We didn't find any fraudulent transactions.", [("fraud", "clear")]),
+    ("There were zero violations this quarter.", [("compliance", "clear")]),
+    ("The portfolio is not fully compliant with PCI-DSS.", [("compliance", "issue")]),
+    ("Two non-compliant controls remain open.", [("compliance", "issue")]),
+    ("VaR exceeds the risk limit.", [("risk", "issue")]),
+    ("Volatility is unelevated.", []),
+    ("No fraud found, but 3 violations identified.", [("fraud", "clear"), ("compliance", "issue")]),
+])
+def test_scan_signals(line, expected):
+    assert scan_signals(line) == expected
+
+
+@pytest.mark.parametrize("line", ["🔍 FRAUD DETECTION ANALYSIS", "## Fraud Analysis", "**Compliance Violations**",
+                                  "Suspicious Clusters (ranked):"])
+def test_headings_are_not_findings(line):
+    assert is_heading(line)
+    assert scan_signals(line) == []
+
+
+def test_clean_fraud_report_is_all_clear():
+    aggregator = StreamingAggregator(["fraud_detection"])
+    aggregator.feed("fraud_detection", CLEAN_FRAUD_REPORT)
+    summary = aggregator.complete("fraud_detection")
+    assert summary["key_findings"] == []
+    assert summary["executive_summary"].startswith("✅")
+    assert summary["confidence_score"] == 0.92
+
+
+def test_phrases_split_across_chunks_are_found():
+    aggregator = StreamingAggregator(["fraud_detection"])
+    for chunk in ["Potential fra", "ud detec", "ted in TXN-0004.\nDone"]:
+        aggregator.feed("fraud_detection", chunk)
+    assert aggregator.has_issue("fraud")
+
+
+def test_unfinished_last_line_is_scanned_on_completion():
+    aggregator = StreamingAggregator(["risk_analysis"])
+    aggregator.feed("risk_analysis", "VaR exceeds the risk limit")
+    assert not aggregator.has_issue("risk")
+    aggregator.complete("risk_analysis")
+    assert aggregator.has_issue("risk")
+
+
+def test_provisional_then_final_summary_with_conflicts():
+    updates = []
+    aggregator = StreamingAggregator(["fraud_detection", "compliance"], on_update=updates.append)
+    aggregator.feed("fraud_detection", "High-Risk Transactions: 2\n")
+    first = aggregator.complete("fraud_detection")
+    assert first["status"] == "provisional"
+    assert first["agents_pending"] == ["compliance"]
+    assert first["confidence_score"] == pytest.approx(0.85 * 0.5, abs=0.01)
+
+    aggregator.feed("compliance", "No fraudulent activity affects our filings.\nWe are fully compliant.\n")
+    final = aggregator.complete("compliance")
+    assert final["status"] == "final"
+    assert final["key_findings"] == ["Potential fraudulent activities detected"]
+    assert final["conflicts"] == ["Fraud: fraud_detection reported issues, compliance reported none"]
+    assert final["confidence_score"] == pytest.approx(0.75)
+    assert updates[0] is not None and updates[-1] == final
+
+
+def test_failed_agent_lowers_coverage():
+    aggregator = StreamingAggregator(["fraud_detection", "risk_analysis"])
+    aggregator.complete("fraud_detection", "No suspicious activity.")
+    summary = aggregator.fail("risk_analysis", "timeout")
+    assert summary["status"] == "final"
+    assert summary["agents_failed"] == {"risk_analysis": "timeout"}
+    assert summary["confidence_score"] == pytest.approx(0.92 * 0.5, abs=0.01)
+
+
+
+def test_supervisor_results_keep_their_line_structure():
+    # aggregate_results lives in the supervisor module, which needs the agent runtime packages
+    pytest.importorskip("strands")
+    pytest.importorskip("bedrock_agentcore")
+    from finops_supervisor_ai_agent import aggregate_results
+
+    report = json.loads(aggregate_results([{"agent": "fraud_detection", "response": CLEAN_FRAUD_REPORT}]))
+    assert report["key_findings"] == []
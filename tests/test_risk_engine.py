@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from conftest import SYMBOLS, write_price_history
+from risk_engine import VaREngine, batch_portfolio_metrics, normalize_weights, parse_portfolio_request
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    _, prices = write_price_history(str(tmp_path_factory.mktemp("prices")), bars=500)
+    return VaREngine(SYMBOLS, prices)
+
+
+WEIGHTS = np.array([0.5, 0.2, 0.2, 0.1])
+
+
+def test_parses_free_text_request():
+    request = parse_portfolio_request("Calculate: VaR 99%, $250k, 60% SPY + 30% AGG + 10% GLD, 1 month")
+    assert request["portfolio_value"] == 250_000
+    assert request["holdings"] == pytest.approx({"SPY": 0.6, "AGG": 0.3, "GLD": 0.1})
+    assert request["confidence"] == 0.99
+    assert request["horizon_days"] == 21
+
+
+def test_normalize_weights():
+    symbols, weights = normalize_weights({"spy": 3, "agg": 1})
+    assert symbols == ["SPY", "AGG"] and weights.tolist() == [0.75, 0.25]
+    with pytest.raises(ValueError):
+        normalize_weights({"SPY": 0})
+
+
+def test_parametric_scales_with_horizon(engine):
+    one_day = engine.parametric(WEIGHTS, 1_000_000, 0.99, 1)
+    ten_day = engine.parametric(WEIGHTS, 1_000_000, 0.99, 10)
+    mu = float(WEIGHTS @ engine.mean)
+    # Remove the drift, then the volatility term scales with sqrt(time)
+    assert (ten_day["var_pct"] + 10 * mu) == pytest.approx((one_day["var_pct"] + mu) * np.sqrt(10))
+    assert one_day["cvar"] > one_day["var"] > 0
+
+
+def test_historical_is_the_empirical_quantile(engine):
+    result = engine.historical(WEIGHTS, 100.0, 0.95, 1)
+    losses = -(engine.returns @ WEIGHTS)
+    assert result["var_pct"] == pytest.approx(np.quantile(losses, 0.95))
+    with pytest.raises(ValueError):
+        engine.historical(WEIGHTS, 100.0, 0.95, 10_000)
+
+
+def test_attribution_components_sum_and_incremental_matches_refit(engine):
+    value = 1_000_000
+    attribution = engine.attribution(WEIGHTS, value, 0.99, 5)
+    assert attribution["component_var"].sum() == pytest.approx(attribution["total_var"])
+    assert attribution["total_var"] == pytest.approx(engine.parametric(WEIGHTS, value, 0.99, 5)["var"])
+
+    without_spy = WEIGHTS.copy()
+    without_spy[0] = 0.0
+    # Same dollars in the other holdings, none in SPY
+    remaining = engine.parametric(without_spy, value, 0.99, 5)["var"]
+    assert attribution["incremental_var"][0] == pytest.approx(attribution["total_var"] - remaining)
+
+
+def test_batch_metrics_match_single_portfolio_results(engine):
+    stacked = np.array([WEIGHTS, [0.25] * 4])
+    values = np.array([1_000_000.0, 50_000.0])
+    metrics = batch_portfolio_metrics(stacked, engine.mean, engine.cov, values, benchmark_index=0,
+                                      confidence=0.99, horizon=10, returns=engine.returns)
+    for i, weights in enumerate(stacked):
+        assert metrics["var"][i] == pytest.approx(engine.parametric(weights, values[i], 0.99, 10)["var"])
+        assert metrics["historical_var"][i] == pytest.approx(
+            engine.historical(weights, values[i], 0.99, 10)["var"])
+    spy_only = batch_portfolio_metrics(np.eye(4)[:1], engine.mean, engine.cov, [1.0], benchmark_index=0)
+    assert spy_only["beta"][0] == pytest.approx(1.0)
+
+
+def test_calculate_rejects_unknown_methods(engine):
+    assert [r["method"] for r in engine.calculate(WEIGHTS, 1.0, methods=("parametric", "historical"))] == [
+        "parametric", "historical"]
+    with pytest.raises(ValueError, match="Unknown VaR method"):
+        engine.calculate(WEIGHTS, 1.0, methods=("garch",))
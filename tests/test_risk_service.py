@@ -0,0 +1,92 @@
+import math
+
+import numpy as np
+import pytest
+
+from services.risk_service import RiskService
+
+PORTFOLIOS = [
+    {"name": "balanced", "value": 100_000, "holdings": {"SPY": 0.6, "AGG": 0.4}},
+    {"name": "growth", "value": 50_000, "holdings": {"QQQ": 0.7, "GLD": 0.3}},
+]
+
+
+def test_stress_ranks_worst_scenarios(price_dir):
+    result = RiskService().stress_test(PORTFOLIOS, top_n=3, history_horizon="21")
+    assert result["portfolio_count"] == 2
+    for row in result["portfolios"]:
+        losses = [s["loss"] for s in row["top_scenarios"]]
+        assert len(losses) == 3 and losses == sorted(losses, reverse=True)
+        assert row["worst_loss"] == losses[0]
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"top_n": 0},
+    {"top_n": "five"},
+    {"top_n": None},
+    {"top_n": 2.5},
+    {"history_horizon": "month"},
+    {"history_horizon": -21},
+    {"scenarios": "2008 Financial Crisis"},
+])
+def test_stress_rejects_bad_parameters(price_dir, kwargs):
+    with pytest.raises(ValueError):
+        RiskService().stress_test(PORTFOLIOS, **kwargs)
+
+
+@pytest.mark.parametrize("portfolio", [
+    {"value": 1000, "holdings": {"SPY": "heavy"}},
+    {"value": 1000, "holdings": {"SPY": None}},
+    {"value": 1000, "holdings": ["SPY"]},
+    {"value": "a lot", "holdings": {"SPY": 1}},
+    "SPY",
+])
+def test_rejects_malformed_portfolios(price_dir, portfolio):
+    with pytest.raises(ValueError):
+        RiskService().stress_test([portfolio])
+    with pytest.raises(ValueError):
+        RiskService().batch_risk([portfolio])
+
+
+def test_batch_risk_metrics_are_finite(price_dir):
+    result = RiskService().batch_risk(PORTFOLIOS, include_historical=True)
+    for row in result["portfolios"]:
+        assert row["var"] > 0 and row["cvar"] >= row["var"]
+        assert all(math.isfinite(v) for v in row.values() if isinstance(v, float))
+
+
+@pytest.mark.parametrize("holdings", [{"SPY": 0, "AGG": 0}, {"SPY": 0.5, "AGG": -0.5}])
+def test_batch_risk_rejects_weights_without_positive_total(price_dir, holdings):
+    with pytest.raises(ValueError, match="sum to a positive"):
+        RiskService().batch_risk(PORTFOLIOS + [{"name": "empty", "value": 1000, "holdings": holdings}])
+
+
+def test_undefined_beta_is_null_not_nan(price_dir):
+    with open(f"{price_dir}/FLAT.csv", "w") as f:
+        f.write("Date,Open,High,Low,Close,Adj Close,Volume\n")
+        for date in np.datetime64("2022-01-03", "D") + np.arange(300):
+            f.write(f"{date},1,1,1,1,1,0\n")
+    result = RiskService().batch_risk(PORTFOLIOS, benchmark="FLAT")
+    assert [row["beta"] for row in result["portfolios"]] == [None, None]
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"horizon_days": 0},
+    {"horizon_days": -5},
+    {"horizon_days": "week"},
+    {"confidence": 1},
+    {"confidence": 0},
+    {"confidence": 95},
+    {"confidence": None},
+    {"benchmark": 42},
+    {"benchmark": ["SPY"]},
+])
+def test_batch_risk_rejects_bad_parameters(price_dir, kwargs):
+    with pytest.raises(ValueError):
+        RiskService().batch_risk(PORTFOLIOS, **kwargs)
+
+
+def test_batch_risk_accepts_json_style_numbers(price_dir):
+    result = RiskService().batch_risk(PORTFOLIOS, confidence="0.99", horizon_days="10", benchmark=" spy ")
+    assert (result["confidence"], result["horizon_days"], result["benchmark"]) == (0.99, 10, "SPY")
+    assert all(row["var"] > 0 for row in result["portfolios"])
@@ -0,0 +1,139 @@
+import pytest
+
+import sanctions_screening
+from sanctions_screening import (SanctionsIndex, download_sanctions_list, get_sanctions_index, load_sanctions_list,
+                                 normalize_tokens, phonetic_code, phonetic_key)
+
+# OFAC layout: ent_num, SDN_Name, SDN_Type, Program, Title, ... with "-0-" for empty fields
+SDN_CSV = (
+    '101,"QADHAFI, Muammar","individual","LIBYA2","-0-"\n'
+    '102,"BANCO NACIONAL DE CUBA","-0-","CUBA","-0-"\n'
+    '103,"PETROSTAR TRADING LLC","-0-","IRAN","-0-"\n'
+)
+# ent_num, alt_num, alt_type, alt_name, alt_remarks
+ALT_CSV = (
+    '101,1,"aka","AL-GADDAFI, Moammar","-0-"\n'
+    '102,2,"aka","NATIONAL BANK OF CUBA","-0-"\n'
+    '999,3,"aka","NOT A LISTED ENTRY","-0-"\n'
+)
+
+
+@pytest.fixture
+def index():
+    return SanctionsIndex([
+        {"uid": "101", "name": "QADHAFI, Muammar", "type": "individual", "program": "LIBYA2",
+         "aliases": ["AL-GADDAFI, Moammar"]},
+        {"uid": "102", "name": "BANCO NACIONAL DE CUBA", "type": "", "program": "CUBA",
+         "aliases": ["NATIONAL BANK OF CUBA"]},
+        {"uid": "103", "name": "PETROSTAR TRADING LLC", "type": "", "program": "IRAN", "aliases": []},
+    ])
+
+
+def test_normalize_drops_legal_forms_folds_accents_and_sorts():
+    assert normalize_tokens("Petrostar Trading, LLC.") == ["petrostar", "trading"]
+    assert normalize_tokens("PETROSTAR TRADING LLC") == ["petrostar", "trading"]
+    assert normalize_tokens("The Acme Company Ltd.") == ["acme"]
+    assert normalize_tokens("Société Générale S.A.") == ["a", "generale", "s", "societe"]
+    assert normalize_tokens("Çelik Müller GmbH") == ["celik", "muller"]
+    assert normalize_tokens("ALI, Mohammed") == normalize_tokens("Mohammed Ali") == ["ali", "mohammed"]
+    assert normalize_tokens("LLC Inc.") == []
+
+
+def test_phonetic_code_matches_transliterations():
+    assert phonetic_code("qaddafi") == phonetic_code("gadhafi") == "231"
+    assert phonetic_code("celik") == phonetic_code("kelik")
+    assert phonetic_code("ali") == "04"
+    assert phonetic_code("1970") == "1970"
+    assert phonetic_key(["gadhafi", "muammar"]) == phonetic_key(["moammar", "qaddafi"])
+    assert phonetic_code("petrostar") != phonetic_code("gadhafi")
+
+
+def test_screen_finds_alias_and_reports_the_matched_name(index):
+    [result] = index.screen(["Moammar Al Gaddafi"])
+    [match] = result["matches"]
+    assert match["uid"] == "101"
+    assert match["entry"] == "QADHAFI, Muammar"
+    assert match["matched_name"] == "AL-GADDAFI, Moammar"
+    assert match["program"] == "LIBYA2"
+    assert match["score"] > 0.95
+
+
+def test_screen_matches_reordered_names_and_legal_forms(index):
+    results = index.screen(["National Bank of Cuba S.A.", "Petrostar Trading Ltd", "Acme Widgets Inc"])
+    assert [m["uid"] for m in results[0]["matches"]] == ["102"]
+    assert results[1]["matches"][0]["uid"] == "103"
+    assert results[1]["matches"][0]["score"] == 1.0
+    assert results[2]["matches"] == []
+    assert [r["name"] for r in results] == ["National Bank of Cuba S.A.", "Petrostar Trading Ltd", "Acme Widgets Inc"]
+
+
+def test_screen_applies_the_threshold(index):
+    [near] = index.screen(["Petrostor Tradeing"], min_score=0.0)
+    score = near["matches"][0]["score"]    # rounded to 4 places
+    assert 0.5 < score < 1.0
+    assert index.screen(["Petrostor Tradeing"], min_score=score - 0.001)[0]["matches"][0]["uid"] == "103"
+    assert index.screen(["Petrostor Tradeing"], min_score=score + 0.001)[0]["matches"] == []
+
+
+def test_screen_empty_query_and_empty_index(index):
+    assert index.screen(["", "  ", "LLC"]) == [{"name": "", "matches": []}, {"name": "  ", "matches": []},
+                                              {"name": "LLC", "matches": []}]
+    assert index.screen([]) == []
+    assert SanctionsIndex([]).screen(["Muammar Qadhafi"]) == [{"name": "Muammar Qadhafi", "matches": []}]
+
+
+def test_load_ofac_sdn_with_aliases(tmp_path):
+    (tmp_path / "sdn.csv").write_text(SDN_CSV)
+    (tmp_path / "alt.csv").write_text(ALT_CSV)
+    entries = {e["uid"]: e for e in load_sanctions_list(str(tmp_path / "sdn.csv"))}
+    assert sorted(entries) == ["101", "102", "103"]
+    assert entries["101"] == {"uid": "101", "name": "QADHAFI, Muammar", "type": "individual",
+                              "program": "LIBYA2", "aliases": ["AL-GADDAFI, Moammar"]}
+    assert entries["102"]["type"] == ""
+    assert entries["103"]["aliases"] == []
+
+
+def test_load_named_csv(tmp_path):
+    path = tmp_path / "watchlist.csv"
+    path.write_text("uid,Name,program,aliases\n"
+                    "A1,Petrostar Trading LLC,IRAN,Petro Star; PST Trading ;\n"
+                    ",Blue Ocean Shipping,,\n"
+                    "A3,,IRAN,Nameless\n")
+    entries = load_sanctions_list(str(path))
+    assert entries == [
+        {"uid": "A1", "name": "Petrostar Trading LLC", "type": "", "program": "IRAN",
+         "aliases": ["Petro Star", "PST Trading"]},
+        {"uid": "2", "name": "Blue Ocean Shipping", "type": "", "program": "", "aliases": []},
+    ]
+
+
+def test_load_plain_text(tmp_path):
+    path = tmp_path / "names.txt"
+    path.write_text("Muammar Qadhafi\n\n  Banco Nacional de Cuba  \n")
+    entries = load_sanctions_list(str(path))
+    assert [(e["uid"], e["name"]) for e in entries] == [("1", "Muammar Qadhafi"), ("3", "Banco Nacional de Cuba")]
+    assert SanctionsIndex(entries).screen(["Gadhafi Muammar"])[0]["matches"][0]["uid"] == "1"
+
+
+def test_download_writes_list_and_aliases_then_index_rebuilds(tmp_path, monkeypatch):
+    source = tmp_path / "ofac"
+    source.mkdir()
+    (source / "SDN.CSV").write_text(SDN_CSV)
+    (source / "ALT.CSV").write_text(ALT_CSV)
+    monkeypatch.setattr(sanctions_screening, "SANCTIONS_LIST_URL", (source / "SDN.CSV").as_uri())
+    monkeypatch.setattr(sanctions_screening, "SANCTIONS_ALIASES_URL", (source / "ALT.CSV").as_uri())
+
+    path = str(tmp_path / "sanctions" / "sdn.csv")
+    assert get_sanctions_index(path) is None
+    assert download_sanctions_list(path) == path
+    assert (tmp_path / "sanctions" / "alt.csv").read_text() == ALT_CSV
+    assert not list((tmp_path / "sanctions").glob("*.tmp"))
+    index = get_sanctions_index(path)
+    assert index.stats()["entries"] == 3 and index.stats()["names"] == 5
+
+    # A download that is not a list is rejected and the previous list kept
+    (source / "SDN.CSV").write_text("<html>maintenance</html>\n")
+    with pytest.raises(ValueError, match="no entries"):
+        download_sanctions_list(path)
+    assert (tmp_path / "sanctions" / "sdn.csv").read_text() == SDN_CSV
+    assert not list((tmp_path / "sanctions").glob("*.tmp"))
@@ -0,0 +1,117 @@
+import io
+import json
+import threading
+import time
+
+import pytest
+
+from services.session_manager import RESET_ACTION, WARM_ACTION, RuntimeSessionManager
+
+AGENTS = {"risk_analysis": {"agent_arn": "arn:aws:bedrock-agentcore:us-west-2:000000000000:runtime/risk"}}
+
+
+class FakeRuntime:
+    """invoke_agent_runtime stand-in recording (session id, action) per call"""
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def invoke_agent_runtime(self, agentRuntimeArn, runtimeSessionId, payload, contentType, accept):
+        with self._lock:
+            self.calls.append((runtimeSessionId, json.loads(payload).get("action")))
+        return {"response": io.BytesIO(b'{"result": "ok"}')}
+
+    def actions(self, action):
+        return [sid for sid, a in self.calls if a == action]
+
+
+def settle(manager: RuntimeSessionManager, timeout: float = 2.0):
+    """Wait for background warmups and resets to finish"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not any(manager._warming.values()) and manager._background._work_queue.empty():
+            time.sleep(0.02)
+            return
+        time.sleep(0.01)
+    raise AssertionError("background work did not finish")
+
+
+@pytest.fixture
+def runtime():
+    return FakeRuntime()
+
+
+def make_manager(runtime, **kwargs):
+    options = {"warm_per_agent": 2, "pin_ttl": 60, "idle_timeout": 60, "affinity": True, **kwargs}
+    manager = RuntimeSessionManager(AGENTS, **options)
+    if runtime is not None:
+        manager.configure(runtime)
+    return manager
+
+
+def test_pins_take_warm_sessions_and_refill(runtime):
+    manager = make_manager(runtime)
+    warmed = manager.warm()["risk_analysis"]
+    assert len(warmed) == 2
+
+    session, mode = manager.acquire("risk_analysis", "web-1")
+    assert (session, mode) == (warmed[0], "warm")
+    assert manager.acquire("risk_analysis", "web-1") == (session, "pinned")
+    settle(manager)
+    assert manager.stats()["warm_sessions"]["risk_analysis"] == 2
+    assert len(runtime.actions(WARM_ACTION)) == 3
+
+
+def test_pool_refills_after_idle_sessions_are_dropped(runtime):
+    manager = make_manager(runtime, idle_timeout=0.05)
+    manager.warm()
+    time.sleep(0.1)
+
+    # The idle warm sessions are gone, so this request is cold - but the pool is topped up again
+    assert manager.acquire("risk_analysis", "web-1")[1] == "cold"
+    settle(manager)
+    assert manager.acquire("risk_analysis", "web-2")[1] == "warm"
+
+
+def test_expired_pins_are_reset_and_recycled(runtime):
+    manager = make_manager(runtime, pin_ttl=0.05, warm_per_agent=1)
+    first, _ = manager.acquire("risk_analysis", "web-1")
+    settle(manager)
+    time.sleep(0.1)
+    manager.acquire("risk_analysis", "web-2")
+    settle(manager)
+    assert first in runtime.actions(RESET_ACTION)
+
+
+def test_first_client_is_configured_lazily(runtime):
+    manager = make_manager(None)
+    manager.configure(runtime, replace=False)
+    manager.configure(FakeRuntime(), replace=False)
+    assert manager.client is runtime
+
+
+def test_discarded_sessions_are_not_reset(runtime):
+    manager = make_manager(runtime, warm_per_agent=0)
+    session, _ = manager.acquire("risk_analysis", "web-1")
+    manager.release("risk_analysis", "web-1", discard=True)
+    assert manager.acquire("risk_analysis", "web-1")[0] != session
+    assert runtime.actions(RESET_ACTION) == []
+
+
+def test_stats_compare_affinity_and_fresh_sessions(runtime):
+    manager = make_manager(runtime, warm_per_agent=0)
+    manager.record("risk_analysis", "cold", 300.0)
+    manager.record("risk_analysis", "pinned", 40.0)
+    manager.record("risk_analysis", "fresh", 310.0, success=False)
+    stats = manager.stats()["agents"]["risk_analysis"]
+    assert stats["affinity"]["cold_start_rate"] == 0.5
+    assert stats["fresh"]["cold_start_rate"] == 1.0
+    assert stats["modes"]["fresh"]["failures"] == 1
+
+
+def test_fresh_sessions_without_affinity(runtime):
+    manager = make_manager(runtime, affinity=False)
+    first, mode = manager.acquire("risk_analysis", "web-1")
+    assert mode == "fresh"
+    assert manager.acquire("risk_analysis", "web-1")[0] != first
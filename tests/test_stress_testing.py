@@ -0,0 +1,112 @@
+import os
+
+import numpy as np
+import pytest
+
+from stress_testing import StressTestEngine, build_exposures, factor_for, format_stress_report
+
+SCENARIOS = ["Equity -10%", "Rates +100bp", "Crypto Crash -60%"]
+
+
+@pytest.fixture
+def portfolios():
+    return [
+        {"name": "Balanced", "value": 100_000, "holdings": {"SPY": 3, "tlt": 2}},    # 60k SPY, 40k TLT
+        {"name": "Growth", "value": 50_000, "holdings": {"QQQ": 1.0}},
+        {"name": "Empty", "value": 10_000, "holdings": {}},
+    ]
+
+
+@pytest.fixture
+def flat_history(tmp_path, monkeypatch):
+    """Four bars of hand-picked closes for SPY and QQQ"""
+    import price_history
+
+    directory = tmp_path / "price_history"
+    directory.mkdir()
+    closes = {"SPY": (100, 110, 99, 121), "QQQ": (50, 50, 40, 60)}
+    for symbol, prices in closes.items():
+        with open(os.path.join(directory, f"{symbol}.csv"), "w") as f:
+            f.write("Date,Close\n")
+            for day, close in enumerate(prices, 2):
+                f.write(f"2024-01-0{day},{close}\n")
+    monkeypatch.setattr(price_history, "PRICE_HISTORY_DIR", str(directory))
+    price_history._series_cache.clear()
+    return str(directory)
+
+
+def test_factor_mapping():
+    assert [factor_for(s) for s in ("aapl", "QQQ", "TLT", "agg", "GLD", "btc-usd", "VNQ", "HYG", "XYZ")] == [
+        "tech", "tech", "treasuries", "bonds", "gold", "crypto", "real_estate", "high_yield", "equity"]
+
+
+def test_library_shocks_map_factors_to_symbols():
+    names, shocks = StressTestEngine().library_shocks(["AAPL", "TLT", "XYZ", "GLD"],
+                                                      ["2022 Rate Shock", "Crypto Crash -60%"])
+    assert names == ["2022 Rate Shock", "Crypto Crash -60%"]
+    # XYZ has no mapping and takes the equity shock; factors a scenario leaves out are unshocked
+    np.testing.assert_allclose(shocks, [[-0.35, -0.30, -0.25, -0.10],
+                                        [-0.05, 0.0, 0.0, 0.0]])
+    with pytest.raises(ValueError, match="Unknown scenario"):
+        StressTestEngine().library_shocks(["SPY"], ["Alien Invasion"])
+
+
+def test_exposures_normalize_weights(portfolios):
+    symbols, exposures = build_exposures(portfolios)
+    assert symbols == ["QQQ", "SPY", "TLT"]
+    np.testing.assert_allclose(exposures, [[0, 60_000, 40_000], [50_000, 0, 0], [0, 0, 0]])
+
+
+def test_loss_grid_matches_hand_computation(portfolios):
+    result = StressTestEngine().run(portfolios, SCENARIOS, top_n=2)
+    balanced, growth, empty = result["portfolios"]
+
+    # Balanced: equity -10% on 60k; rates +100bp is -5% on 60k SPY and -15% on 40k TLT; no crypto
+    assert balanced["worst_scenario"] == "Rates +100bp"
+    assert balanced["worst_loss"] == pytest.approx(9_000)
+    assert balanced["worst_loss_pct"] == pytest.approx(0.09)
+    assert [(s["scenario"], round(s["loss"], 6)) for s in balanced["top_scenarios"]] == [
+        ("Rates +100bp", 9_000), ("Equity -10%", 6_000)]
+
+    # Growth is all tech: -12%, -8% and -5% of 50k
+    assert [(s["scenario"], round(s["loss"], 6)) for s in growth["top_scenarios"]] == [
+        ("Equity -10%", 6_000), ("Rates +100bp", 4_000)]
+
+    assert empty["value"] == 0.0 and empty["worst_loss"] == 0.0 and empty["worst_loss_pct"] == 0.0
+
+    assert [(r["scenario"], round(r["total_loss"], 6), r["portfolios_losing"])
+            for r in result["scenario_ranking"]] == [
+        ("Rates +100bp", 13_000, 2), ("Equity -10%", 12_000, 2), ("Crypto Crash -60%", 2_500, 1)]
+    assert (result["scenario_count"], result["portfolio_count"]) == (3, 3)
+
+    report = format_stress_report(result)
+    assert "Balanced ($100,000.00)" in report
+    assert "Worst case: Rates +100bp → -$9,000.00 (-9.0%)" in report
+    assert "• Equity -10%: -$6,000.00" in report
+
+
+def test_gains_render_as_positive():
+    result = StressTestEngine().run([{"name": "Duration", "value": 10_000, "holdings": {"TLT": 1}}],
+                                    ["Rates -100bp"])
+    assert result["portfolios"][0]["worst_loss"] == pytest.approx(-1_500)
+    assert "→ +$1,500.00 (+15.0%)" in format_stress_report(result)
+
+
+def test_history_shocks_are_rolling_window_returns(flat_history):
+    names, shocks = StressTestEngine.history_shocks(["SPY", "QQQ"], horizon=2)
+    assert names == ["Hist 2024-01-02 → 2024-01-04", "Hist 2024-01-03 → 2024-01-05"]
+    # 99/100 - 1 and 40/50 - 1, then 121/110 - 1 and 60/50 - 1
+    np.testing.assert_allclose(shocks, [[-0.01, -0.20], [0.10, 0.20]])
+
+    names, shocks = StressTestEngine.history_shocks(["QQQ"], horizon=1, step=2)
+    assert names == ["Hist 2024-01-02 → 2024-01-03", "Hist 2024-01-04 → 2024-01-05"]
+    np.testing.assert_allclose(shocks, [[0.0], [0.5]])
+
+
+def test_history_scenarios_join_the_library(flat_history):
+    portfolio = {"name": "Core", "value": 1_000, "holdings": {"SPY": 1, "QQQ": 1}}
+    result = StressTestEngine().run([portfolio], ["Equity -10%"], history_horizon=2, top_n=3)
+    assert result["scenario_count"] == 3
+    # 500 x (-1%) + 500 x (-20%) lost in the first window, versus 500 x 10% + 500 x 12% for the library shock
+    assert [(s["scenario"], round(s["loss"], 6)) for s in result["portfolios"][0]["top_scenarios"]] == [
+        ("Equity -10%", 110), ("Hist 2024-01-02 → 2024-01-04", 105), ("Hist 2024-01-03 → 2024-01-05", -150)]
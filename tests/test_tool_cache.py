@@ -0,0 +1,61 @@
+import pytest
+
+from tool_cache import ToolCache, memoize
+
+
+@pytest.fixture
+def cache():
+    return ToolCache(max_entries=2)
+
+
+def test_bound_arguments_share_an_entry(cache):
+    calls = []
+
+    @memoize(ttl=60, cache=cache)
+    def scale(x, factor=2):
+        calls.append(x)
+        return x * factor
+
+    assert scale(3) == scale(x=3) == scale(3, factor=2) == 6
+    assert calls == [3]
+    assert cache.stats()["tools"]["scale"]["hits"] == 2
+
+
+def test_large_arguments_are_keyed_by_digest(cache):
+    @memoize(ttl=60, cache=cache)
+    def count(transactions):
+        return len(transactions)
+
+    batch = [{"transaction_id": f"TXN{i}", "amount": i * 1.5} for i in range(20000)]
+    assert count(batch) == 20000
+    (key,) = cache._entries
+    assert sum(len(str(part)) for part in key) < 100
+    assert count(list(batch)) == 20000
+    assert cache.stats()["tools"]["count"]["hits"] == 1
+
+
+def test_version_change_invalidates(cache):
+    version = {"etag": "a"}
+
+    @memoize(ttl=60, cache=cache, version=lambda args: version["etag"])
+    def report():
+        return f"report {version['etag']}"
+
+    assert report() == "report a"
+    version["etag"] = "b"
+    assert report() == "report b"
+
+
+def test_errors_are_not_cached_and_lru_evicts(cache):
+    calls = []
+
+    @memoize(ttl=60, cache=cache)
+    def tool(x):
+        calls.append(x)
+        return "❌ Error: bad input" if x < 0 else x
+
+    tool(-1), tool(-1)
+    assert calls == [-1, -1]
+    tool(1), tool(2), tool(3), tool(1)
+    assert calls[-1] == 1
+    assert cache.stats()["tools"]["tool"]["evicted"] == 2
@@ -0,0 +1,97 @@
+from statistics import NormalDist
+
+import numpy as np
+import pytest
+from scipy.stats import chi2
+
+import var_backtest
+from var_backtest import (backtest, backtest_portfolios, basel_zone, christoffersen, format_backtest_report,
+                          kupiec_pof, rolling_historical_var, rolling_parametric_var)
+
+
+@pytest.fixture(scope="module")
+def returns():
+    return np.random.default_rng(11).normal(0.0, 0.01, (600, 3))
+
+
+def test_rolling_forecasts_match_a_naive_loop(returns):
+    window, z = 60, NormalDist().inv_cdf(0.01)
+    parametric = rolling_parametric_var(returns, window, 0.99)
+    historical = rolling_historical_var(returns, window, 0.99)
+    assert parametric.shape == historical.shape == (len(returns) - window, 3)
+    for t in (0, 17, len(returns) - window - 1):
+        past = returns[t:t + window]
+        assert parametric[t] == pytest.approx(-(past.mean(axis=0) + z * past.std(axis=0, ddof=1)))
+        assert historical[t] == pytest.approx(-np.quantile(past, 0.01, axis=0))
+
+
+def test_historical_blocks_do_not_change_forecasts(returns, monkeypatch):
+    full = rolling_historical_var(returns, 60, 0.99)
+    monkeypatch.setattr(var_backtest, "HISTORICAL_BLOCK_ELEMENTS", 1)
+    assert np.array_equal(rolling_historical_var(returns, 60, 0.99), full)
+
+
+def test_kupiec_matches_chi_square():
+    result = kupiec_pof(np.array([2.5, 10]), 250, 0.99)
+    assert result["lr"][0] == pytest.approx(0.0)
+    x, n, p = 10, 250, 0.01
+    lr = -2 * ((n - x) * np.log(1 - p) + x * np.log(p) - (n - x) * np.log(1 - x / n) - x * np.log(x / n))
+    assert result["lr"][1] == pytest.approx(lr)
+    assert result["p_value"][1] == pytest.approx(chi2.sf(lr, 1))
+    # No exceptions at all is a finite statistic, not NaN
+    assert np.isfinite(kupiec_pof(np.array([0]), 250, 0.99)["lr"]).all()
+
+
+def test_christoffersen_flags_clustered_exceptions():
+    spread = np.zeros((500, 1), dtype=bool)
+    spread[::50] = True
+    clustered = np.zeros((500, 1), dtype=bool)
+    clustered[200:210] = True
+    assert christoffersen(spread)["p_value"][0] > 0.5
+    result = christoffersen(clustered)
+    assert result["p_value"][0] < 0.001 and result["clustered"][0] == 9
+
+
+def test_basel_zones():
+    assert basel_zone(np.array([0, 4, 5, 9, 10])) == ["green", "green", "yellow", "yellow", "red"]
+    # The thresholds only hold for 99% VaR over 250 days
+    assert basel_zone(np.array([0, 12]), confidence=0.95) == [None, None]
+    assert basel_zone(np.array([0, 12]), confidence=0.975) == [None, None]
+    assert basel_zone(np.array([3]), observations=199) == [None]
+
+
+def test_report_has_no_basel_zone_off_99(returns):
+    assert "Basel traffic light (last 250 days): GREEN" in format_backtest_report(backtest(returns, confidence=0.99))
+    result = backtest(returns, window=250, confidence=0.95)
+    assert result["basel_zone"] == [None, None, None]
+    report = format_backtest_report(result)
+    assert "Basel traffic light: n/a (defined for 99% VaR over 250 test days)" in report
+    assert "GREEN" not in report and "RED" not in report
+
+
+def test_calibrated_model_passes_and_regime_change_fails(returns):
+    calm = backtest(returns, window=250, confidence=0.99)
+    assert calm["observations"] == 350
+    assert (calm["kupiec_p_value"] > 0.05).all()
+
+    shocked = returns.copy()
+    shocked[450:] *= 4
+    stressed = backtest(shocked, window=250, confidence=0.99)
+    assert (stressed["exceptions"] > calm["exceptions"]).all()
+    assert (stressed["kupiec_p_value"] < 0.01).all()
+    assert "❌ reject" in format_backtest_report(stressed)
+
+
+def test_rejects_short_history_and_unknown_method(returns):
+    with pytest.raises(ValueError, match="Need more than"):
+        backtest(returns[:100], window=250)
+    with pytest.raises(ValueError, match="Unknown backtest method"):
+        backtest(returns, method="garch")
+
+
+def test_backtests_portfolios_from_price_history(price_dir):
+    weights = np.array([[0.6, 0.4, 0.0, 0.0], [0.25, 0.25, 0.25, 0.25]])
+    result = backtest_portfolios(["SPY", "AGG", "GLD", "QQQ"], weights, window=100, method="historical")
+    assert result["exceptions"].shape == (2,)
+    assert result["observations"] == 300 - 1 - 100
+    assert result["start"] < result["end"]